@@ -0,0 +1,110 @@
+import json
+import os
+import queue
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from GFSDistributionCubeClass import GFSDistributionCube
+
+
+# Maps every forecast time (timeDirName) to the latest distribution holding it, so finding the report of a time is a dict lookup.
+# The decode process adds slices as it publishes them and persists the catalogue to csvFilesPath, so startup doesn't rescan every distribution;
+# it only rereads the small cube header of each, since a slice is published in the header before the catalogue is saved.
+# Other processes pick the additions up from a queue given to listen().
+class DistributionCatalogue():
+
+    # class properties
+    catalogueFileName = 'catalogue.json'
+    __shared = None
+
+
+    def __init__(self, csvFilesPath, distributions):
+        self.csvFilesPath = csvFilesPath
+        self.distributions = {} # distributionName: set of timeDirNames
+        self.__bestDistributionNames = {} # timeDirName: distributionName
+        self.__publishedSlicesQueue = None
+        for distributionName, timeDirNames in distributions.items():
+            for timeDirName in timeDirNames:
+                self.addPublishedTime(distributionName, timeDirName)
+
+
+    # read the persisted catalogue, add the times published in the cube headers after it was saved, then scan only the distributions it doesn't know yet.
+    @classmethod
+    def initFromCSVFilesPath(cls, csvFilesPath):
+        distributions = {}
+        try:
+            with open(f'{csvFilesPath}/{DistributionCatalogue.catalogueFileName}', 'r') as file:
+                distributions = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        existingDistributionNames = set(filter(lambda name: 'distributed' in name, os.listdir(csvFilesPath))) if os.path.isdir(csvFilesPath) else set()
+        distributions = { distributionName: timeDirNames for distributionName, timeDirNames in distributions.items() if distributionName in existingDistributionNames }
+        for distributionName, timeDirNames in distributions.items():
+            distributionDirPath = f'{csvFilesPath}/{distributionName}'
+            if GFSDistributionCube.isAvailable(distributionDirPath):
+                distributions[distributionName] = set(timeDirNames).union(GFSDistributionCube.readHeader(distributionDirPath)['publishedTimes'])
+        for distributionName in existingDistributionNames.difference(distributions):
+            distributions[distributionName] = DistributionCatalogue.scanDistribution(f'{csvFilesPath}/{distributionName}')
+        return cls(csvFilesPath, distributions)
+
+
+    # the catalogue of WeatherReportProcessorBase.csvFilesPath in this process, built on first use.
+    @classmethod
+    def getShared(cls):
+        if DistributionCatalogue.__shared is None or DistributionCatalogue.__shared.csvFilesPath != WeatherReportProcessorBase.csvFilesPath:
+            DistributionCatalogue.__shared = cls.initFromCSVFilesPath(WeatherReportProcessorBase.csvFilesPath)
+        return DistributionCatalogue.__shared
+
+
+    # MARK: - Public Methods
+
+    # None if no distribution holds timeDirName
+    def getBestDistributionName(self, timeDirName):
+        self.__drainPublishedSlicesQueue()
+        return self.__bestDistributionNames.get(timeDirName)
+
+
+    def addPublishedTime(self, distributionName, timeDirName):
+        self.distributions.setdefault(distributionName, set()).add(timeDirName)
+        # distribution names start with the distribution date, so the later one sorts last
+        bestDistributionName = self.__bestDistributionNames.get(timeDirName)
+        if bestDistributionName is None or bestDistributionName < distributionName:
+            self.__bestDistributionNames[timeDirName] = distributionName
+
+
+    # queue of (distributionName, timeDirName) put by the decode process
+    def listen(self, publishedSlicesQueue):
+        self.__publishedSlicesQueue = publishedSlicesQueue
+
+
+    # replace the file atomically so readers never see a half-written one.
+    def save(self):
+        os.makedirs(self.csvFilesPath, exist_ok=True)
+        temporaryCataloguePath = f'{self.csvFilesPath}/.{DistributionCatalogue.catalogueFileName}.tmp'
+        with open(temporaryCataloguePath, 'w') as file:
+            json.dump({ distributionName: sorted(timeDirNames) for distributionName, timeDirNames in self.distributions.items() }, file)
+        os.replace(temporaryCataloguePath, f'{self.csvFilesPath}/{DistributionCatalogue.catalogueFileName}')
+
+
+    # MARK: - Custom Public Helper Functions
+
+    # times published in the cube, and csv dirs of distributions decoded before the cube existed
+    @classmethod
+    def scanDistribution(cls, distributionDirPath):
+        timeDirNames = set(GFSDistributionCube.readHeader(distributionDirPath)['publishedTimes']) if GFSDistributionCube.isAvailable(distributionDirPath) else set()
+        for name in os.listdir(distributionDirPath):
+            if not name.startswith('.') and os.path.isdir(f'{distributionDirPath}/{name}'):
+                timeDirNames.add(name)
+        return timeDirNames
+
+
+    # MARK: - Helper Custom Private methods
+
+    def __drainPublishedSlicesQueue(self):
+        if self.__publishedSlicesQueue is None:
+            return
+        while True:
+            try:
+                distributionName, timeDirName = self.__publishedSlicesQueue.get_nowait()
+            except queue.Empty:
+                return
+            self.addPublishedTime(distributionName, timeDirName)
@@ -0,0 +1,103 @@
+import datetime as dt
+import threading
+
+
+# Hands out the forecast hours of a distribution to the download threads, nearest to the flight first.
+# Hours within horizonHours of the current time are downloaded by every thread; hours up to idleHorizonHours only by
+# idleConcurrency threads once nothing nearer is left, so that they never compete with the hours we actually fly on.
+# Priorities are recomputed on every pick, so the order follows the current time while a distribution is being downloaded.
+# A thread finding nothing to pick waits while other hours are in progress, as a finished idle hour or the advancing time may free more;
+# all threads are released when nothing is in progress or close() is called.
+class ForecastHoursScheduler():
+
+    # class properties
+    forecastIntervalHours = 3
+    idleConcurrency = 1
+    recheckSeconds = 60 # waiting threads look again this often, as the current time moves hours into the horizons
+
+
+    def __init__(self, distributionDate, forecastPrecedingHours, getCurrentTime, horizonHours, idleHorizonHours, priorityFunction=None):
+        self.distributionDate = distributionDate
+        self.getCurrentTime = getCurrentTime
+        self.horizonHours = horizonHours
+        self.idleHorizonHours = idleHorizonHours
+        self.priorityFunction = ForecastHoursScheduler.getDefaultPriority if priorityFunction is None else priorityFunction
+        self.__remainingPrecedingHours = set(forecastPrecedingHours)
+        self.__idlePrecedingHoursInProgress = set()
+        self.__precedingHoursInProgress = set()
+        self.__isClosed = False
+        self.__condition = threading.Condition()
+
+
+    # MARK: - Public Methods
+
+    # the hours needed now: from the window the current time lies in, to idleHorizonHours ahead.
+    def getScheduledPrecedingHours(self):
+        currentTime = self.getCurrentTime()
+        with self.__condition:
+            return sorted(self.__remainingPrecedingHours.intersection(self.__getPrecedingHoursWithin(currentTime, self.idleHorizonHours)), key=lambda precedingHours: self.__getPriority(precedingHours, currentTime))
+
+
+    # blocks until an hour is free for the calling thread; returns None when nothing is left to wait for, or after close().
+    def popNextPrecedingHours(self):
+        with self.__condition:
+            while not self.__isClosed:
+                precedingHours = self.__pickPrecedingHours(self.getCurrentTime())
+                if precedingHours is not None:
+                    self.__precedingHoursInProgress.add(precedingHours)
+                    return precedingHours
+                if len(self.__precedingHoursInProgress) == 0:
+                    return None
+                self.__condition.wait(ForecastHoursScheduler.recheckSeconds)
+            return None
+
+
+    def didFinishPrecedingHours(self, precedingHours):
+        with self.__condition:
+            self.__idlePrecedingHoursInProgress.discard(precedingHours)
+            self.__precedingHoursInProgress.discard(precedingHours)
+            self.__condition.notify_all()
+
+
+    # release every waiting thread, e.g. when one of them failed or the download is stopped.
+    def close(self):
+        with self.__condition:
+            self.__isClosed = True
+            self.__condition.notify_all()
+
+
+    # MARK: - Custom Public Helper Functions
+
+    # seconds from the start of the window the current time lies in; the past slot of that window comes first.
+    @classmethod
+    def getDefaultPriority(cls, forecastTime, currentTime):
+        currentWindowStartTime = dt.datetime(currentTime.year, currentTime.month, currentTime.day, currentTime.hour//3*3, 0, 0)
+        return abs((forecastTime - currentWindowStartTime).total_seconds())
+
+
+    # MARK: - Helper Custom Private methods
+
+    # None if nothing is free now; called under the condition.
+    def __pickPrecedingHours(self, currentTime):
+        urgentPrecedingHours = self.__remainingPrecedingHours.intersection(self.__getPrecedingHoursWithin(currentTime, self.horizonHours))
+        if len(urgentPrecedingHours) != 0:
+            precedingHours = min(urgentPrecedingHours, key=lambda precedingHours: self.__getPriority(precedingHours, currentTime))
+        else:
+            idlePrecedingHours = self.__remainingPrecedingHours.intersection(self.__getPrecedingHoursWithin(currentTime, self.idleHorizonHours))
+            if len(idlePrecedingHours) == 0 or len(self.__idlePrecedingHoursInProgress) >= ForecastHoursScheduler.idleConcurrency:
+                return None
+            precedingHours = min(idlePrecedingHours, key=lambda precedingHours: self.__getPriority(precedingHours, currentTime))
+            self.__idlePrecedingHoursInProgress.add(precedingHours)
+        self.__remainingPrecedingHours.remove(precedingHours)
+        return precedingHours
+
+
+    def __getPriority(self, precedingHours, currentTime):
+        return self.priorityFunction(self.distributionDate + dt.timedelta(hours=precedingHours), currentTime)
+
+
+    def __getPrecedingHoursWithin(self, currentTime, horizonHours):
+        # windows that already ended are never needed again
+        lowerBound = (currentTime - self.distributionDate).total_seconds() / 3600 - ForecastHoursScheduler.forecastIntervalHours
+        upperBound = (currentTime - self.distributionDate).total_seconds() / 3600 + horizonHours
+        return set(filter(lambda precedingHours: lowerBound < precedingHours <= upperBound, self.__remainingPrecedingHours))
@@ -0,0 +1,147 @@
+import numpy as nu
+import pandas as pd
+import datetime as dt
+import json
+import os
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+
+
+# One binary cube per distribution, shaped time x level x component x latitude x longitude, next to a small json header
+# holding the coordinates. Slices are opened through a memory map, so reading a forecast time never parses text.
+# https://numpy.org/doc/stable/reference/generated/numpy.lib.format.open_memmap.html
+class GFSDistributionCube():
+
+    # class properties
+    cubeFileName = 'winds.npy'
+    headerFileName = 'winds.json'
+    levelNames = ['10_m', '20_m', '30_m', '40_m', '50_m', '80_m', '100_m']
+    componentNames = ['u', 'v']
+    dtype = 'float32'
+    geoCoordinateEpsilon = 1e-6 # degree, as WeatherReport
+
+
+    def __init__(self, distributionDirPath, header, cube):
+        self.distributionDirPath = distributionDirPath
+        self.header = header
+        self.cube = cube
+        self.latitudes = nu.array(header['latitudes'])
+        self.longitudes = nu.array(header['longitudes'])
+
+
+    @classmethod
+    def isAvailable(cls, distributionDirPath):
+        return os.path.isfile(f'{distributionDirPath}/{GFSDistributionCube.cubeFileName}') and os.path.isfile(f'{distributionDirPath}/{GFSDistributionCube.headerFileName}')
+
+
+    @classmethod
+    def initFromDistributionDirPath(cls, distributionDirPath, mode='r'):
+        header = GFSDistributionCube.readHeader(distributionDirPath)
+        cube = nu.load(f'{distributionDirPath}/{GFSDistributionCube.cubeFileName}', mmap_mode=mode)
+        return cls(distributionDirPath, header, cube)
+
+
+    # create an empty (nan) cube for all forecast times of the distribution. Its grid is taken from the first decoded slice.
+    @classmethod
+    def initByCreatingFromCSVFiles(cls, distributionDirPath, distributionDate, csvParametersDirPath):
+        latitudes, longitudes, _ = GFSDistributionCube.readSliceFromCSVFiles(csvParametersDirPath)
+        return cls.initByCreating(distributionDirPath, distributionDate, latitudes, longitudes)
+
+
+    @classmethod
+    def initByCreating(cls, distributionDirPath, distributionDate, latitudes, longitudes):
+        timeDirNames = [ (distributionDate + dt.timedelta(hours=precedingHours)).strftime(WeatherReportProcessorBase.weatherReportDirNameFormat) for precedingHours in WeatherReportProcessorBase.forecastPrecedingHours ]
+        header = {
+            'distributionDate': distributionDate.strftime(WeatherReportProcessorBase.weatherReportDirNameFormat),
+            'times': timeDirNames,
+            'levels': GFSDistributionCube.levelNames,
+            'components': GFSDistributionCube.componentNames,
+            'latitudes': latitudes.tolist(),
+            'longitudes': longitudes.tolist(),
+            'publishedTimes': [],
+        }
+        cube = nu.lib.format.open_memmap(f'{distributionDirPath}/{GFSDistributionCube.cubeFileName}', mode='w+', dtype=GFSDistributionCube.dtype, shape=(len(timeDirNames), len(GFSDistributionCube.levelNames), len(GFSDistributionCube.componentNames), len(latitudes), len(longitudes)))
+        cube[:] = nu.nan
+        cube.flush()
+        GFSDistributionCube.writeHeader(distributionDirPath, header)
+        return cls(distributionDirPath, header, cube)
+
+
+    # MARK: - Public Methods
+
+    def isTimePublished(self, timeDirName):
+        return timeDirName in self.header['publishedTimes']
+
+
+    # returns a zero-copy view shaped level x component x latitude x longitude
+    def getSliceAtTime(self, timeDirName):
+        if not self.isTimePublished(timeDirName):
+            raise FileNotFoundError
+        return self.cube[self.header['times'].index(timeDirName)]
+
+
+    # pack the decoded csv files of one forecast time into the cube, then publish it through the header.
+    def writeSliceFromCSVFiles(self, timeDirName, csvParametersDirPath):
+        latitudes, longitudes, values = GFSDistributionCube.readSliceFromCSVFiles(csvParametersDirPath)
+        self.writeSlice(timeDirName, latitudes, longitudes, values)
+
+
+    def writeSlice(self, timeDirName, latitudes, longitudes, values):
+        if not (nu.array_equal(latitudes, self.latitudes) and nu.array_equal(longitudes, self.longitudes)):
+            print(f"Warning: grid of {timeDirName} dismatches the grid of {self.distributionDirPath}; Skipping ...")
+            return
+        self.cube[self.header['times'].index(timeDirName)] = values
+        self.cube.flush()
+        if timeDirName not in self.header['publishedTimes']:
+            self.header['publishedTimes'].append(timeDirName)
+        GFSDistributionCube.writeHeader(self.distributionDirPath, self.header)
+
+
+    # MARK: - Custom Public Helper Functions
+
+    @classmethod
+    def readHeader(cls, distributionDirPath):
+        with open(f'{distributionDirPath}/{GFSDistributionCube.headerFileName}', 'r') as file:
+            return json.load(file)
+
+
+    # replace the header atomically so readers never see a half-written one.
+    @classmethod
+    def writeHeader(cls, distributionDirPath, header):
+        temporaryHeaderPath = f'{distributionDirPath}/.{GFSDistributionCube.headerFileName}.tmp'
+        with open(temporaryHeaderPath, 'w') as file:
+            json.dump(header, file)
+        os.replace(temporaryHeaderPath, f'{distributionDirPath}/{GFSDistributionCube.headerFileName}')
+
+
+    @classmethod
+    def isTimePublishedInDistribution(cls, distributionDirPath, timeDirName):
+        if not GFSDistributionCube.isAvailable(distributionDirPath):
+            return False
+        return timeDirName in GFSDistributionCube.readHeader(distributionDirPath)['publishedTimes']
+
+
+    # read the (latitude, longitude, value) csv files written by decodeGribToCSVFiles.sh into a level x component x latitude x longitude array.
+    @classmethod
+    def readSliceFromCSVFiles(cls, csvParametersDirPath):
+        dfs = {}
+        for levelName in GFSDistributionCube.levelNames:
+            for componentName in GFSDistributionCube.componentNames:
+                df = pd.read_csv(f'{csvParametersDirPath}/{levelName}_{componentName}Wind.csv', header=None)
+                df.columns = ['latitude', 'longitude', 'value']
+                dfs[(levelName, componentName)] = df
+        firstDF = dfs[(GFSDistributionCube.levelNames[0], GFSDistributionCube.componentNames[0])]
+        latitudes = nu.unique(firstDF['latitude'].values)
+        longitudes = nu.unique(firstDF['longitude'].values)
+        values = nu.full((len(GFSDistributionCube.levelNames), len(GFSDistributionCube.componentNames), len(latitudes), len(longitudes)), nu.nan, dtype=GFSDistributionCube.dtype)
+        for levelIndex, levelName in enumerate(GFSDistributionCube.levelNames):
+            for componentIndex, componentName in enumerate(GFSDistributionCube.componentNames):
+                df = dfs[(levelName, componentName)]
+                latitudeIndexes = nu.minimum(nu.searchsorted(latitudes, df['latitude'].values), len(latitudes) - 1)
+                longitudeIndexes = nu.minimum(nu.searchsorted(longitudes, df['longitude'].values), len(longitudes) - 1)
+                # points off the lattice of the first file would land in a neighbouring cell
+                isOnGrid = nu.isclose(latitudes[latitudeIndexes], df['latitude'].values, rtol=0, atol=GFSDistributionCube.geoCoordinateEpsilon) & nu.isclose(longitudes[longitudeIndexes], df['longitude'].values, rtol=0, atol=GFSDistributionCube.geoCoordinateEpsilon)
+                if not isOnGrid.all():
+                    print(f"Warning: {nu.count_nonzero(~isOnGrid)} points of {csvParametersDirPath}/{levelName}_{componentName}Wind.csv are off the grid; Skipping them ...")
+                values[levelIndex, componentIndex, latitudeIndexes[isOnGrid], longitudeIndexes[isOnGrid]] = df['value'].values[isOnGrid]
+        return latitudes, longitudes, values
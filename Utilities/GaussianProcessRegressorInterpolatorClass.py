@@ -1,41 +1,118 @@
 import numpy as nu
 import pandas as pd
+import os
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.gaussian_process import GaussianProcessRegressor
-from sklearn.gaussian_process.kernels import RBF, WhiteKernel
+from sklearn.gaussian_process.kernels import RBF, WhiteKernel, ConstantKernel
 
 from Spot4DClass import Spot4D
+from WeatherReportClass import WeatherReport
 
 
-# https://scikit-learn.org/stable/auto_examples/gaussian_process/plot_gpr_co2.html
+# Local-patch GP: the lon/lat plane is cut into patchSize degree patches, each fitted exactly on the samples within it and a halo
+# around it, so the cost is linear in the area instead of cubic in the sample count.
+# Kernel hyperparameters are optimized once per component on the first patch and reused by every other patch and later refresh.
+# https://scikit-learn.org/stable/modules/gaussian_process.html#gaussian-process-regression-gpr
 class GaussianProcessRegressorInterpolator():
-    def __init__(self, trainingSamples_uWind, trainingSamples_vWind):
-        self.models = {}
-        # get kernel
-        _kernel1 = 66.0**2 * RBF()
-        self.models['uWind'] = GaussianProcessRegressor(kernel=_kernel1)
-        self.models['vWind'] = GaussianProcessRegressor(kernel=_kernel1)
+
+    # class properties
+    patchSize = 2.5 # degree
+    patchHalo = 0.5 # degree
+    axesScales = nu.array([1/0.5, 1/0.5, 1/30, 1/10800]) # per degree, per degree, per meter, per second
+    initialKernel = ConstantKernel(10.0**2) * RBF(length_scale=[1.0, 1.0, 1.0, 1.0], length_scale_bounds=(1e-2, 1e3)) + WhiteKernel(noise_level=1e-2, noise_level_bounds=(1e-6, 1e1))
+    optimizationSampleAmount = 300 # samples of the first patch the hyperparameters are optimized on
+    kernels = {} # componentName: fitted kernel, shared across refreshes
+    fitWorkerAmount = os.cpu_count()
+
+
+    def __init__(self, trainingSamples_uWind, trainingSamples_vWind, timeStandard):
+        self.trainingSamples_uWind = trainingSamples_uWind
+        self.trainingSamples_vWind = trainingSamples_vWind
+        self.timeStandard = timeStandard
+        self.models = {} # (longitudePatchIndex, latitudePatchIndex): {'uWind': GaussianProcessRegressor, 'vWind': GaussianProcessRegressor}
         # start training
-        self.models['uWind'].fit(trainingSamples_uWind[:, :-1], trainingSamples_uWind[:, -1])
-        self.models['vWind'].fit(trainingSamples_vWind[:, :-1], trainingSamples_vWind[:, -1])
+        patchesIndex = set()
+        for trainingSamples in (trainingSamples_uWind, trainingSamples_vWind):
+            patchesIndex.update(map(tuple, nu.unique(nu.floor(trainingSamples[:, :2] / GaussianProcessRegressorInterpolator.patchSize).astype('int'), axis=0).tolist()))
+        patchesIndex = sorted(patchesIndex)
+        if len(patchesIndex) == 0:
+            return
+        # hyperparameters first, on one patch, so that every other fit only factorizes
+        for componentName, trainingSamples in (('u', trainingSamples_uWind), ('v', trainingSamples_vWind)):
+            if componentName not in GaussianProcessRegressorInterpolator.kernels:
+                model = self.__fitPatch(trainingSamples, patchesIndex[len(patchesIndex)//2], GaussianProcessRegressorInterpolator.initialKernel, shouldOptimize=True)
+                GaussianProcessRegressorInterpolator.kernels[componentName] = model.kernel_
+        with ThreadPoolExecutor(max_workers=GaussianProcessRegressorInterpolator.fitWorkerAmount) as executor:
+            futures = {
+                patchIndex: (
+                    executor.submit(self.__fitPatch, trainingSamples_uWind, patchIndex, GaussianProcessRegressorInterpolator.kernels['u'], False),
+                    executor.submit(self.__fitPatch, trainingSamples_vWind, patchIndex, GaussianProcessRegressorInterpolator.kernels['v'], False)
+                )
+                for patchIndex in patchesIndex
+            }
+            for patchIndex, (uFuture, vFuture) in futures.items():
+                self.models[patchIndex] = {'uWind': uFuture.result(), 'vWind': vFuture.result()}
 
 
     @classmethod
     def initFromWeatherReportCaches(cls, pastWeatherReport, futureWeatherReport, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound):
-        # get training samples for uWind
-        pastTrainingSamples_uWind = pastWeatherReport.getSamplesForTraining(secondsFromStart=0.0, categoryName='winds', componentName='u', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
-        futureTrainingSamples_uWind = futureWeatherReport.getSamplesForTraining(secondsFromStart=(futureWeatherReport.date - pastWeatherReport.date).total_seconds(), categoryName='winds', componentName='u', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
-        # get training samples for vWind
-        pastTrainingSamples_vWind = pastWeatherReport.getSamplesForTraining(secondsFromStart=0.0, categoryName='winds', componentName='v', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
-        futureTrainingSamples_vWind = futureWeatherReport.getSamplesForTraining(secondsFromStart=(futureWeatherReport.date - pastWeatherReport.date).total_seconds(), categoryName='winds', componentName='v', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
+        # get training samples for uWind and vWind at once
+        trainingSamples = WeatherReport.getSamplesForTrainingFromWeatherReportPair(pastWeatherReport, futureWeatherReport, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound)
 
         return cls(
-            trainingSamples_uWind=nu.concatenate([pastTrainingSamples_uWind, futureTrainingSamples_uWind]),
-            trainingSamples_vWind=nu.concatenate([pastTrainingSamples_vWind, futureTrainingSamples_vWind])
+            trainingSamples_uWind=trainingSamples['u'],
+            trainingSamples_vWind=trainingSamples['v'],
+            timeStandard=pastWeatherReport.date
         )
 
 
-    def predict(self, spot, timeDelta):
-        return (
-            self.models['uWind'].predict(spot.longitude, spot.latitude, spot.altitude, timeDelta),
-            self.models['vWind'].predict(spot.longitude, spot.latitude, spot.altitude, timeDelta)
-        )
+    # forget the shared kernels, so the next fit optimizes the hyperparameters again, e.g. between independent evaluations.
+    @classmethod
+    def clearKernels(cls):
+        GaussianProcessRegressorInterpolator.kernels.clear()
+
+
+    def predict(self, spot, shouldReturnStd=False):
+        predictions = self.predictFromSpots_ndarray(nu.array([[spot.longitude, spot.latitude, spot.altitude, (spot.time-self.timeStandard).total_seconds()]]), shouldReturnStd=shouldReturnStd)
+        return tuple( prediction[0] for prediction in predictions )
+
+
+    def predictFromSpot_flattenedArray(self, array, shouldReturnStd=False):
+        return self.predictFromSpots_ndarray(array, shouldReturnStd=shouldReturnStd)
+
+
+    # longitude, latitude, altitude, time. Returns uWinds, vWinds (and uWindsStd, vWindsStd if shouldReturnStd); nan outside every patch.
+    def predictFromSpots_ndarray(self, spotsNdarray, shouldReturnStd=False):
+        spotsNdarray = nu.asarray(spotsNdarray, dtype='float').reshape(-1, 4)
+        predictions = [ nu.full(spotsNdarray.shape[0], nu.nan) for _ in range(4 if shouldReturnStd else 2) ]
+        patchesIndex = nu.floor(spotsNdarray[:, :2] / GaussianProcessRegressorInterpolator.patchSize).astype('int')
+        # group spots by patch
+        uniquePatchesIndex, inverse = nu.unique(patchesIndex, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for groupIndex, patchIndex in enumerate(map(tuple, uniquePatchesIndex.tolist())):
+            if patchIndex not in self.models:
+                continue
+            isInPatch = inverse == groupIndex
+            scaledSpots = spotsNdarray[isInPatch] * GaussianProcessRegressorInterpolator.axesScales
+            for componentIndex, componentName in enumerate(('uWind', 'vWind')):
+                if shouldReturnStd:
+                    predictions[componentIndex][isInPatch], predictions[2 + componentIndex][isInPatch] = self.models[patchIndex][componentName].predict(scaledSpots, return_std=True)
+                else:
+                    predictions[componentIndex][isInPatch] = self.models[patchIndex][componentName].predict(scaledSpots)
+        return tuple(predictions)
+
+
+    # MARK: - Helper Custom Private methods
+
+    def __fitPatch(self, trainingSamples, patchIndex, kernel, shouldOptimize):
+        longitudeLowerBound = patchIndex[0] * GaussianProcessRegressorInterpolator.patchSize - GaussianProcessRegressorInterpolator.patchHalo
+        longitudeUpperBound = (patchIndex[0] + 1) * GaussianProcessRegressorInterpolator.patchSize + GaussianProcessRegressorInterpolator.patchHalo
+        latitudeLowerBound = patchIndex[1] * GaussianProcessRegressorInterpolator.patchSize - GaussianProcessRegressorInterpolator.patchHalo
+        latitudeUpperBound = (patchIndex[1] + 1) * GaussianProcessRegressorInterpolator.patchSize + GaussianProcessRegressorInterpolator.patchHalo
+        isInside = (longitudeLowerBound <= trainingSamples[:, 0]) & (trainingSamples[:, 0] <= longitudeUpperBound) & (latitudeLowerBound <= trainingSamples[:, 1]) & (trainingSamples[:, 1] <= latitudeUpperBound)
+        patchSamples = trainingSamples[isInside]
+        if shouldOptimize and len(patchSamples) > GaussianProcessRegressorInterpolator.optimizationSampleAmount:
+            patchSamples = patchSamples[nu.random.default_rng(0).choice(len(patchSamples), GaussianProcessRegressorInterpolator.optimizationSampleAmount, replace=False)]
+        model = GaussianProcessRegressor(kernel=kernel, optimizer='fmin_l_bfgs_b' if shouldOptimize else None, normalize_y=True)
+        model.fit(patchSamples[:, :-1] * GaussianProcessRegressorInterpolator.axesScales, patchSamples[:, -1])
+        return model
@@ -0,0 +1,147 @@
+import datetime as dt
+import multiprocessing as mp
+import json
+import os
+import re
+import socket
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib.error import URLError, HTTPError, ContentTooShortError
+
+
+# Keeps connections to the GFS server alive and reuses them for every file, instead of paying a process start and a TCP/TLS handshake per file.
+# Failures are raised as the urllib errors the download loop already handles; timeouts as mp.TimeoutError.
+# https://requests.readthedocs.io/en/latest/user/advanced/#session-objects
+class GribDownloader():
+
+    # class properties
+    concurrency = 4
+    chunkSize = 1024*128
+    connectTimeout = 30 # seconds
+    stallTimeout = 90 # seconds without receiving any byte
+    partFileExtension = '.part'
+    markerFileExtension = '.json'
+    contentRangePattern = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+    def __init__(self, concurrency=None):
+        self.concurrency = GribDownloader.concurrency if concurrency is None else concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+
+    # MARK: - Public Methods
+
+    def getText(self, url):
+        with self.__request(url) as response:
+            return response.text
+
+
+    # stream the body (or the inclusive byte ranges of it, in order) to storePath chunk by chunk.
+    # timeout is the wall-clock limit of the whole download; it is checked cooperatively after every chunk.
+    # Bytes go to a '.part' file next to a json marker, so a failed download resumes from its last byte on the next call.
+    # The file is moved to storePath only after its size (and validator, if given) checks out.
+    def download(self, url, storePath, timeout, byteRanges=None, validator=None):
+        startTime = dt.datetime.utcnow()
+        partPath = f'{storePath}{GribDownloader.partFileExtension}'
+        markerPath = f'{partPath}{GribDownloader.markerFileExtension}'
+        requestedRanges = [[0, None]] if byteRanges is None else [ [start, end] for start, end in byteRanges ]
+        # resume only a part of the same request
+        marker = GribDownloader.__readMarker(markerPath)
+        if marker is None or marker['url'] != url or marker['requestedRanges'] != requestedRanges or not os.path.exists(partPath):
+            marker = {'url': url, 'requestedRanges': requestedRanges, 'byteRanges': [ list(byteRange) for byteRange in requestedRanges ]}
+            open(partPath, 'wb').close()
+            GribDownloader.__writeMarker(markerPath, marker)
+        writtenSize = os.path.getsize(partPath)
+
+        with open(partPath, 'ab') as file:
+            rangeStartInFile = 0
+            for byteRange in marker['byteRanges']:
+                start, end = byteRange
+                if end is not None and writtenSize >= rangeStartInFile + end - start + 1: # downloaded before
+                    rangeStartInFile += end - start + 1
+                    continue
+                offset = writtenSize - rangeStartInFile
+                with self.__request(url, headers={'Range': f"bytes={start+offset}-{'' if end is None else end}"}) as response:
+                    if response.status_code == 206:
+                        # resolve open ranges from 'Content-Range: bytes start-end/size'
+                        contentRangeMatch = GribDownloader.contentRangePattern.match(response.headers.get('Content-Range', '').strip())
+                        if contentRangeMatch is None or int(contentRangeMatch.group(1)) != start + offset:
+                            raise URLError(f"{url} answered the range bytes={start+offset}- with Content-Range '{response.headers.get('Content-Range')}'")
+                        if end is None:
+                            end = int(contentRangeMatch.group(2))
+                            byteRange[1] = end
+                            GribDownloader.__writeMarker(markerPath, marker)
+                    elif byteRanges is None: # server ignored Range, so the whole body comes again
+                        file.seek(0)
+                        file.truncate()
+                        writtenSize = 0
+                        if 'Content-Length' in response.headers:
+                            end = int(response.headers['Content-Length']) - 1
+                            byteRange[1] = end
+                            GribDownloader.__writeMarker(markerPath, marker)
+                    else:
+                        raise URLError(f"range requests are not supported by {url}")
+                    try:
+                        # read1 hands over whatever has arrived, so bytes received before a drop still reach the part file.
+                        while True:
+                            chunk = response.raw.read1(GribDownloader.chunkSize)
+                            if not chunk:
+                                break
+                            file.write(chunk)
+                            writtenSize += len(chunk)
+                            if (dt.datetime.utcnow() - startTime).total_seconds() > timeout:
+                                raise mp.TimeoutError
+                    except (urllib3.exceptions.ReadTimeoutError, socket.timeout) as error: # stalled mid-body
+                        raise mp.TimeoutError
+                    except (urllib3.exceptions.HTTPError, ConnectionError) as error: # dropped mid-body
+                        raise URLError(f"{error}")
+                if end is not None and writtenSize != rangeStartInFile + end - start + 1:
+                    raise ContentTooShortError(f"{url} ended at byte {writtenSize} of the part instead of {rangeStartInFile + end - start + 1}", None)
+                rangeStartInFile = writtenSize
+
+        # publish
+        if validator is not None and not validator(partPath):
+            os.remove(partPath)
+            os.remove(markerPath)
+            raise ContentTooShortError(f"{url} failed the integrity check", None)
+        os.replace(partPath, storePath)
+        os.remove(markerPath)
+
+
+    def close(self):
+        self.session.close()
+
+
+    # MARK: - Helper Custom Private methods
+
+    def __request(self, url, headers=None):
+        try:
+            response = self.session.get(url, headers=headers, stream=True, timeout=(GribDownloader.connectTimeout, GribDownloader.stallTimeout))
+        except requests.exceptions.Timeout as error:
+            raise mp.TimeoutError
+        except requests.exceptions.RequestException as error:
+            raise URLError(f"{error}")
+        if response.status_code >= 400:
+            response.close()
+            raise HTTPError(url, response.status_code, response.reason, response.headers, None)
+        return response
+
+
+    @classmethod
+    def __readMarker(cls, markerPath):
+        try:
+            with open(markerPath, 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+
+    @classmethod
+    def __writeMarker(cls, markerPath, marker):
+        with open(f'{markerPath}.tmp', 'w') as file:
+            json.dump(marker, file)
+        os.replace(f'{markerPath}.tmp', markerPath)
@@ -0,0 +1,112 @@
+import numpy as nu
+import pandas as pd
+from bisect import bisect_right
+
+from Spot4DClass import Spot4D
+from WeatherReportClass import WeatherReport
+
+
+# GFS reports are distributed on a regular longitude/latitude grid with fixed altitude levels and time slices,
+# so the enclosing cell of a query can be found by index arithmetic instead of a Delaunay triangulation.
+# https://en.wikipedia.org/wiki/Multilinear_interpolation
+class GridInterpolator():
+    def __init__(self, trainingSamples_uWind, trainingSamples_vWind, timeStandard):
+        self.timeStandard = timeStandard
+        # get axes: longitude, latitude, altitude, time, over the points of both components, so neither is placed on a lattice it isn't on
+        self.axes = [ nu.unique(nu.concatenate([trainingSamples_uWind[:, axisIndex], trainingSamples_vWind[:, axisIndex]])) for axisIndex in range(4) ]
+        shape = tuple(len(axis) for axis in self.axes)
+        # dump samples into the grid, the last dimension holds uWind and vWind. Cells no sample covers stay nan.
+        self.values = nu.full(shape + (2,), nu.nan)
+        self.values[self.__getGridIndexes(trainingSamples_uWind) + (0,)] = trainingSamples_uWind[:, -1]
+        self.values[self.__getGridIndexes(trainingSamples_vWind) + (1,)] = trainingSamples_vWind[:, -1]
+        self.__uWinds = nu.ascontiguousarray(self.values[..., 0]).reshape(-1)
+        self.__vWinds = nu.ascontiguousarray(self.values[..., 1]).reshape(-1)
+        # flattened offsets of the 16 cell vertexes from the lower vertex
+        strides = [ int(nu.prod(shape[axisIndex+1:])) for axisIndex in range(4) ]
+        self.__vertexesBits = [ [(vertexIndex >> (3-axisIndex)) & 1 for axisIndex in range(4)] for vertexIndex in range(16) ]
+        self.__vertexesOffset = [ sum(bits[axisIndex] * strides[axisIndex] for axisIndex in range(4) if shape[axisIndex] > 1) for bits in self.__vertexesBits ]
+        self.__strides = strides
+        # python copies for the single spot path, where numpy's per-call overhead dominates
+        self.__axesList = [ axis.tolist() for axis in self.axes ]
+        self.__uWindsList = self.__uWinds.tolist()
+        self.__vWindsList = self.__vWinds.tolist()
+
+
+    @classmethod
+    def initFromWeatherReportCaches(cls, pastWeatherReport, futureWeatherReport, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound):
+        # get training samples for uWind and vWind at once
+        trainingSamples = WeatherReport.getSamplesForTrainingFromWeatherReportPair(pastWeatherReport, futureWeatherReport, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound)
+
+        return cls(
+            trainingSamples_uWind=trainingSamples['u'],
+            trainingSamples_vWind=trainingSamples['v'],
+            timeStandard=pastWeatherReport.date
+        )
+
+
+    def predict(self, spot):
+        return self.__interpolateSingleSpot((spot.longitude, spot.latitude, spot.altitude, (spot.time-self.timeStandard).total_seconds()))
+
+
+    def predictFromSpot_flattenedArray(self, array):
+        winds = self.__interpolate(nu.asarray(array, dtype='float').reshape(-1, 4))
+        return winds[:, 0], winds[:, 1]
+
+
+    # longitude, latitude, altitude, time
+    def predictFromSpots_ndarray(self, spotsNdarray):
+        winds = self.__interpolate(nu.asarray(spotsNdarray, dtype='float').reshape(-1, 4))
+        return winds[:, 0], winds[:, 1]
+
+
+    # MARK: - Helper Custom Private methods
+
+    def __getGridIndexes(self, trainingSamples):
+        return tuple(nu.searchsorted(self.axes[axisIndex], trainingSamples[:, axisIndex]) for axisIndex in range(4))
+
+
+    def __interpolateSingleSpot(self, coordinates):
+        lowerVertexFlattenedIndex = 0
+        axesWeights = []
+        for axisIndex, (axis, coordinate) in enumerate(zip(self.__axesList, coordinates)):
+            if not axis[0] <= coordinate <= axis[-1]:
+                return nu.nan, nu.nan
+            if len(axis) == 1:
+                axesWeights.append((1.0, 0.0))
+                continue
+            index = min(max(bisect_right(axis, coordinate) - 1, 0), len(axis)-2)
+            lowerVertexFlattenedIndex += index * self.__strides[axisIndex]
+            ratio = (coordinate - axis[index]) / (axis[index+1] - axis[index])
+            axesWeights.append((1.0 - ratio, ratio))
+        uWind, vWind = 0.0, 0.0
+        for bits, offset in zip(self.__vertexesBits, self.__vertexesOffset):
+            weight = axesWeights[0][bits[0]] * axesWeights[1][bits[1]] * axesWeights[2][bits[2]] * axesWeights[3][bits[3]]
+            uWind += weight * self.__uWindsList[lowerVertexFlattenedIndex + offset]
+            vWind += weight * self.__vWindsList[lowerVertexFlattenedIndex + offset]
+        return uWind, vWind
+
+
+    # returns (N, 2) array of uWind and vWind. Spots outside the grid get nan, as griddata does.
+    def __interpolate(self, spotsNdarray):
+        lowerVertexesFlattenedIndex = nu.zeros(spotsNdarray.shape[0], dtype='int')
+        isOutside = nu.zeros(spotsNdarray.shape[0], dtype='bool')
+        axesWeights = [] # (lower vertex weight, upper vertex weight) along each axis
+        for axisIndex, axis in enumerate(self.axes):
+            coordinates = spotsNdarray[:, axisIndex]
+            isOutside |= ~((axis[0] <= coordinates) & (coordinates <= axis[-1]))
+            if len(axis) == 1:
+                axesWeights.append((1.0, 0.0))
+                continue
+            indexes = nu.clip(nu.searchsorted(axis, coordinates, side='right') - 1, 0, len(axis)-2)
+            lowerVertexesFlattenedIndex += indexes * self.__strides[axisIndex]
+            ratios = (coordinates - axis[indexes]) / (axis[indexes+1] - axis[indexes])
+            axesWeights.append((1.0 - ratios, ratios))
+        # accumulate the 16 vertexes weighted by their opposite sub-volumes
+        winds = nu.zeros((spotsNdarray.shape[0], 2))
+        for bits, offset in zip(self.__vertexesBits, self.__vertexesOffset):
+            weights = axesWeights[0][bits[0]] * axesWeights[1][bits[1]] * axesWeights[2][bits[2]] * axesWeights[3][bits[3]]
+            indexes = lowerVertexesFlattenedIndex + offset
+            winds[:, 0] += weights * self.__uWinds.take(indexes)
+            winds[:, 1] += weights * self.__vWinds.take(indexes)
+        winds[isOutside, :] = nu.nan
+        return winds
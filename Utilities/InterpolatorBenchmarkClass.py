@@ -0,0 +1,205 @@
+import numpy as nu
+import datetime as dt
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from SyntheticGFSDistributionGeneratorClass import SyntheticGFSDistributionGenerator
+from WeatherReportClass import WeatherReport
+from WeatherTileCacheClass import WeatherTileCache
+from Spot4DClass import Spot4D
+from GridInterpolatorClass import GridInterpolator
+from LinearInterpolatorClass import LinearInterpolator
+from RbfInterpolatorClass import RbfInterpolator
+from GaussianProcessRegressorInterpolatorClass import GaussianProcessRegressorInterpolator
+
+
+# Benchmarks every interpolator on a synthetic distribution written to a temporary storage dir:
+# load time of the report pair (reading the training box), then per engine train time, single-query latency, batch throughput
+# and peak traced memory of training, traced in a separate untimed pass.
+# Results are written as json, so runs can be diffed to catch regressions.
+class InterpolatorBenchmark():
+
+    # class properties
+    engineNames = ['Grid', 'TiledGrid', 'Linear', 'Rbf', 'GaussianProcessRegressor']
+    engineClasses = {
+        'Grid': GridInterpolator,
+        'Linear': LinearInterpolator,
+        'Rbf': RbfInterpolator,
+        'GaussianProcessRegressor': GaussianProcessRegressorInterpolator
+    }
+    longitudeMargin = 5.0 # degree, as WeatherReportLocalProcessor
+    latitudeMargin = 5.0 # degree
+    singleQueryAmount = 200
+    batchQueryAmount = 10000
+    distributionDate = dt.datetime(2021, 1, 1, 0)
+
+
+    # generator defaults to a SyntheticGFSDistributionGenerator of its default grid
+    def __init__(self, generator=None, engineNames=None, longitudeMargin=None, latitudeMargin=None, singleQueryAmount=None, batchQueryAmount=None, seed=0):
+        self.generator = SyntheticGFSDistributionGenerator(seed=seed) if generator is None else generator
+        self.engineNames = InterpolatorBenchmark.engineNames if engineNames is None else engineNames
+        self.longitudeMargin = InterpolatorBenchmark.longitudeMargin if longitudeMargin is None else longitudeMargin
+        self.latitudeMargin = InterpolatorBenchmark.latitudeMargin if latitudeMargin is None else latitudeMargin
+        self.singleQueryAmount = InterpolatorBenchmark.singleQueryAmount if singleQueryAmount is None else singleQueryAmount
+        self.batchQueryAmount = InterpolatorBenchmark.batchQueryAmount if batchQueryAmount is None else batchQueryAmount
+        self.randomGenerator = nu.random.default_rng(seed)
+
+
+    # MARK: - Public Methods
+
+    # generate the distribution under storageDirPath (a temporary dir if None) and run every engine on it.
+    # The storage paths are restored afterwards.
+    def run(self, storageDirPath=None):
+        previousStorageDirPath = WeatherReportProcessorBase.GFSWeatherReportsStorageDirPath
+        try:
+            with tempfile.TemporaryDirectory() as temporaryDirPath:
+                WeatherReportProcessorBase.setStorageDirPath(temporaryDirPath if storageDirPath is None else storageDirPath)
+                return self.__run()
+        finally:
+            WeatherReportProcessorBase.setStorageDirPath(previousStorageDirPath)
+
+
+    def benchmarkEngine(self, engineName, pastWeatherReport, futureWeatherReport, bounds, spotsNdarray):
+        # train
+        startTime = time.perf_counter()
+        interpolator = InterpolatorBenchmark.train(engineName, pastWeatherReport, futureWeatherReport, bounds)
+        trainSeconds = time.perf_counter() - startTime
+        # again, tracing python and numpy allocations, which slows it down too much to be timed
+        tracemalloc.start()
+        InterpolatorBenchmark.train(engineName, pastWeatherReport, futureWeatherReport, bounds)
+        _, trainPeakMemoryBytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # single queries, as the aircraft asks one spot at a time
+        spots = [ Spot4D(interpolator.timeStandard + dt.timedelta(seconds=float(seconds)), longitude, latitude, altitude) for longitude, latitude, altitude, seconds in spotsNdarray[:self.singleQueryAmount].tolist() ]
+        latencies = nu.empty(len(spots))
+        for index, spot in enumerate(spots):
+            startTime = time.perf_counter()
+            interpolator.predict(spot)
+            latencies[index] = time.perf_counter() - startTime
+        # one batch
+        batchSpotsNdarray = spotsNdarray[:self.batchQueryAmount]
+        startTime = time.perf_counter()
+        uWinds, vWinds = interpolator.predictFromSpots_ndarray(batchSpotsNdarray)[:2]
+        batchSeconds = time.perf_counter() - startTime
+        return {
+            'trainSeconds': trainSeconds,
+            'trainPeakMemoryBytes': trainPeakMemoryBytes,
+            'singleQueryLatencySeconds': {
+                'median': float(nu.median(latencies)),
+                'p95': float(nu.percentile(latencies, 95)),
+                'max': float(latencies.max())
+            },
+            'batchQueryAmount': len(batchSpotsNdarray),
+            'batchSeconds': batchSeconds,
+            'batchThroughputSpotsPerSecond': len(batchSpotsNdarray) / batchSeconds,
+            'batchNanRatio': float(nu.mean(nu.isnan(uWinds) | nu.isnan(vWinds)))
+        }
+
+
+    # MARK: - Custom Public Helper Functions
+
+    # a new interpolator of the engine; TiledGrid starts from an empty tile cache, GaussianProcessRegressor from the initial kernel
+    @classmethod
+    def train(cls, engineName, pastWeatherReport, futureWeatherReport, bounds):
+        if engineName == 'GaussianProcessRegressor':
+            GaussianProcessRegressorInterpolator.clearKernels()
+        if engineName == 'TiledGrid':
+            return WeatherTileCache().getTiledGridInterpolator(pastWeatherReport, futureWeatherReport, *bounds)
+        return InterpolatorBenchmark.engineClasses[engineName].initFromWeatherReportCaches(pastWeatherReport, futureWeatherReport, *bounds)
+
+
+    # (N, 4) longitude, latitude, altitude, seconds from the past report, uniformly inside the box and window
+    def getRandomSpotsNdarray(self, amount, bounds, windowSeconds):
+        longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound = bounds
+        return nu.column_stack([
+            self.randomGenerator.uniform(longitudeLowerBound, longitudeUpperBound, amount),
+            self.randomGenerator.uniform(latitudeLowerBound, latitudeUpperBound, amount),
+            self.randomGenerator.uniform(10, 100, amount),
+            self.randomGenerator.uniform(0, windowSeconds, amount)
+        ])
+
+
+    @classmethod
+    def getEnvironment(cls):
+        return {
+            'python': platform.python_version(),
+            'numpy': nu.__version__,
+            'platform': platform.platform(),
+            'cpuCount': os.cpu_count()
+        }
+
+
+    # MARK: - Helper Custom Private methods
+
+    def __run(self):
+        self.generator.generate(InterpolatorBenchmark.distributionDate, forecastTimeAmount=2)
+        results = {
+            'createdAt': dt.datetime.now(dt.timezone.utc).isoformat(timespec='seconds'),
+            'environment': InterpolatorBenchmark.getEnvironment(),
+            'grid': {
+                'latitudeAmount': len(self.generator.latitudes),
+                'longitudeAmount': len(self.generator.longitudes),
+                'resolution': self.generator.resolution
+            }
+        }
+        # box around the grid center, as the local processor trains for an aircraft there
+        centerLongitude = (self.generator.longitudes[0] + self.generator.longitudes[-1]) / 2
+        centerLatitude = (self.generator.latitudes[0] + self.generator.latitudes[-1]) / 2
+        bounds = (centerLongitude - self.longitudeMargin, centerLongitude + self.longitudeMargin, centerLatitude - self.latitudeMargin, centerLatitude + self.latitudeMargin)
+        results['box'] = dict(zip(['longitudeLowerBound', 'longitudeUpperBound', 'latitudeLowerBound', 'latitudeUpperBound'], bounds))
+        # load. The reports only map the cube, so the box is copied out to read it; the distribution was just written, so it comes from the page cache.
+        pastTime = InterpolatorBenchmark.distributionDate
+        futureTime = pastTime + dt.timedelta(hours=3)
+        startTime = time.perf_counter()
+        pastWeatherReport = WeatherReport.initFromCenterSpotAtFixTime(Spot4D(pastTime, 0, 0, 0))
+        futureWeatherReport = WeatherReport.initFromCenterSpotAtFixTime(Spot4D(futureTime, 0, 0, 0))
+        loadedBytes = sum(nu.array(weatherReport.getCroppedWeatherReport(*bounds).winds).nbytes for weatherReport in [pastWeatherReport, futureWeatherReport])
+        results['load'] = {
+            'seconds': time.perf_counter() - startTime,
+            'bytes': loadedBytes
+        }
+        spotsNdarray = self.getRandomSpotsNdarray(max(self.singleQueryAmount, self.batchQueryAmount), bounds, (futureTime - pastTime).total_seconds())
+        results['engines'] = {}
+        for engineName in self.engineNames:
+            try:
+                results['engines'][engineName] = self.benchmarkEngine(engineName, pastWeatherReport, futureWeatherReport, bounds, spotsNdarray)
+            except Exception as error:
+                print(f"Warning: benchmark of {engineName} failed: {error!r}; Skipping ...")
+                results['engines'][engineName] = {'error': repr(error)}
+        return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the interpolators on a synthetic GFS distribution.')
+    parser.add_argument('--output', default=None, help='json file to write the results to; stdout if omitted')
+    parser.add_argument('--engines', nargs='+', default=InterpolatorBenchmark.engineNames, choices=InterpolatorBenchmark.engineNames)
+    parser.add_argument('--gridSpan', type=float, default=20.0, help='degree of latitude and longitude the distribution covers')
+    parser.add_argument('--resolution', type=float, default=SyntheticGFSDistributionGenerator.resolution, help='degree between grid points')
+    parser.add_argument('--margin', type=float, default=InterpolatorBenchmark.longitudeMargin, help='degree of the training box around the grid center')
+    parser.add_argument('--batchQueryAmount', type=int, default=InterpolatorBenchmark.batchQueryAmount)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    generator = SyntheticGFSDistributionGenerator(
+        latitudeLowerBound=SyntheticGFSDistributionGenerator.latitudeLowerBound,
+        latitudeUpperBound=SyntheticGFSDistributionGenerator.latitudeLowerBound + arguments.gridSpan,
+        longitudeLowerBound=SyntheticGFSDistributionGenerator.longitudeLowerBound,
+        longitudeUpperBound=SyntheticGFSDistributionGenerator.longitudeLowerBound + arguments.gridSpan,
+        resolution=arguments.resolution,
+        seed=arguments.seed
+    )
+    benchmark = InterpolatorBenchmark(generator=generator, engineNames=arguments.engines, longitudeMargin=arguments.margin, latitudeMargin=arguments.margin, batchQueryAmount=arguments.batchQueryAmount, seed=arguments.seed)
+    results = benchmark.run()
+    if arguments.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        print("")
+    else:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
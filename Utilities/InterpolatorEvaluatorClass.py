@@ -0,0 +1,271 @@
+import numpy as nu
+import datetime as dt
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from SyntheticGFSDistributionGeneratorClass import SyntheticGFSDistributionGenerator
+from WeatherReportClass import WeatherReport
+from Spot4DClass import Spot4D
+from GridInterpolatorClass import GridInterpolator
+from LinearInterpolatorClass import LinearInterpolator
+from RbfInterpolatorClass import RbfInterpolator
+from GaussianProcessRegressorInterpolatorClass import GaussianProcessRegressorInterpolator
+
+
+# Scores the interpolators against decoded winds they were not trained on, next to what they cost:
+#   'gridPoints' holds out grid columns (every level and time) near the center spot, split into foldAmount folds,
+#   'gridLines' holds out every other longitude and latitude line, so a complete lattice of twice the step is left for training,
+#   'levels' holds out one inner altitude level per fold, so 10 m and 100 m are never extrapolated,
+#   'times' trains on the past and the following report, 6 hours apart, and predicts the future one in between.
+# Errors are taken over held-out samples within evaluationMargin of the center spot, so training boxes of different margins compare fairly.
+# Folds run in worker processes, so fit and query times are measured under contention when workerAmount > 1.
+class InterpolatorEvaluator():
+
+    # class properties
+    engineNames = ['Grid', 'Linear', 'Rbf', 'GaussianProcessRegressor']
+    engineClasses = {
+        'Grid': GridInterpolator,
+        'Linear': LinearInterpolator,
+        'Rbf': RbfInterpolator,
+        'GaussianProcessRegressor': GaussianProcessRegressorInterpolator
+    }
+    holdoutNames = ['gridPoints', 'gridLines', 'levels', 'times']
+    # holdoutName: engines it can't score. Grid needs a complete lattice, which scattered held-out columns break.
+    unsupportedEngineNames = {'gridPoints': ['Grid']}
+    margins = [5.0] # degree of the training box around the center spot, as WeatherReportLocalProcessor
+    evaluationMargin = 1.0 # degree
+    foldAmount = 5
+    workerAmount = os.cpu_count()
+
+
+    # followingWeatherReport is the one 3 hours after futureWeatherReport, only needed by 'times'.
+    def __init__(self, centerSpot, pastWeatherReport, futureWeatherReport, followingWeatherReport=None, engineNames=None, evaluationMargin=None, foldAmount=None, workerAmount=None, seed=0):
+        self.centerSpot = centerSpot
+        self.pastWeatherReport = pastWeatherReport
+        self.futureWeatherReport = futureWeatherReport
+        self.followingWeatherReport = followingWeatherReport
+        self.engineNames = InterpolatorEvaluator.engineNames if engineNames is None else engineNames
+        self.evaluationMargin = InterpolatorEvaluator.evaluationMargin if evaluationMargin is None else evaluationMargin
+        self.foldAmount = InterpolatorEvaluator.foldAmount if foldAmount is None else foldAmount
+        self.workerAmount = InterpolatorEvaluator.workerAmount if workerAmount is None else workerAmount
+        self.randomGenerator = nu.random.default_rng(seed)
+
+
+    # the reports of the window spot lies in, and the following one if a distribution covers it.
+    @classmethod
+    def initFromSpot(cls, spot, **kwargs):
+        timeBefore, timeAfter = spot.getTimeBounds()
+        pastWeatherReport = WeatherReport.initFromCenterSpotAtFixTime(Spot4D(timeBefore, spot.longitude, spot.latitude, spot.altitude))
+        futureWeatherReport = WeatherReport.initFromCenterSpotAtFixTime(Spot4D(timeAfter, spot.longitude, spot.latitude, spot.altitude))
+        followingTime = timeAfter + dt.timedelta(hours=3)
+        try:
+            followingWeatherReport = WeatherReport.initFromCenterSpotAtFixTime(Spot4D(followingTime, spot.longitude, spot.latitude, spot.altitude))
+        except FileNotFoundError as error:
+            print(f"Warning: {followingTime} is covered by none of the distribution; 'times' can't be evaluated.")
+            followingWeatherReport = None
+        return cls(spot, pastWeatherReport, futureWeatherReport, followingWeatherReport=followingWeatherReport, **kwargs)
+
+
+    # MARK: - Public Methods
+
+    # evaluate every engine for every holdout and margin (degree, for both longitude and latitude); a json serializable dict.
+    def run(self, holdoutNames=None, margins=None):
+        holdoutNames = InterpolatorEvaluator.holdoutNames if holdoutNames is None else holdoutNames
+        margins = InterpolatorEvaluator.margins if margins is None else margins
+        # (holdoutName, margin, engineName): [fold arguments]
+        tasks = {}
+        for holdoutName in holdoutNames:
+            if holdoutName == 'times' and self.followingWeatherReport is None:
+                print(f"Warning: no report follows {self.futureWeatherReport.date}; Skipping 'times' ...")
+                continue
+            for margin in margins:
+                folds = self.getFolds(holdoutName, margin, margin)
+                for engineName in self.engineNames:
+                    tasks[(holdoutName, margin, engineName)] = [] if engineName in InterpolatorEvaluator.unsupportedEngineNames.get(holdoutName, []) else [ (engineName,) + fold for fold in folds ]
+        # run the folds of all tasks together, so the workers stay busy
+        foldsArguments = [ foldArguments for foldsArguments in tasks.values() for foldArguments in foldsArguments ]
+        if self.workerAmount > 1:
+            with ProcessPoolExecutor(max_workers=self.workerAmount) as executor:
+                foldResults = list(executor.map(InterpolatorEvaluator.evaluateFold, *zip(*foldsArguments)))
+        else:
+            foldResults = [ InterpolatorEvaluator.evaluateFold(*foldArguments) for foldArguments in foldsArguments ]
+        results = {
+            'createdAt': dt.datetime.now(dt.timezone.utc).isoformat(timespec='seconds'),
+            'centerSpot': {'time': self.centerSpot.time.isoformat(), 'longitude': self.centerSpot.longitude, 'latitude': self.centerSpot.latitude, 'altitude': self.centerSpot.altitude},
+            'evaluationMargin': self.evaluationMargin,
+            'workerAmount': self.workerAmount,
+            'evaluations': []
+        }
+        startIndex = 0
+        for (holdoutName, margin, engineName), foldsArguments in tasks.items():
+            if len(foldsArguments) == 0:
+                results['evaluations'].append({'holdout': holdoutName, 'engine': engineName, 'longitudeMargin': margin, 'latitudeMargin': margin, 'isSupported': False})
+                continue
+            evaluation = InterpolatorEvaluator.getAggregatedFoldResults(foldResults[startIndex:startIndex + len(foldsArguments)])
+            startIndex += len(foldsArguments)
+            results['evaluations'].append(dict({'holdout': holdoutName, 'engine': engineName, 'longitudeMargin': margin, 'latitudeMargin': margin, 'isSupported': True}, **evaluation))
+        return results
+
+
+    # [(trainingSamples_uWind, trainingSamples_vWind, timeStandard, testSamples)] of the holdout, testSamples being (N, 6) longitude, latitude, altitude, time, uWind, vWind.
+    def getFolds(self, holdoutName, longitudeMargin, latitudeMargin):
+        bounds = (self.centerSpot.longitude - longitudeMargin, self.centerSpot.longitude + longitudeMargin, self.centerSpot.latitude - latitudeMargin, self.centerSpot.latitude + latitudeMargin)
+        if holdoutName == 'times':
+            trainingSamples = InterpolatorEvaluator.getSamples(self.pastWeatherReport, self.followingWeatherReport, bounds)
+            heldOutSamples = InterpolatorEvaluator.getSamples(self.pastWeatherReport, self.futureWeatherReport, bounds)
+            testSamples = heldOutSamples[(heldOutSamples[:, 3] > 0) & self.__isInsideEvaluationBox(heldOutSamples)]
+            return [(trainingSamples[:, [0, 1, 2, 3, 4]], trainingSamples[:, [0, 1, 2, 3, 5]], self.pastWeatherReport.date, testSamples)]
+
+        samples = InterpolatorEvaluator.getSamples(self.pastWeatherReport, self.futureWeatherReport, bounds)
+        isInsideEvaluationBox = self.__isInsideEvaluationBox(samples)
+        if holdoutName == 'gridPoints':
+            # shuffle the grid columns of the evaluation box into folds
+            _, columnIndexes = nu.unique(samples[:, :2], axis=0, return_inverse=True)
+            columnIndexes = columnIndexes.reshape(-1)
+            columnFoldIndexes = self.randomGenerator.permutation(columnIndexes.max() + 1) % self.foldAmount
+            foldIndexes = nu.where(isInsideEvaluationBox, columnFoldIndexes[columnIndexes], -1)
+        elif holdoutName == 'gridLines':
+            # one fold trains on the even lines and one on the odd lines; the rest of the evaluation box is held out
+            longitudeLineIndexes = nu.unique(samples[:, 0], return_inverse=True)[1].reshape(-1)
+            latitudeLineIndexes = nu.unique(samples[:, 1], return_inverse=True)[1].reshape(-1)
+            folds = []
+            for parity in [0, 1]:
+                isTraining = (longitudeLineIndexes % 2 == parity) & (latitudeLineIndexes % 2 == parity)
+                trainingSamples = samples[isTraining]
+                folds.append((trainingSamples[:, [0, 1, 2, 3, 4]], trainingSamples[:, [0, 1, 2, 3, 5]], self.pastWeatherReport.date, samples[~isTraining & isInsideEvaluationBox]))
+            return folds
+        elif holdoutName == 'levels':
+            altitudes = nu.unique(samples[:, 2])
+            foldIndexes = nu.searchsorted(altitudes[1:-1], samples[:, 2])
+            foldIndexes[(samples[:, 2] == altitudes[0]) | (samples[:, 2] == altitudes[-1])] = -1
+        else:
+            raise ValueError(f"holdoutName must be one of {InterpolatorEvaluator.holdoutNames}, not '{holdoutName}'")
+        folds = []
+        for foldIndex in range(foldIndexes.max() + 1):
+            isHeldOut = foldIndexes == foldIndex
+            trainingSamples = samples[~isHeldOut]
+            folds.append((trainingSamples[:, [0, 1, 2, 3, 4]], trainingSamples[:, [0, 1, 2, 3, 5]], self.pastWeatherReport.date, samples[isHeldOut & isInsideEvaluationBox]))
+        return folds
+
+
+    # MARK: - Custom Public Helper Functions
+
+    # fit the engine and predict testSamples; runs in a worker process, so everything passed in and out is picklable.
+    # The kernels a GP fit shares with later ones are cleared first, so every fold optimizes its own and is timed doing it.
+    @classmethod
+    def evaluateFold(cls, engineName, trainingSamples_uWind, trainingSamples_vWind, timeStandard, testSamples):
+        try:
+            if engineName == 'GaussianProcessRegressor':
+                GaussianProcessRegressorInterpolator.clearKernels()
+            startTime = time.perf_counter()
+            interpolator = InterpolatorEvaluator.engineClasses[engineName](trainingSamples_uWind=trainingSamples_uWind, trainingSamples_vWind=trainingSamples_vWind, timeStandard=timeStandard)
+            fitSeconds = time.perf_counter() - startTime
+            startTime = time.perf_counter()
+            uWinds, vWinds = interpolator.predictFromSpots_ndarray(testSamples[:, :4])[:2]
+            querySeconds = time.perf_counter() - startTime
+        except Exception as error:
+            return {'error': f"{engineName}: {error!r}"}
+        isPredicted = ~(nu.isnan(uWinds) | nu.isnan(vWinds))
+        uErrors = uWinds[isPredicted] - testSamples[isPredicted, 4]
+        vErrors = vWinds[isPredicted] - testSamples[isPredicted, 5]
+        speedErrors = nu.hypot(uWinds[isPredicted], vWinds[isPredicted]) - nu.hypot(testSamples[isPredicted, 4], testSamples[isPredicted, 5])
+        # wrapped into [-180, 180)
+        directionErrors = (nu.degrees(nu.arctan2(uWinds[isPredicted], vWinds[isPredicted]) - nu.arctan2(testSamples[isPredicted, 4], testSamples[isPredicted, 5])) + 180) % 360 - 180
+        return {
+            'trainingSampleAmount': len(trainingSamples_uWind),
+            'heldOutAmount': len(testSamples),
+            'predictedAmount': int(nu.count_nonzero(isPredicted)),
+            'fitSeconds': fitSeconds,
+            'querySeconds': querySeconds,
+            'squaredErrorSums': {
+                'u': float(nu.sum(uErrors**2)),
+                'v': float(nu.sum(vErrors**2)),
+                'speed': float(nu.sum(speedErrors**2)),
+                'directionDegrees': float(nu.sum(directionErrors**2))
+            }
+        }
+
+
+    @classmethod
+    def getAggregatedFoldResults(cls, foldResults):
+        errors = [ foldResult['error'] for foldResult in foldResults if 'error' in foldResult ]
+        foldResults = [ foldResult for foldResult in foldResults if 'error' not in foldResult ]
+        predictedAmount = sum(foldResult['predictedAmount'] for foldResult in foldResults)
+        heldOutAmount = sum(foldResult['heldOutAmount'] for foldResult in foldResults)
+        evaluation = {
+            'foldAmount': len(foldResults),
+            'heldOutAmount': heldOutAmount,
+            # held-out samples the engine answered nan for, e.g. outside the convex hull; they are left out of the errors
+            'nanRatio': 1 - predictedAmount / heldOutAmount if heldOutAmount > 0 else None,
+            'meanTrainingSampleAmount': float(nu.mean([ foldResult['trainingSampleAmount'] for foldResult in foldResults ])) if len(foldResults) > 0 else None,
+            'meanFitSeconds': float(nu.mean([ foldResult['fitSeconds'] for foldResult in foldResults ])) if len(foldResults) > 0 else None,
+            'querySecondsPerSpot': sum(foldResult['querySeconds'] for foldResult in foldResults) / heldOutAmount if heldOutAmount > 0 else None
+        }
+        for errorName in ['u', 'v', 'speed', 'directionDegrees']:
+            evaluation[f'rmse_{errorName}'] = float(nu.sqrt(sum(foldResult['squaredErrorSums'][errorName] for foldResult in foldResults) / predictedAmount)) if predictedAmount > 0 else None
+        if len(errors) > 0:
+            evaluation['errors'] = errors
+        return evaluation
+
+
+    # (N, 6) longitude, latitude, altitude, time, uWind, vWind of both reports within bounds
+    @classmethod
+    def getSamples(cls, pastWeatherReport, futureWeatherReport, bounds):
+        trainingSamples = WeatherReport.getSamplesForTrainingFromWeatherReportPair(pastWeatherReport, futureWeatherReport, *bounds)
+        if not nu.array_equal(trainingSamples['u'][:, :4], trainingSamples['v'][:, :4]):
+            raise ValueError("uWind and vWind are decoded at different grid points")
+        return nu.column_stack([trainingSamples['u'], trainingSamples['v'][:, 4]])
+
+
+    # MARK: - Helper Custom Private methods
+
+    def __isInsideEvaluationBox(self, samples):
+        return (nu.abs(samples[:, 0] - self.centerSpot.longitude) <= self.evaluationMargin) & (nu.abs(samples[:, 1] - self.centerSpot.latitude) <= self.evaluationMargin)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evaluate the accuracy and cost of the interpolators on held-out winds.')
+    parser.add_argument('--output', default=None, help='json file to write the results to; stdout if omitted')
+    parser.add_argument('--engines', nargs='+', default=InterpolatorEvaluator.engineNames, choices=InterpolatorEvaluator.engineNames)
+    parser.add_argument('--holdouts', nargs='+', default=InterpolatorEvaluator.holdoutNames, choices=InterpolatorEvaluator.holdoutNames)
+    parser.add_argument('--margins', nargs='+', type=float, default=InterpolatorEvaluator.margins, help='degrees of the training box around the center spot')
+    parser.add_argument('--time', default=None, help=f'time of the center spot ({WeatherReportProcessorBase.weatherReportDirNameFormat}) in the configured storage; a synthetic distribution is evaluated if omitted')
+    parser.add_argument('--longitude', type=float, default=None)
+    parser.add_argument('--latitude', type=float, default=None)
+    parser.add_argument('--altitude', type=float, default=50.0)
+    parser.add_argument('--workers', type=int, default=InterpolatorEvaluator.workerAmount)
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+    if arguments.time is not None and (arguments.longitude is None or arguments.latitude is None):
+        parser.error("--longitude and --latitude are required with --time")
+    evaluatorArguments = {'engineNames': arguments.engines, 'workerAmount': arguments.workers, 'seed': arguments.seed}
+
+    if arguments.time is None:
+        with tempfile.TemporaryDirectory() as temporaryDirPath:
+            WeatherReportProcessorBase.setStorageDirPath(temporaryDirPath)
+            generator = SyntheticGFSDistributionGenerator(seed=arguments.seed)
+            distributionDate = dt.datetime(2021, 1, 1, 0)
+            generator.generate(distributionDate)
+            centerSpot = Spot4D(
+                distributionDate + dt.timedelta(hours=1),
+                (generator.longitudes[0] + generator.longitudes[-1]) / 2 if arguments.longitude is None else arguments.longitude,
+                (generator.latitudes[0] + generator.latitudes[-1]) / 2 if arguments.latitude is None else arguments.latitude,
+                arguments.altitude
+            )
+            results = InterpolatorEvaluator.initFromSpot(centerSpot, **evaluatorArguments).run(holdoutNames=arguments.holdouts, margins=arguments.margins)
+    else:
+        centerSpot = Spot4D(dt.datetime.strptime(arguments.time, WeatherReportProcessorBase.weatherReportDirNameFormat), arguments.longitude, arguments.latitude, arguments.altitude)
+        results = InterpolatorEvaluator.initFromSpot(centerSpot, **evaluatorArguments).run(holdoutNames=arguments.holdouts, margins=arguments.margins)
+
+    if arguments.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        print("")
+    else:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
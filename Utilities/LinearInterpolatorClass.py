@@ -1,35 +1,47 @@
 import numpy as nu
 import pandas as pd
-from scipy.interpolate import griddata
+from scipy.interpolate import griddata, LinearNDInterpolator
+from scipy.spatial import Delaunay
 
 from Spot4DClass import Spot4D
+from WeatherReportClass import WeatherReport
 
 
 # https://docs.scipy.org/doc/scipy/reference/generated/scipy.interpolate.griddata.html#scipy.interpolate.griddata
 class LinearInterpolator():
-    def __init__(self, trainingSamples_uWind, trainingSamples_vWind, timeStandard):
+
+    # class properties
+    # if True, triangulate once at initialization and reuse it for every query, otherwise triangulate on every query like griddata.
+    shouldPrepareModel = True
+
+
+    def __init__(self, trainingSamples_uWind, trainingSamples_vWind, timeStandard, shouldPrepareModel=None):
         self.trainingSamples_uWind = trainingSamples_uWind
         self.trainingSamples_vWind = trainingSamples_vWind
         self.timeStandard = timeStandard
+        self.isPrepared = LinearInterpolator.shouldPrepareModel if shouldPrepareModel is None else shouldPrepareModel
+        # prepared model
+        self.models = {}
+        if self.isPrepared:
+            self.__prepareModels()
 
 
     @classmethod
     def initFromWeatherReportCaches(cls, pastWeatherReport, futureWeatherReport, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound):
-        # get training samples for uWind
-        pastTrainingSamples_uWind = pastWeatherReport.getSamplesForTraining(secondsFromStart=0.0, categoryName='winds', componentName='u', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
-        futureTrainingSamples_uWind = futureWeatherReport.getSamplesForTraining(secondsFromStart=(futureWeatherReport.date - pastWeatherReport.date).total_seconds(), categoryName='winds', componentName='u', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
-        # get training samples for vWind
-        pastTrainingSamples_vWind = pastWeatherReport.getSamplesForTraining(secondsFromStart=0.0, categoryName='winds', componentName='v', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
-        futureTrainingSamples_vWind = futureWeatherReport.getSamplesForTraining(secondsFromStart=(futureWeatherReport.date - pastWeatherReport.date).total_seconds(), categoryName='winds', componentName='v', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
+        # get training samples for uWind and vWind at once
+        trainingSamples = WeatherReport.getSamplesForTrainingFromWeatherReportPair(pastWeatherReport, futureWeatherReport, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound)
 
         return cls(
-            trainingSamples_uWind=nu.concatenate([pastTrainingSamples_uWind, futureTrainingSamples_uWind]),
-            trainingSamples_vWind=nu.concatenate([pastTrainingSamples_vWind, futureTrainingSamples_vWind]),
+            trainingSamples_uWind=trainingSamples['u'],
+            trainingSamples_vWind=trainingSamples['v'],
             timeStandard=pastWeatherReport.date
         )
 
 
     def predict(self, spot):
+        if self.isPrepared:
+            uWinds, vWinds = self.__predictFromPreparedModels(nu.array([[spot.longitude, spot.latitude, spot.altitude, (spot.time-self.timeStandard).total_seconds()]]))
+            return uWinds[0], vWinds[0]
         return (
             griddata(points=self.trainingSamples_uWind[:, :-1], values=self.trainingSamples_uWind[:, -1], xi=(spot.longitude, spot.latitude, spot.altitude, (spot.time-self.timeStandard).total_seconds()), method='linear'),
             griddata(points=self.trainingSamples_vWind[:, :-1], values=self.trainingSamples_vWind[:, -1], xi=(spot.longitude, spot.latitude, spot.altitude, (spot.time-self.timeStandard).total_seconds()), method='linear')
@@ -37,6 +49,8 @@ class LinearInterpolator():
 
 
     def predictFromSpot_flattenedArray(self, array):
+        if self.isPrepared:
+            return self.__predictFromPreparedModels(array)
         return (
             griddata(points=self.trainingSamples_uWind[:, :-1], values=self.trainingSamples_uWind[:, -1], xi=array, method='linear'),
             griddata(points=self.trainingSamples_vWind[:, :-1], values=self.trainingSamples_vWind[:, -1], xi=array, method='linear')
@@ -45,7 +59,37 @@ class LinearInterpolator():
 
     # longitude, latitude, altitude, time
     def predictFromSpots_ndarray(self, spotsNdarray):
+        if self.isPrepared:
+            return self.__predictFromPreparedModels(spotsNdarray)
         return (
             griddata(points=self.trainingSamples_uWind[:, :-1], values=self.trainingSamples_uWind[:, -1], xi=spotsNdarray, method='linear'),
             griddata(points=self.trainingSamples_vWind[:, :-1], values=self.trainingSamples_vWind[:, -1], xi=spotsNdarray, method='linear')
         )
+
+
+    # MARK: - Helper Custom Private methods
+
+    # all geometry work happens here: uWind and vWind share one triangulation when their samples lie on the same points.
+    # https://docs.scipy.org/doc/scipy/reference/generated/scipy.interpolate.LinearNDInterpolator.html
+    def __prepareModels(self):
+        uPoints = self.trainingSamples_uWind[:, :-1]
+        vPoints = self.trainingSamples_vWind[:, :-1]
+        if nu.array_equal(uPoints, vPoints):
+            triangulation = Delaunay(uPoints)
+            _ = triangulation.transform # barycentric transforms are lazily computed, so compute them here.
+            self.models['winds'] = LinearNDInterpolator(triangulation, nu.stack([self.trainingSamples_uWind[:, -1], self.trainingSamples_vWind[:, -1]], axis=1))
+        else:
+            uTriangulation = Delaunay(uPoints)
+            _ = uTriangulation.transform
+            vTriangulation = Delaunay(vPoints)
+            _ = vTriangulation.transform
+            self.models['uWind'] = LinearNDInterpolator(uTriangulation, self.trainingSamples_uWind[:, -1])
+            self.models['vWind'] = LinearNDInterpolator(vTriangulation, self.trainingSamples_vWind[:, -1])
+
+
+    def __predictFromPreparedModels(self, spotsNdarray):
+        spotsNdarray = nu.asarray(spotsNdarray, dtype='float').reshape(-1, 4)
+        if 'winds' in self.models:
+            winds = self.models['winds'](spotsNdarray)
+            return winds[:, 0], winds[:, 1]
+        return self.models['uWind'](spotsNdarray), self.models['vWind'](spotsNdarray)
@@ -0,0 +1,77 @@
+import os
+import pickle
+import shutil
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+
+
+# Keeps trained prediction models on disk, keyed by model name, the distributions and forecast window of the past and future
+# reports and the bounding box they were trained on, so a restarted process serves its first query without training.
+# Files are grouped per window; storing a model removes the ones of the same window trained on other (older) distributions,
+# and the dirs of the windows that ended before it began.
+# https://docs.python.org/3/library/pickle.html
+class PredictionModelStore():
+
+    # class properties
+    modelFileExtension = '.pkl'
+
+
+    def __init__(self, predictionModelsPath=None):
+        self.predictionModelsPath = WeatherReportProcessorBase.predictionModelsPath if predictionModelsPath is None else predictionModelsPath
+
+
+    # MARK: - Public Methods
+
+    # None if no model of this key was stored
+    def get(self, modelName, pastWeatherReport, futureWeatherReport, bounds):
+        try:
+            with open(self.__getModelPath(modelName, pastWeatherReport, futureWeatherReport, bounds), 'rb') as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as error: # written by an incompatible version
+            print(f"Warning: Can't load the stored {modelName} model because: {error}; Retraining ...")
+            return None
+
+
+    def put(self, modelName, pastWeatherReport, futureWeatherReport, bounds, model):
+        modelPath = self.__getModelPath(modelName, pastWeatherReport, futureWeatherReport, bounds)
+        windowDirPath = os.path.dirname(modelPath)
+        os.makedirs(windowDirPath, exist_ok=True)
+        # replace the file atomically so readers never see a half-written one.
+        temporaryModelPath = f'{windowDirPath}/.{os.path.basename(modelPath)}.tmp'
+        try:
+            with open(temporaryModelPath, 'wb') as file:
+                pickle.dump(model, file, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as error:
+            print(f"Warning: Can't store the {modelName} model because: {error}; Skipping ...")
+            os.remove(temporaryModelPath)
+            return
+        os.replace(temporaryModelPath, modelPath)
+        # invalidate the models the newer distributions replace
+        distributionsPrefix = PredictionModelStore.__getDistributionsPrefix(pastWeatherReport, futureWeatherReport)
+        for modelFileName in os.listdir(windowDirPath):
+            if modelFileName.endswith(PredictionModelStore.modelFileExtension) and not modelFileName.startswith(distributionsPrefix):
+                try:
+                    os.remove(f'{windowDirPath}/{modelFileName}')
+                except FileNotFoundError: # removed by the other thread building caches
+                    pass
+        # prune the past windows; dir names start with the time dir names, which sort by time
+        pastTimeDirName = os.path.basename(pastWeatherReport.parametersDirPath)
+        for windowDirName in os.listdir(self.predictionModelsPath):
+            if windowDirName.split('_')[-1] < pastTimeDirName and os.path.isdir(f'{self.predictionModelsPath}/{windowDirName}'):
+                shutil.rmtree(f'{self.predictionModelsPath}/{windowDirName}', ignore_errors=True)
+
+
+    # MARK: - Helper Custom Private methods
+
+    # {predictionModelsPath}/{pastTimeDirName}_{futureTimeDirName}/{pastDistributionName}_{futureDistributionName}_{modelName}_{bounds}.pkl
+    def __getModelPath(self, modelName, pastWeatherReport, futureWeatherReport, bounds):
+        windowDirName = f'{os.path.basename(pastWeatherReport.parametersDirPath)}_{os.path.basename(futureWeatherReport.parametersDirPath)}'
+        boundsName = '_'.join( f'{bound:.4f}' for bound in bounds )
+        return f'{self.predictionModelsPath}/{windowDirName}/{PredictionModelStore.__getDistributionsPrefix(pastWeatherReport, futureWeatherReport)}{modelName}_{boundsName}{PredictionModelStore.modelFileExtension}'
+
+
+    @classmethod
+    def __getDistributionsPrefix(cls, pastWeatherReport, futureWeatherReport):
+        return f'{os.path.basename(os.path.dirname(pastWeatherReport.parametersDirPath))}_{os.path.basename(os.path.dirname(futureWeatherReport.parametersDirPath))}_'
@@ -1,40 +1,71 @@
 import numpy as nu
 import pandas as pd
-from scipy.interpolate import Rbf
+from scipy.interpolate import RBFInterpolator
+from concurrent.futures import ThreadPoolExecutor
 
 from Spot4DClass import Spot4D
+from WeatherReportClass import WeatherReport
 
 
-# https://docs.scipy.org/doc/scipy/reference/generated/scipy.interpolate.Rbf.html#scipy.interpolate.Rbf
+# Fits each query over its nearest training samples only (found with a KD tree), instead of one global system over all of them.
+# Axes are scaled so that one GFS grid step is at most 1 in every dimension before distances are taken (the 30 m gap of the
+# upper levels, and the 3-hour step only 0.5), so that every neighbourhood spans the levels and reports around its query.
+# https://docs.scipy.org/doc/scipy/reference/generated/scipy.interpolate.RBFInterpolator.html
 class RbfInterpolator():
-    def __init__(self, trainingSamples_uWind, trainingSamples_vWind):
+
+    # class properties
+    neighborAmount = 32
+    kernel = 'thin_plate_spline'
+    axesScales = nu.array([1/0.5, 1/0.5, 1/30, 1/21600]) # per degree, per degree, per meter, per second
+
+
+    def __init__(self, trainingSamples_uWind, trainingSamples_vWind, timeStandard, neighborAmount=None):
         self.trainingSamples_uWind = trainingSamples_uWind
         self.trainingSamples_vWind = trainingSamples_vWind
+        self.timeStandard = timeStandard
+        self.neighborAmount = RbfInterpolator.neighborAmount if neighborAmount is None else neighborAmount
         # start training
-        self.paras = {}
-        with mp.Pool(processes=2) as pool: # https://docs.python.org/ja/3/library/multiprocessing.html#multiprocessing.pool.Pool.starmap
-            self.paras['uWind'], self.paras['vWind'] = pool.starmap(Rbf, [trainingSamples_uWind, trainingSamples_vWind])
-        # self.paras['uWind'] = Rbf(trainingSamples_uWind[:, 0], trainingSamples_uWind[:, 1], trainingSamples_uWind[:, 2], trainingSamples_uWind[:, 3], d=trainingSamples_uWind[:, 4], function='gaussian')
-        # self.paras['vWind'] = Rbf(trainingSamples_vWind[:, 0], trainingSamples_vWind[:, 1], trainingSamples_vWind[:, 2], trainingSamples_vWind[:, 3], d=trainingSamples_vWind[:, 4], function='gaussian')
+        self.models = {}
+        uPoints = self.trainingSamples_uWind[:, :-1] * RbfInterpolator.axesScales
+        vPoints = self.trainingSamples_vWind[:, :-1] * RbfInterpolator.axesScales
+        if nu.array_equal(self.trainingSamples_uWind[:, :-1], self.trainingSamples_vWind[:, :-1]):
+            # uWind and vWind share the neighbourhoods and are solved together
+            self.models['winds'] = RBFInterpolator(uPoints, nu.stack([self.trainingSamples_uWind[:, -1], self.trainingSamples_vWind[:, -1]], axis=1), neighbors=min(self.neighborAmount, len(uPoints)), kernel=RbfInterpolator.kernel)
+        else:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                uFuture = executor.submit(RBFInterpolator, uPoints, self.trainingSamples_uWind[:, -1], neighbors=min(self.neighborAmount, len(uPoints)), kernel=RbfInterpolator.kernel)
+                vFuture = executor.submit(RBFInterpolator, vPoints, self.trainingSamples_vWind[:, -1], neighbors=min(self.neighborAmount, len(vPoints)), kernel=RbfInterpolator.kernel)
+                self.models['uWind'], self.models['vWind'] = uFuture.result(), vFuture.result()
 
 
     @classmethod
     def initFromWeatherReportCaches(cls, pastWeatherReport, futureWeatherReport, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound):
-        # get training samples for uWind
-        pastTrainingSamples_uWind = pastWeatherReport.getSamplesForTraining(secondsFromStart=0.0, categoryName='winds', componentName='u', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
-        futureTrainingSamples_uWind = futureWeatherReport.getSamplesForTraining(secondsFromStart=(futureWeatherReport.date - pastWeatherReport.date).total_seconds(), categoryName='winds', componentName='u', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
-        # get training samples for vWind
-        pastTrainingSamples_vWind = pastWeatherReport.getSamplesForTraining(secondsFromStart=0.0, categoryName='winds', componentName='v', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
-        futureTrainingSamples_vWind = futureWeatherReport.getSamplesForTraining(secondsFromStart=(futureWeatherReport.date - pastWeatherReport.date).total_seconds(), categoryName='winds', componentName='v', longitudeLowerBound=longitudeLowerBound, longitudeUpperBound=longitudeUpperBound, latitudeLowerBound=latitudeLowerBound, latitudeUpperBound=latitudeUpperBound)
+        # get training samples for uWind and vWind at once
+        trainingSamples = WeatherReport.getSamplesForTrainingFromWeatherReportPair(pastWeatherReport, futureWeatherReport, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound)
 
         return cls(
-            trainingSamples_uWind=nu.concatenate([pastTrainingSamples_uWind, futureTrainingSamples_uWind]),
-            trainingSamples_vWind=nu.concatenate([pastTrainingSamples_vWind, futureTrainingSamples_vWind])
+            trainingSamples_uWind=trainingSamples['u'],
+            trainingSamples_vWind=trainingSamples['v'],
+            timeStandard=pastWeatherReport.date
         )
 
 
-    def predict(self, spot, timeDelta):
-        return (
-            self.paras['uWind'](spot.longitude, spot.latitude, spot.altitude, timeDelta),
-            self.paras['vWind'](spot.longitude, spot.latitude, spot.altitude, timeDelta)
-        )
+    def predict(self, spot):
+        uWinds, vWinds = self.predictFromSpots_ndarray(nu.array([[spot.longitude, spot.latitude, spot.altitude, (spot.time-self.timeStandard).total_seconds()]]))
+        return uWinds[0], vWinds[0]
+
+
+    def predictFromSpot_flattenedArray(self, array):
+        return self.predictFromSpots_ndarray(array)
+
+
+    # longitude, latitude, altitude, time
+    def predictFromSpots_ndarray(self, spotsNdarray):
+        spotsNdarray = nu.asarray(spotsNdarray, dtype='float').reshape(-1, 4) * RbfInterpolator.axesScales
+        if 'winds' in self.models:
+            winds = self.models['winds'](spotsNdarray)
+            return winds[:, 0], winds[:, 1]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            uFuture = executor.submit(self.models['uWind'], spotsNdarray)
+            vFuture = executor.submit(self.models['vWind'], spotsNdarray)
+            return uFuture.result(), vFuture.result()
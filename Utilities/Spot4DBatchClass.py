@@ -0,0 +1,85 @@
+import numpy as nu
+import datetime as dt
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from Spot4DClass import Spot4D
+
+
+# Many spots in one structured array of longitude, latitude, altitude and time (seconds since 1970-01-01, UTC), 32 bytes per spot.
+# It shares memory with the (N, 4) layout the interpolators take, so converting either way copies nothing.
+# https://numpy.org/doc/stable/user/basics.rec.html
+class Spot4DBatch():
+
+    # class properties
+    dtype = nu.dtype([('longitude', 'f8'), ('latitude', 'f8'), ('altitude', 'f8'), ('time', 'f8')])
+    epoch = dt.datetime(1970, 1, 1)
+    forecastIntervalHours = 3
+
+
+    def __init__(self, spotsArray):
+        self.spotsArray = spotsArray # structured, of Spot4DBatch.dtype
+
+
+    @classmethod
+    def initFromNdarray(cls, spotsNdarray):
+        spotsNdarray = nu.ascontiguousarray(spotsNdarray, dtype='f8').reshape(-1, 4)
+        return cls(spotsNdarray.view(Spot4DBatch.dtype).reshape(-1))
+
+
+    @classmethod
+    def initFromSpots(cls, spots):
+        spotsArray = nu.empty(len(spots), dtype=Spot4DBatch.dtype)
+        for index, spot in enumerate(spots):
+            spotsArray[index] = (spot.longitude, spot.latitude, spot.altitude, (spot.time - Spot4DBatch.epoch).total_seconds())
+        return cls(spotsArray)
+
+
+    # MARK: - Public Methods
+
+    # (N, 4) longitude, latitude, altitude, time; a view on the same memory
+    def toNdarray(self):
+        return nu.ascontiguousarray(self.spotsArray).view('f8').reshape(-1, 4)
+
+
+    def getSpot(self, index):
+        longitude, latitude, altitude, time = self.spotsArray[index].tolist()
+        return Spot4D(Spot4DBatch.epoch + dt.timedelta(seconds=time), longitude, latitude, altitude)
+
+
+    # seconds of the former and following 3-hour time points between which each spot lies
+    def getTimeBounds(self):
+        intervalSeconds = Spot4DBatch.forecastIntervalHours * 3600
+        timesBefore = nu.floor(self.spotsArray['time'] / intervalSeconds) * intervalSeconds
+        return timesBefore, timesBefore + intervalSeconds
+
+
+    def getTimeBoundsDirNames(self):
+        timesBefore, timesAfter = self.getTimeBounds()
+        return Spot4DBatch.getDirNames(timesBefore), Spot4DBatch.getDirNames(timesAfter)
+
+
+    def getTimeCurrentDirNames(self):
+        return Spot4DBatch.getDirNames(self.spotsArray['time'])
+
+
+    # MARK: - Custom Public Helper Functions
+
+    # strftime once per distinct minute, as dir names have minute resolution
+    @classmethod
+    def getDirNames(cls, times):
+        uniqueMinutes, inverse = nu.unique(nu.floor(times / 60), return_inverse=True)
+        dirNames = nu.array([ (Spot4DBatch.epoch + dt.timedelta(minutes=minutes)).strftime(WeatherReportProcessorBase.weatherReportDirNameFormat) for minutes in uniqueMinutes.tolist() ])
+        return dirNames[inverse.reshape(-1)]
+
+
+    # MARK: - Special Methods
+
+    def __len__(self):
+        return len(self.spotsArray)
+
+
+    # a Spot4D for an integer, a Spot4DBatch for slices and masks
+    def __getitem__(self, index):
+        if isinstance(index, (int, nu.integer)):
+            return self.getSpot(index)
+        return Spot4DBatch(self.spotsArray[index])
@@ -5,13 +5,19 @@ from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
 
 
 class Spot4D():
+
+    # class properties
+    # no per instance __dict__, since boundaries and batches create spots by the thousands
+    __slots__ = ('latitude', 'longitude', 'altitude', 'time', '__boxCalculationTime', '__timeBefore', '__timeBeforeDirName', '__timeAfter', '__timeAfterDirName', 'latitudeBefore', 'latitudeAfter', 'longitudeBefore', 'longitudeAfter', 'altitudeBefore', 'altitudeAfter')
+
+
     def __init__(self, time, longitude, latitude, altitude):
         self.latitude = latitude
         self.longitude = longitude
         self.altitude = altitude
         self.time = time
-        self.timeCurrentDirName = time.strftime(WeatherReportProcessorBase.weatherReportDirNameFormat)
-        # vars for Box Calculation
+        # vars for Box Calculation, computed on first use
+        self.__boxCalculationTime = None
         self.__timeBefore = None
         self.__timeBeforeDirName = None
         self.__timeAfter = None
@@ -27,6 +33,11 @@ class Spot4D():
         self.altitudeAfter = None
 
 
+    @property
+    def timeCurrentDirName(self):
+        return self.time.strftime(WeatherReportProcessorBase.weatherReportDirNameFormat)
+
+
     @classmethod
     def initFromCopy(cls, spot):
         return cls(spot.time, spot.longitude, spot.latitude, spot.altitude)
@@ -44,13 +55,13 @@ class Spot4D():
     # MARK: - Public Methods
 
     def getTimeBounds(self):
-        if self.__timeBefore is None or self.__timeAfter is None:
+        if self.__boxCalculationTime != self.time:
             self.__initVarsForBoxCalculation()
         return self.__timeBefore, self.__timeAfter
 
 
     def getTimeBoundsDirNames(self):
-        if self.__timeBeforeDirName is None or self.__timeAfterDirName is None:
+        if self.__boxCalculationTime != self.time:
             self.__initVarsForBoxCalculation()
         return self.__timeBeforeDirName, self.__timeAfterDirName
 
@@ -138,6 +149,7 @@ class Spot4D():
 
     def __initVarsForBoxCalculation(self):
         # get the former and following time points between which the certainTime lies.
+        self.__boxCalculationTime = self.time
         self.__timeBefore = dt.datetime(self.time.year, self.time.month, self.time.day, self.time.hour//3*3, 0, 0)
         self.__timeBeforeDirName = self.__timeBefore.strftime(WeatherReportProcessorBase.weatherReportDirNameFormat)
         self.__timeAfter = self.__timeBefore + dt.timedelta(hours=3)
@@ -0,0 +1,69 @@
+import numpy as nu
+import datetime as dt
+import os
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from GFSDistributionCubeClass import GFSDistributionCube
+from DistributionCatalogueClass import DistributionCatalogue
+
+
+# Writes GFS-like distributions into csvFilesPath in the layout WeatherReport reads (a published GFSDistributionCube per distribution),
+# so the processors and interpolators can be run and benchmarked without a NOAA download.
+# Winds are smooth waves over the plane, growing with altitude by the 1/7 power law and drifting with time, plus a little seeded noise.
+class SyntheticGFSDistributionGenerator():
+
+    # class properties
+    latitudeLowerBound = 25.0
+    latitudeUpperBound = 45.0
+    longitudeLowerBound = 125.0
+    longitudeUpperBound = 145.0
+    resolution = 0.5 # degree, as GFS 0.5
+    forecastTimeAmount = 3 # 3-hour forecast times published per distribution
+    baseWindSpeed = 8.0 # m/s at 10 m
+    waveLength = 10.0 # degree
+    noiseLevel = 0.2 # m/s
+
+
+    def __init__(self, latitudeLowerBound=None, latitudeUpperBound=None, longitudeLowerBound=None, longitudeUpperBound=None, resolution=None, seed=0):
+        self.latitudeLowerBound = SyntheticGFSDistributionGenerator.latitudeLowerBound if latitudeLowerBound is None else latitudeLowerBound
+        self.latitudeUpperBound = SyntheticGFSDistributionGenerator.latitudeUpperBound if latitudeUpperBound is None else latitudeUpperBound
+        self.longitudeLowerBound = SyntheticGFSDistributionGenerator.longitudeLowerBound if longitudeLowerBound is None else longitudeLowerBound
+        self.longitudeUpperBound = SyntheticGFSDistributionGenerator.longitudeUpperBound if longitudeUpperBound is None else longitudeUpperBound
+        self.resolution = SyntheticGFSDistributionGenerator.resolution if resolution is None else resolution
+        self.latitudes = nu.round(nu.arange(self.latitudeLowerBound, self.latitudeUpperBound + self.resolution/2, self.resolution), 6)
+        self.longitudes = nu.round(nu.arange(self.longitudeLowerBound, self.longitudeUpperBound + self.resolution/2, self.resolution), 6)
+        self.randomGenerator = nu.random.default_rng(seed)
+        self.phases = self.randomGenerator.uniform(0, 2*nu.pi, size=4)
+
+
+    # MARK: - Public Methods
+
+    # write a distribution published at distributionDate with its first forecastTimeAmount forecast times, and register it in the shared catalogue.
+    def generate(self, distributionDate, forecastTimeAmount=None):
+        forecastTimeAmount = SyntheticGFSDistributionGenerator.forecastTimeAmount if forecastTimeAmount is None else forecastTimeAmount
+        distributionName = f'{distributionDate.strftime(WeatherReportProcessorBase.weatherReportDirNameFormat)}_distributed'
+        distributionDirPath = f'{WeatherReportProcessorBase.csvFilesPath}/{distributionName}'
+        os.makedirs(distributionDirPath, exist_ok=True)
+        distributionCube = GFSDistributionCube.initByCreating(distributionDirPath, distributionDate, self.latitudes, self.longitudes)
+        distributionCatalogue = DistributionCatalogue.getShared()
+        for precedingHours in WeatherReportProcessorBase.forecastPrecedingHours[:forecastTimeAmount]:
+            timeDirName = (distributionDate + dt.timedelta(hours=precedingHours)).strftime(WeatherReportProcessorBase.weatherReportDirNameFormat)
+            distributionCube.writeSlice(timeDirName, self.latitudes, self.longitudes, self.getWindsAtHours(precedingHours))
+            distributionCatalogue.addPublishedTime(distributionName, timeDirName)
+        distributionCatalogue.save()
+        return distributionDirPath
+
+
+    # level x component x latitude x longitude winds, hours after the distribution date
+    def getWindsAtHours(self, hours):
+        latitudesGrid, longitudesGrid = nu.meshgrid(self.latitudes, self.longitudes, indexing='ij')
+        waveNumber = 2*nu.pi / SyntheticGFSDistributionGenerator.waveLength
+        drift = 2*nu.pi * hours / 24
+        uWinds = SyntheticGFSDistributionGenerator.baseWindSpeed * nu.sin(waveNumber*latitudesGrid + self.phases[0] + drift) + 0.5*SyntheticGFSDistributionGenerator.baseWindSpeed * nu.cos(waveNumber*longitudesGrid + self.phases[1])
+        vWinds = SyntheticGFSDistributionGenerator.baseWindSpeed * nu.cos(waveNumber*longitudesGrid + self.phases[2] + drift) + 0.5*SyntheticGFSDistributionGenerator.baseWindSpeed * nu.sin(waveNumber*latitudesGrid + self.phases[3])
+        winds = nu.empty((len(GFSDistributionCube.levelNames), len(GFSDistributionCube.componentNames), len(self.latitudes), len(self.longitudes)), dtype=GFSDistributionCube.dtype)
+        for levelIndex, levelName in enumerate(GFSDistributionCube.levelNames):
+            shear = (int(levelName.split('_')[0]) / 10) ** (1/7)
+            winds[levelIndex, 0] = shear * uWinds + self.randomGenerator.normal(0, SyntheticGFSDistributionGenerator.noiseLevel, size=uWinds.shape)
+            winds[levelIndex, 1] = shear * vWinds + self.randomGenerator.normal(0, SyntheticGFSDistributionGenerator.noiseLevel, size=vWinds.shape)
+        return winds
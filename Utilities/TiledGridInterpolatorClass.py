@@ -0,0 +1,42 @@
+import numpy as nu
+import pandas as pd
+
+from Spot4DClass import Spot4D
+
+
+# Answers queries like GridInterpolator, from the per-tile GridInterpolators of WeatherTileCache.
+# Every spot goes to the tile its longitude and latitude fall in; spots of missing tiles get nan.
+class TiledGridInterpolator():
+    def __init__(self, tileInterpolators, tileSize, timeStandard):
+        self.tileInterpolators = tileInterpolators # (longitudeTileIndex, latitudeTileIndex): GridInterpolator
+        self.tileSize = tileSize
+        self.timeStandard = timeStandard
+
+
+    def predict(self, spot):
+        tileInterpolator = self.tileInterpolators.get((int(nu.floor(spot.longitude / self.tileSize)), int(nu.floor(spot.latitude / self.tileSize))))
+        if tileInterpolator is None:
+            return nu.nan, nu.nan
+        return tileInterpolator.predict(spot)
+
+
+    def predictFromSpot_flattenedArray(self, array):
+        return self.predictFromSpots_ndarray(nu.asarray(array, dtype='float').reshape(-1, 4))
+
+
+    # longitude, latitude, altitude, time
+    def predictFromSpots_ndarray(self, spotsNdarray):
+        spotsNdarray = nu.asarray(spotsNdarray, dtype='float').reshape(-1, 4)
+        uWinds = nu.full(spotsNdarray.shape[0], nu.nan)
+        vWinds = nu.full(spotsNdarray.shape[0], nu.nan)
+        tilesIndex = nu.floor(spotsNdarray[:, :2] / self.tileSize).astype('int')
+        # group spots by tile
+        uniqueTilesIndex, inverse = nu.unique(tilesIndex, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for groupIndex, (longitudeTileIndex, latitudeTileIndex) in enumerate(uniqueTilesIndex):
+            tileInterpolator = self.tileInterpolators.get((int(longitudeTileIndex), int(latitudeTileIndex)))
+            if tileInterpolator is None:
+                continue
+            isInTile = inverse == groupIndex
+            uWinds[isInTile], vWinds[isInTile] = tileInterpolator.predictFromSpots_ndarray(spotsNdarray[isInTile])
+        return uWinds, vWinds
@@ -16,27 +16,40 @@ class VisibleWeatherData():
     altitudeMargin = 10.0
 
 
-    def __init__(self, interpolator, centerSpot, sampleAmount=10):
+    # sampleAmount is the default of every axis; longitudeSampleAmount, latitudeSampleAmount and altitudeSampleAmount override it per axis.
+    def __init__(self, interpolator, centerSpot, sampleAmount=10, longitudeSampleAmount=None, latitudeSampleAmount=None, altitudeSampleAmount=None):
         # get boundaries
         longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound, altitudeLowerBound, altitudeUpperBound = centerSpot.getSurroundingLongitudeLatitudeAltitudeBoundary(longitudeMargin=VisibleWeatherData.longitudeMargin, latitudeMargin=VisibleWeatherData.latitudeMargin)
 
         # get grids
-        longitudes = nu.linspace(longitudeLowerBound, longitudeUpperBound, sampleAmount)
-        latitudes = nu.linspace(latitudeLowerBound, latitudeUpperBound, sampleAmount)
-        altitudes = nu.linspace(altitudeLowerBound, altitudeUpperBound, sampleAmount)
-        spotsNdarray = nu.zeros((sampleAmount*sampleAmount*sampleAmount, 6)) # longitude, latitude, altitude, time, uWinds, vWinds
-        count = 0
-        for longitude in longitudes:
-            for latitude in latitudes:
-                for altitude in altitudes:
-                    spotsNdarray[count, :4] = [longitude, latitude, altitude, (centerSpot.time-interpolator.timeStandard).total_seconds()]
-                    count += 1
-
-        uWinds, vWinds = interpolator.predictFromSpots_ndarray(spotsNdarray=spotsNdarray[:, :4])
-        spotsNdarray[:, 4], spotsNdarray[:, 5] = uWinds, vWinds
-
-        # self.df = pd.DataFrame(spotsNdarray, columns=['longitude', 'latitude', 'altitude', 'timeDelta', 'uWinds', 'vWinds']).fillna(0.0)
-        self.df = pd.DataFrame(spotsNdarray, columns=['longitude', 'latitude', 'altitude', 'timeDelta', 'uWinds', 'vWinds']).dropna()
+        self.longitudes = nu.linspace(longitudeLowerBound, longitudeUpperBound, sampleAmount if longitudeSampleAmount is None else longitudeSampleAmount)
+        self.latitudes = nu.linspace(latitudeLowerBound, latitudeUpperBound, sampleAmount if latitudeSampleAmount is None else latitudeSampleAmount)
+        self.altitudes = nu.linspace(altitudeLowerBound, altitudeUpperBound, sampleAmount if altitudeSampleAmount is None else altitudeSampleAmount)
+        longitudesGrid, latitudesGrid, altitudesGrid = nu.meshgrid(self.longitudes, self.latitudes, self.altitudes, indexing='ij')
+        self.spotsNdarray = nu.empty((longitudesGrid.size, 6)) # longitude, latitude, altitude, time, uWinds, vWinds; nan where not predictable
+        self.spotsNdarray[:, 0] = longitudesGrid.ravel()
+        self.spotsNdarray[:, 1] = latitudesGrid.ravel()
+        self.spotsNdarray[:, 2] = altitudesGrid.ravel()
+        self.spotsNdarray[:, 3] = (centerSpot.time-interpolator.timeStandard).total_seconds()
+
+        uWinds, vWinds = interpolator.predictFromSpots_ndarray(spotsNdarray=self.spotsNdarray[:, :4])
+        self.spotsNdarray[:, 4], self.spotsNdarray[:, 5] = uWinds, vWinds
+        self.__df = None
+
+
+    # built on first access, as it costs more than the prediction at high resolutions
+    @property
+    def df(self):
+        if self.__df is None:
+            # self.__df = pd.DataFrame(self.spotsNdarray, columns=['longitude', 'latitude', 'altitude', 'timeDelta', 'uWinds', 'vWinds']).fillna(0.0)
+            self.__df = pd.DataFrame(self.spotsNdarray, columns=['longitude', 'latitude', 'altitude', 'timeDelta', 'uWinds', 'vWinds']).dropna()
+        return self.__df
+
+
+    # uWinds and vWinds shaped longitude x latitude x altitude
+    def getWindsGrids(self):
+        shape = (len(self.longitudes), len(self.latitudes), len(self.altitudes))
+        return self.spotsNdarray[:, 4].reshape(shape), self.spotsNdarray[:, 5].reshape(shape)
 
 
     def plotWinds(self):
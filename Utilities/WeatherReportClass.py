@@ -3,10 +3,12 @@ import pandas as pd
 import datetime as dt
 from time import sleep
 import os
-from copy import deepcopy
 
 from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
 from WeatherReportRemoteProcessorClass import WeatherReportRemoteProcessor
+from GFSDistributionCubeClass import GFSDistributionCube
+from DistributionCatalogueClass import DistributionCatalogue
+from WeatherReportStatsClass import WeatherReportStats
 from Spot4DClass import Spot4D
 
 
@@ -14,142 +16,107 @@ class WeatherReport():
 
     # class properties
     windSpeedAltitudeBaseGradation = ['10_m', '20_m', '30_m', '40_m', '50_m', '80_m', '100_m']
+    componentNames = ['u', 'v']
     geoCoordinateEpsilon = 1e-6
 
 
     # All-term initializer. Only for private access.
-    def __init__(self,
-        date,
-        latitudeUpperBound,
-        latitudeLowerBound,
-        longitudeUpperBound,
-        longitudeLowerBound,
-        _10mHighWindSpeed_vWind,
-        _10mHighWindSpeed_uWind,
-        _20mHighWindSpeed_vWind,
-        _20mHighWindSpeed_uWind,
-        _30mHighWindSpeed_vWind,
-        _30mHighWindSpeed_uWind,
-        _40mHighWindSpeed_vWind,
-        _40mHighWindSpeed_uWind,
-        _50mHighWindSpeed_vWind,
-        _50mHighWindSpeed_uWind,
-        _80mHighWindSpeed_vWind,
-        _80mHighWindSpeed_uWind,
-        _100mHighWindSpeed_vWind,
-        _100mHighWindSpeed_uWind
-    ):
+    # winds: level x component x latitude x longitude array over the ascending latitudes and longitudes axes, nan where not decoded.
+    def __init__(self, date, latitudes, longitudes, winds):
         # properties
         # basic
         self.date = date
-        self.latitudeLowerBound = latitudeLowerBound
-        self.latitudeUpperBound = latitudeUpperBound
-        self.longitudeLowerBound = longitudeLowerBound
-        self.longitudeUpperBound = longitudeUpperBound
+        self.latitudes = nu.asarray(latitudes, dtype='float')
+        self.longitudes = nu.asarray(longitudes, dtype='float')
+        self.latitudeResolution = WeatherReport.getAxisResolution(self.latitudes)
+        self.longitudeResolution = WeatherReport.getAxisResolution(self.longitudes)
+        self.latitudeLowerBound = self.latitudes[0] if len(self.latitudes) > 0 else nu.nan
+        self.latitudeUpperBound = self.latitudes[-1] if len(self.latitudes) > 0 else nu.nan
+        self.longitudeLowerBound = self.longitudes[0] if len(self.longitudes) > 0 else nu.nan
+        self.longitudeUpperBound = self.longitudes[-1] if len(self.longitudes) > 0 else nu.nan
         self.altitudeLowerBound = 10 # meter
         self.altitudeUpperBound = 100 # meter
+        self.parametersDirPath = None # {csvFilesPath}/{distributionName}/{timeDirName} it is loaded from
         # value
-        self.value = {
-            'winds': {
-                '10_m': {
-                    'u': _10mHighWindSpeed_uWind,
-                    'v': _10mHighWindSpeed_vWind,
-                },
-                '20_m': {
-                    'u': _20mHighWindSpeed_uWind,
-                    'v': _20mHighWindSpeed_vWind,
-                },
-                '30_m': {
-                    'u': _30mHighWindSpeed_uWind,
-                    'v': _30mHighWindSpeed_vWind,
-                },
-                '40_m': {
-                    'u': _40mHighWindSpeed_uWind,
-                    'v': _40mHighWindSpeed_vWind,
-                },
-                '50_m': {
-                    'u': _50mHighWindSpeed_uWind,
-                    'v': _50mHighWindSpeed_vWind,
-                },
-                '80_m': {
-                    'u': _80mHighWindSpeed_uWind,
-                    'v': _80mHighWindSpeed_vWind,
-                },
-                '100_m': {
-                    'u': _100mHighWindSpeed_uWind,
-                    'v': _100mHighWindSpeed_vWind,
-                },
-            },
-        }
+        self.winds = winds
+        self.__value = None
+
+
+    # the former value['winds'][level][component] (latitude, longitude, value) tables, built on first access.
+    @property
+    def value(self):
+        if self.__value is None:
+            latitudesGrid, longitudesGrid = nu.meshgrid(self.latitudes, self.longitudes, indexing='ij')
+            latitudesGrid, longitudesGrid = latitudesGrid.ravel(), longitudesGrid.ravel()
+            self.__value = {'winds': {}}
+            for levelIndex, levelName in enumerate(WeatherReport.windSpeedAltitudeBaseGradation):
+                self.__value['winds'][levelName] = {}
+                for componentIndex, componentName in enumerate(WeatherReport.componentNames):
+                    df = pd.DataFrame({'latitude': latitudesGrid, 'longitude': longitudesGrid, 'value': self.winds[levelIndex, componentIndex].ravel()})
+                    self.__value['winds'][levelName][componentName] = df.dropna()
+        return self.__value
 
 
     @classmethod
     def initFromCenterSpotAtFixTime(cls, spot):
-        # set
-        # longitudeLowerBound = spot.longitude - WeatherReportRemoteProcessor.longitudeMargin
-        # longitudeUpperBound = spot.longitude + WeatherReportRemoteProcessor.longitudeMargin
-        # latitudeLowerBound = spot.latitude - WeatherReportRemoteProcessor.latitudeMargin
-        # latitudeUpperBound = spot.latitude + WeatherReportRemoteProcessor.latitudeMargin
-        longitudeLowerBound = 90
-        longitudeUpperBound = -90
-        latitudeLowerBound = 180
-        latitudeUpperBound = -180
         # find latest parametersDirPath
         parametersDirPath = WeatherReport.findBestParametersDirPathForTime(spot.time)
-        # dump args
-        args = []
-        for levelName in WeatherReport.windSpeedAltitudeBaseGradation:
-            # get u component wind data frame
-            uWindDF = pd.read_csv(f'{parametersDirPath}/{levelName}_uWind.csv', header=None)
-            uWindDF.columns = ['latitude', 'longitude', 'value']
-            # find boundaries
-            uLongitudeLowerBound = uWindDF['longitude'].min()
-            uLongitudeUpperBound = uWindDF['longitude'].max()
-            uLatitudeLowerBound = uWindDF['latitude'].min()
-            uLatitudeUpperBound = uWindDF['latitude'].max()
-            # dump to pivot table
-            # uWindDF = uWindDF.pivot('longitude', 'latitude', values='value')
-            args.append(uWindDF) # append uWind
-
-            # get v component wind data frame
-            vWindDF = pd.read_csv(f'{parametersDirPath}/{levelName}_vWind.csv', header=None)
-            vWindDF.columns = ['latitude', 'longitude', 'value']
-            # find boundaries
-            vLongitudeLowerBound = vWindDF['longitude'].min()
-            vLongitudeUpperBound = vWindDF['longitude'].max()
-            vLatitudeLowerBound = vWindDF['latitude'].min()
-            vLatitudeUpperBound = vWindDF['latitude'].max()
-            # dump to pivot table
-            # vWindDF = vWindDF.pivot('longitude', 'latitude', values='value')
-            args.append(vWindDF) # append vWind
-
-            # ensure all boundaries match each other
-            # longitude lower bound
-            if abs(uLongitudeLowerBound - vLongitudeLowerBound) > WeatherReport.geoCoordinateEpsilon:
-                print("Warning: uWind longitude lower bound (={:.6f}) dismatch vWind longitude lower bound (={:.6f}).".format(uLongitudeLowerBound, vLongitudeLowerBound))
-            else: # u & v boundary match
-                longitudeLowerBound = min(longitudeLowerBound, uLongitudeLowerBound)
-            # latitude lower boun
-            if abs(uLatitudeLowerBound - vLatitudeLowerBound) > WeatherReport.geoCoordinateEpsilon:
-                print("Warning: uWind latitude lower bound (={:.6f}) dismatch vWind latitude lower bound (={:.6f}).".format(uLatitudeLowerBound, vLatitudeLowerBound))
-            else: # u & v boundary match
-                latitudeLowerBound = min(latitudeLowerBound, uLatitudeLowerBound)
-            # longitude upper bound
-            if abs(uLongitudeUpperBound - vLongitudeUpperBound) > WeatherReport.geoCoordinateEpsilon:
-                print("Warning: uWind longitude upper bound (={:.6f}) dismatch vWind longitude upper bound (={:.6f}).".format(uLongitudeUpperBound, vLongitudeUpperBound))
-            else: # u & v boundary match
-                longitudeUpperBound = max(longitudeUpperBound, uLongitudeUpperBound)
-            # latitude upper boun
-            if abs(uLatitudeUpperBound - vLatitudeUpperBound) > WeatherReport.geoCoordinateEpsilon:
-                print("Warning: uWind latitude upper bound (={:.6f}) dismatch vWind latitude upper bound (={:.6f}).".format(uLatitudeUpperBound, vLatitudeUpperBound))
-            else: # u & v boundary match
-                latitudeUpperBound = max(latitudeUpperBound, uLatitudeUpperBound)
-
-        return cls(spot.time, latitudeUpperBound, latitudeLowerBound, longitudeUpperBound, longitudeLowerBound, *args)
+        weatherReport = cls.initFromParametersDirPathAtFixTime(spot, parametersDirPath)
+        weatherReport.parametersDirPath = parametersDirPath
+        return weatherReport
+
+
+    # bounds (longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound) is None for the whole decoded region.
+    @classmethod
+    def initFromParametersDirPathAtFixTime(cls, spot, parametersDirPath, bounds=None):
+        with WeatherReportStats.getShared().measure('load'):
+            # prefer the binary cube of the distribution
+            distributionDirPath, timeDirName = os.path.split(parametersDirPath)
+            if GFSDistributionCube.isTimePublishedInDistribution(distributionDirPath, timeDirName):
+                return cls.initFromDistributionCubeAtFixTime(spot, GFSDistributionCube.initFromDistributionDirPath(distributionDirPath), timeDirName, bounds=bounds)
+            latitudes, longitudes, winds = GFSDistributionCube.readSliceFromCSVFiles(parametersDirPath)
+            weatherReport = cls(spot.time, latitudes, longitudes, winds)
+            return weatherReport if bounds is None else weatherReport.getCroppedWeatherReport(*bounds)
+
+
+    # a view on the memory mapped cube within bounds; values are copied only if the cube orders levels or components differently.
+    @classmethod
+    def initFromDistributionCubeAtFixTime(cls, spot, distributionCube, timeDirName, bounds=None):
+        windsSlice = distributionCube.getSliceAtTime(timeDirName) # level x component x latitude x longitude, memory mapped
+        latitudeSlice, longitudeSlice = slice(None), slice(None)
+        if bounds is not None:
+            longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound = bounds
+            latitudeSlice = WeatherReport.getAxisSlice(distributionCube.latitudes, WeatherReport.getAxisResolution(distributionCube.latitudes), latitudeLowerBound, latitudeUpperBound)
+            longitudeSlice = WeatherReport.getAxisSlice(distributionCube.longitudes, WeatherReport.getAxisResolution(distributionCube.longitudes), longitudeLowerBound, longitudeUpperBound)
+        levelIndexes = [ distributionCube.header['levels'].index(levelName) for levelName in WeatherReport.windSpeedAltitudeBaseGradation ]
+        componentIndexes = [ distributionCube.header['components'].index(componentName) for componentName in WeatherReport.componentNames ]
+        levelSlice = WeatherReport.getIndexesSlice(levelIndexes)
+        componentSlice = WeatherReport.getIndexesSlice(componentIndexes)
+        if levelSlice is not None and componentSlice is not None:
+            winds = windsSlice[levelSlice, componentSlice, latitudeSlice, longitudeSlice]
+        else:
+            # in the order of WeatherReport
+            winds = windsSlice[:, :, latitudeSlice, longitudeSlice][nu.ix_(levelIndexes, componentIndexes)]
+        return cls(spot.time, distributionCube.latitudes[latitudeSlice], distributionCube.longitudes[longitudeSlice], winds)
 
 
     # MARK: - Custom Public Helper Functions
 
+    # a view on the grid points within the bounds; no values are copied.
+    def getCroppedWeatherReport(self, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound):
+        latitudeSlice = WeatherReport.getAxisSlice(self.latitudes, self.latitudeResolution, latitudeLowerBound, latitudeUpperBound)
+        longitudeSlice = WeatherReport.getAxisSlice(self.longitudes, self.longitudeResolution, longitudeLowerBound, longitudeUpperBound)
+        weatherReport = WeatherReport(self.date, self.latitudes[latitudeSlice], self.longitudes[longitudeSlice], self.winds[:, :, latitudeSlice, longitudeSlice])
+        weatherReport.parametersDirPath = self.parametersDirPath
+        return weatherReport
+
+
+    # bytes held by the wind array (the whole array for crops, as they share it; only the viewed part of a memory mapped cube)
+    def getMemoryUsage(self):
+        winds = self.winds if self.winds.base is None or isinstance(self.winds, nu.memmap) else self.winds.base
+        return int(winds.nbytes + self.latitudes.nbytes + self.longitudes.nbytes)
+
+
     # return the 8 boundary vertex spots
     def get8WideBoundarySpots(self):
         return [
@@ -165,50 +132,101 @@ class WeatherReport():
 
 
     def getSamplesForTraining(self, secondsFromStart, categoryName, componentName, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound):
-        trainingSamples = nu.zeros((1, 5)) # longitudes, latitudes, altitudes, time, value
-        for level in WeatherReport.windSpeedAltitudeBaseGradation:
-            altitude = float(level.split('_')[0])
-            df = self.value[categoryName][level][componentName]
+        return WeatherReport.getSamplesForTrainingFromWeatherReports(
+            weatherReportsWithSecondsFromStart=[(self, secondsFromStart)],
+            categoryName=categoryName,
+            componentNames=[componentName],
+            longitudeLowerBound=longitudeLowerBound,
+            longitudeUpperBound=longitudeUpperBound,
+            latitudeLowerBound=latitudeLowerBound,
+            latitudeUpperBound=latitudeUpperBound
+        )[componentName]
+
+
+    # training samples of the past and the future report together, with time in seconds from the past one.
+    @classmethod
+    def getSamplesForTrainingFromWeatherReportPair(cls, pastWeatherReport, futureWeatherReport, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound, categoryName='winds', componentNames=('u', 'v')):
+        with WeatherReportStats.getShared().measure('sampleExtraction'):
+            return cls.getSamplesForTrainingFromWeatherReports(
+                weatherReportsWithSecondsFromStart=[(pastWeatherReport, 0.0), (futureWeatherReport, (futureWeatherReport.date - pastWeatherReport.date).total_seconds())],
+                categoryName=categoryName,
+                componentNames=componentNames,
+                longitudeLowerBound=longitudeLowerBound,
+                longitudeUpperBound=longitudeUpperBound,
+                latitudeLowerBound=latitudeLowerBound,
+                latitudeUpperBound=latitudeUpperBound
+            )
+
+
+    # returns {componentName: (N, 5) array of longitudes, latitudes, altitudes, time, value}.
+    # Every component is written into one array allocated at its final size, from the cropped dense grids.
+    @classmethod
+    def getSamplesForTrainingFromWeatherReports(cls, weatherReportsWithSecondsFromStart, categoryName, componentNames, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound):
+        altitudes = nu.array([ float(level.split('_')[0]) for level in WeatherReport.windSpeedAltitudeBaseGradation ])
+        trainingSamples = {}
+        for componentName in componentNames:
+            componentIndex = WeatherReport.componentNames.index(componentName)
             # only samples in boundary should be used to train
-            df = df.loc[longitudeLowerBound <= df['longitude'], :]
-            df = df.loc[df['longitude'] <= longitudeUpperBound, :]
-            df = df.loc[latitudeLowerBound <= df['latitude'], :]
-            df = df.loc[df['latitude'] <= latitudeUpperBound, :]
-            df['altitude'] = altitude
-            df['time'] = secondsFromStart
-            trainingSamples = nu.concatenate([trainingSamples, df[['longitude', 'latitude', 'altitude', 'time', 'value']].values])
-        # delete the first row
-        trainingSamples = nu.delete(trainingSamples, obj=0, axis=0)
-        # print(trainingSamples)
+            selections = [] # (croppedWeatherReport, values, secondsFromStart, isValid)
+            for weatherReport, secondsFromStart in weatherReportsWithSecondsFromStart:
+                croppedWeatherReport = weatherReport.getCroppedWeatherReport(longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound)
+                values = getattr(croppedWeatherReport, categoryName)[:, componentIndex] # level x latitude x longitude
+                selections.append((croppedWeatherReport, values, secondsFromStart, ~nu.isnan(values)))
+            samples = nu.empty((sum(int(nu.count_nonzero(selection[-1])) for selection in selections), 5))
+            startRow = 0
+            for croppedWeatherReport, values, secondsFromStart, isValid in selections:
+                endRow = startRow + int(nu.count_nonzero(isValid))
+                samples[startRow:endRow, 0] = nu.broadcast_to(croppedWeatherReport.longitudes[None, None, :], values.shape)[isValid]
+                samples[startRow:endRow, 1] = nu.broadcast_to(croppedWeatherReport.latitudes[None, :, None], values.shape)[isValid]
+                samples[startRow:endRow, 2] = nu.broadcast_to(altitudes[:, None, None], values.shape)[isValid]
+                samples[startRow:endRow, 3] = secondsFromStart
+                samples[startRow:endRow, 4] = values[isValid]
+                startRow = endRow
+            trainingSamples[componentName] = samples
         return trainingSamples
 
 
+    # the spacing of an evenly spaced ascending axis, or None
+    @classmethod
+    def getAxisResolution(cls, axis):
+        if len(axis) < 2:
+            return None
+        resolution = (axis[-1] - axis[0]) / (len(axis) - 1)
+        if nu.abs(nu.diff(axis) - resolution).max() > WeatherReport.geoCoordinateEpsilon:
+            return None
+        return resolution
+
+
+    # the slice of an ascending axis within [lowerBound, upperBound]; index arithmetic when it is evenly spaced.
+    @classmethod
+    def getAxisSlice(cls, axis, resolution, lowerBound, upperBound):
+        if resolution is None:
+            return slice(nu.searchsorted(axis, lowerBound - WeatherReport.geoCoordinateEpsilon, side='left'), nu.searchsorted(axis, upperBound + WeatherReport.geoCoordinateEpsilon, side='right'))
+        start = int(nu.ceil((lowerBound - axis[0] - WeatherReport.geoCoordinateEpsilon) / resolution))
+        stop = int(nu.floor((upperBound - axis[0] + WeatherReport.geoCoordinateEpsilon) / resolution)) + 1
+        return slice(min(max(start, 0), len(axis)), min(max(stop, 0), len(axis)))
+
+
+    # the basic slice selecting indexes, None if they aren't consecutive and ascending
+    @classmethod
+    def getIndexesSlice(cls, indexes):
+        if list(indexes) != list(range(indexes[0], indexes[0] + len(indexes))):
+            return None
+        return slice(indexes[0], indexes[0] + len(indexes))
+
+
     # MARK: - Custom Private Helper Functions
 
     @classmethod
     def findBestParametersDirPathForTime(cls, _time):
         # round time
-        time = deepcopy(_time)
-        time = dt.datetime(time.year, time.month, time.day, time.hour//3*3, 0, 0)
-        # in case csvFilesPath doesn't exist
-        if not os.path.isdir(f'{WeatherReportProcessorBase.csvFilesPath}'):
-            raise FileNotFoundError
-        # get existing distributions
-        existingDistributions = os.listdir(f'{WeatherReportProcessorBase.csvFilesPath}')
-        existingDistributions = list(filter(lambda name: 'distributed' in name, existingDistributions))
-        if len(existingDistributions) == 0:
-            raise FileNotFoundError
-        existingDistributions = sorted([ dt.datetime.strptime(dirName.split('_')[0], WeatherReportProcessorBase.weatherReportDirNameFormat) for dirName in existingDistributions ], reverse=True)
-        # get the one distribution which contains the specific time
-        bestDistributionDirName = None
+        time = dt.datetime(_time.year, _time.month, _time.day, _time.hour//3*3, 0, 0)
         specificParametersDirName = time.strftime(WeatherReportProcessorBase.weatherReportDirNameFormat)
-        for distributionDate in existingDistributions:
-            distributionName = distributionDate.strftime(WeatherReportProcessorBase.weatherReportDirNameFormat) + '_distributed'
-            if specificParametersDirName in os.listdir(f"{WeatherReportProcessorBase.csvFilesPath}/{distributionName}"):
-                bestDistributionDirName = distributionName
-                break
+        # get the latest distribution which contains the specific time
+        distributionCatalogue = DistributionCatalogue.getShared()
+        bestDistributionDirName = distributionCatalogue.getBestDistributionName(specificParametersDirName)
         # if none of the distributions contain the specific time, raise NotFo
         if bestDistributionDirName is None:
             raise FileNotFoundError
         else:
-            return f"{WeatherReportProcessorBase.csvFilesPath}/{bestDistributionDirName}/{specificParametersDirName}"
+            return f"{distributionCatalogue.csvFilesPath}/{bestDistributionDirName}/{specificParametersDirName}"
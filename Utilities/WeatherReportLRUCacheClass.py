@@ -0,0 +1,73 @@
+import os
+from collections import OrderedDict
+
+from Spot4DClass import Spot4D
+from WeatherReportClass import WeatherReport
+
+
+# Keeps recently used WeatherReports keyed by (distributionName, timeDirName, bounds), evicting the least recently used
+# ones beyond memoryBudgetBytes. Crossing a 3-hour boundary then reuses the old future report as the new past report.
+# https://docs.python.org/3/library/collections.html#collections.OrderedDict.move_to_end
+class WeatherReportLRUCache():
+
+    # class properties
+    memoryBudgetBytes = 512 * 1024**2
+
+
+    def __init__(self, memoryBudgetBytes=None):
+        self.memoryBudgetBytes = WeatherReportLRUCache.memoryBudgetBytes if memoryBudgetBytes is None else memoryBudgetBytes
+        self.__weatherReports = OrderedDict() # key: (weatherReport, memoryUsage)
+        self.__memoryUsage = 0
+        self.hitCount = 0
+        self.missCount = 0
+
+
+    # MARK: - Public Methods
+
+    # bounds (longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound) is None for the whole decoded region.
+    def getWeatherReportAtSpot(self, spot, bounds=None):
+        parametersDirPath = WeatherReport.findBestParametersDirPathForTime(spot.time)
+        key = WeatherReportLRUCache.getKey(parametersDirPath, bounds)
+        if key in self.__weatherReports:
+            self.hitCount += 1
+            self.__weatherReports.move_to_end(key)
+            return self.__weatherReports[key][0]
+        # load from local device
+        self.missCount += 1
+        weatherReport = WeatherReport.initFromParametersDirPathAtFixTime(spot, parametersDirPath, bounds=bounds)
+        weatherReport.parametersDirPath = parametersDirPath
+        self.put(key, weatherReport)
+        return weatherReport
+
+
+    def put(self, key, weatherReport):
+        if key in self.__weatherReports:
+            self.__memoryUsage -= self.__weatherReports.pop(key)[1]
+        memoryUsage = weatherReport.getMemoryUsage()
+        self.__weatherReports[key] = (weatherReport, memoryUsage)
+        self.__memoryUsage += memoryUsage
+        # evict the least recently used, but always keep the newest one
+        while self.__memoryUsage > self.memoryBudgetBytes and len(self.__weatherReports) > 1:
+            _, (_, evictedMemoryUsage) = self.__weatherReports.popitem(last=False)
+            self.__memoryUsage -= evictedMemoryUsage
+
+
+    def clear(self):
+        self.__weatherReports.clear()
+        self.__memoryUsage = 0
+
+
+    def getMemoryUsage(self):
+        return self.__memoryUsage
+
+
+    def __len__(self):
+        return len(self.__weatherReports)
+
+
+    # MARK: - Custom Public Helper Functions
+
+    @classmethod
+    def getKey(cls, parametersDirPath, bounds=None):
+        distributionDirPath, timeDirName = os.path.split(parametersDirPath)
+        return (os.path.basename(distributionDirPath), timeDirName, None if bounds is None else tuple(bounds))
@@ -6,12 +6,20 @@ import urllib.request as urlrequest
 from urllib.error import URLError
 from enum import Enum
 import multiprocessing as mp
+import threading
 # self-made classes
 from Spot4DClass import Spot4D
+from Spot4DBatchClass import Spot4DBatch
 from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
 from WeatherReportClass import WeatherReport
+from WeatherReportLRUCacheClass import WeatherReportLRUCache
+from WeatherTileCacheClass import WeatherTileCache
+from PredictionModelStoreClass import PredictionModelStore
+from WeatherReportPrefetcherClass import WeatherReportPrefetcher
+from WeatherReportStatsClass import WeatherReportStats
 from WeatherReportRemoteProcessorClass import WeatherReportRemoteProcessor
 from LinearInterpolatorClass import LinearInterpolator
+from GridInterpolatorClass import GridInterpolator
 from GaussianProcessRegressorInterpolatorClass import GaussianProcessRegressorInterpolator
 from RbfInterpolatorClass import RbfInterpolator
 from VisibleWeatherDataClass import VisibleWeatherData
@@ -29,43 +37,99 @@ class WeatherReportLocalProcessor(WeatherReportProcessorBase):
     # class properties
     longitudeMargin = 5.0
     latitudeMargin = 5.0
+    defaultPredictionModelName = 'Grid' # the one queries are answered with
+    # models (re)built on every refresh. 'Grid' is served from the tile cache; 'Linear' (on the prepared Delaunay triangulation),
+    # 'Rbf' and 'GaussianProcessRegressor' retrain over the whole box, so they are opt-in, e.g. predictionModelNames=['Grid', 'Linear'].
+    predictionModelNames = ['Grid']
+    predictionModelClasses = {
+        'Linear': LinearInterpolator,
+        'Rbf': RbfInterpolator,
+        'GaussianProcessRegressor': GaussianProcessRegressorInterpolator
+    }
+    # models other than 'Grid' (already kept by the tile cache) are stored on disk
+    shouldStorePredictionModels = True
+    # degree, the GFS grid step. Training boxes are widened to multiples of it, so refreshes at nearby spots share stored models.
+    predictionModelBoundsStep = 0.5
 
 
-    def __init__(self):
+    # defaultPredictionModelName falls back to the first of predictionModelNames if the class default isn't among them.
+    def __init__(self, weatherReportCacheMemoryBudgetBytes=None, predictionModelNames=None, defaultPredictionModelName=None):
         # properties
+        self.predictionModelNames = WeatherReportLocalProcessor.predictionModelNames if predictionModelNames is None else predictionModelNames
+        if defaultPredictionModelName is None:
+            defaultPredictionModelName = WeatherReportLocalProcessor.defaultPredictionModelName if WeatherReportLocalProcessor.defaultPredictionModelName in self.predictionModelNames else self.predictionModelNames[0]
+        if defaultPredictionModelName not in self.predictionModelNames:
+            raise ValueError(f"defaultPredictionModelName must be one of {self.predictionModelNames}, not '{defaultPredictionModelName}'")
+        self.defaultPredictionModelName = defaultPredictionModelName
+        # recently used reports, shared across refreshes
+        self.weatherReportLRUCache = WeatherReportLRUCache(memoryBudgetBytes=weatherReportCacheMemoryBudgetBytes)
+        # prepared grid interpolators per tile, shared across refreshes
+        self.weatherTileCache = WeatherTileCache()
+        # trained models on disk, reused across restarts
+        self.predictionModelStore = PredictionModelStore()
+        # guards the two caches above, which the prefetcher thread uses too
+        self.sharedCachesLock = threading.Lock()
+        # counters and stage latencies, shared with the other classes of this process
+        self.stats = WeatherReportStats.getShared()
+        # builds the next window's caches in the background
+        self.weatherReportPrefetcher = WeatherReportPrefetcher(buildWeatherReportCaches=self.buildWeatherReportCaches, isSpotInsideWeatherReportCaches=WeatherReportLocalProcessor.isSpotInsideWeatherReportCaches)
         # weather report caches
         self.weatherReportCaches = {
             'pastWeatherReport': None,
             'futureWeatherReport': None,
             'predictionModels': {},
+            'bounds': None, # (timeLowerBound, timeUpperBound, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound, altitudeLowerBound, altitudeUpperBound) the models answer
             'state': WeatherReportCacheState.Empty
         }
 
 
     def isWeatherReportFromCurrentCacheAvailable(self, spot):
-        # if invalid, return False
-        if self.weatherReportCaches['state'] != WeatherReportCacheState.Valid or self.weatherReportCaches['pastWeatherReport'] is None or self.weatherReportCaches['futureWeatherReport'] is None or self.weatherReportCaches['predictionModels'] is {}:
-            return False
-        # if valid last time, check if spot is inside the boundary
-        # timeBefore, timeAfter = spot.getTimeBounds()
-        pastBoundarySpots = self.weatherReportCaches['pastWeatherReport'].get8WideBoundarySpots()
-        futureBoundarySpots = self.weatherReportCaches['futureWeatherReport'].get8WideBoundarySpots()
+        weatherReportCaches = self.weatherReportCaches
         # if caches can be used for certainTime, return yes.
-        if self.weatherReportCaches['state'] == WeatherReportCacheState.Valid and spot.isInside(pastBoundarySpots + futureBoundarySpots):
+        if WeatherReportLocalProcessor.isSpotInsideWeatherReportCaches(spot, weatherReportCaches):
+            return True
+        # swap in the caches prefetched for the next window, if they cover the spot
+        prefetchedWeatherReportCaches = self.weatherReportPrefetcher.popWeatherReportCaches(spot)
+        if prefetchedWeatherReportCaches is not None:
+            self.stats.count('prefetchHit')
+            self.weatherReportCaches = prefetchedWeatherReportCaches
             return True
         # else, return no.
-        else:
-            # set caches to neededRefresh state
-            self.weatherReportCaches['state'] = WeatherReportCacheState.Invalid
-            return False
+        # set caches to neededRefresh state
+        if weatherReportCaches['state'] == WeatherReportCacheState.Valid:
+            weatherReportCaches['state'] = WeatherReportCacheState.Invalid
+        return False
+
+
+    # start building the caches of the next window in the background when the spot comes close to it.
+    def prefetchNextWeatherReportCaches(self, spot):
+        self.weatherReportPrefetcher.didQuerySpot(spot)
+
+
+    # vectorized isWeatherReportFromCurrentCacheAvailable for (N, 4) longitude, latitude, altitude, time (seconds since 1970-01-01) or a Spot4DBatch.
+    # Returns a bool array and leaves the cache state as it is.
+    def areSpotsInsideCurrentCache(self, spotsNdarray):
+        spotsNdarray = spotsNdarray.toNdarray() if isinstance(spotsNdarray, Spot4DBatch) else nu.asarray(spotsNdarray, dtype='float').reshape(-1, 4)
+        if self.weatherReportCaches['state'] != WeatherReportCacheState.Valid or self.weatherReportCaches['bounds'] is None or len(self.weatherReportCaches['predictionModels']) == 0:
+            return nu.zeros(spotsNdarray.shape[0], dtype='bool')
+        timeLowerBound, timeUpperBound, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound, altitudeLowerBound, altitudeUpperBound = self.weatherReportCaches['bounds']
+        timeLowerBound = (timeLowerBound - Spot4DBatch.epoch).total_seconds()
+        timeUpperBound = (timeUpperBound - Spot4DBatch.epoch).total_seconds()
+        return (
+            (timeLowerBound <= spotsNdarray[:, 3]) & (spotsNdarray[:, 3] <= timeUpperBound) &
+            (longitudeLowerBound <= spotsNdarray[:, 0]) & (spotsNdarray[:, 0] <= longitudeUpperBound) &
+            (latitudeLowerBound <= spotsNdarray[:, 1]) & (spotsNdarray[:, 1] <= latitudeUpperBound) &
+            (altitudeLowerBound <= spotsNdarray[:, 2]) & (spotsNdarray[:, 2] <= altitudeUpperBound)
+        )
 
 
     # heavy calculation done on main thread.
     def getWeatherReportFromCurrentCache(self, spot):
-        return VisibleWeatherData(
-            interpolator=self.weatherReportCaches['predictionModels']['Linear'],
-            centerSpot=spot
-        )
+        with self.stats.measure('interpolation'):
+            return VisibleWeatherData(
+                interpolator=self.weatherReportCaches['predictionModels'][self.defaultPredictionModelName],
+                centerSpot=spot
+            )
         # return self.weatherReportCaches['predictionModels']['Linear'].predict(spot)
 
 
@@ -81,38 +145,137 @@ class WeatherReportLocalProcessor(WeatherReportProcessorBase):
         return True
 
 
+    # trajectory: (N, 4) array (or Spot4DBatch) of longitude, latitude, altitude and time in seconds since 1970-01-01 (UTC), e.g. a planned route.
+    # Points are grouped by 3-hour window and each window is loaded and interpolated once. Returns (N, 2) u/v winds, nan where no report covers the point.
+    def getWindsAlongTrajectory(self, trajectory):
+        spotsBatch = trajectory if isinstance(trajectory, Spot4DBatch) else Spot4DBatch.initFromNdarray(trajectory)
+        trajectory = spotsBatch.toNdarray()
+        winds = nu.full((trajectory.shape[0], 2), nu.nan)
+        windowsStartSeconds, _ = spotsBatch.getTimeBounds()
+        uniqueWindowsStartSeconds, inverse = nu.unique(windowsStartSeconds, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for windowIndex, windowStartSeconds in enumerate(uniqueWindowsStartSeconds):
+            isInWindow = inverse == windowIndex
+            points = trajectory[isInWindow]
+            timeBefore = Spot4DBatch.epoch + dt.timedelta(seconds=float(windowStartSeconds))
+            timeAfter = timeBefore + dt.timedelta(hours=Spot4DBatch.forecastIntervalHours)
+            with self.sharedCachesLock:
+                # only the part of the reports under the tiles of the points
+                reportBounds = self.weatherTileCache.getTilesBounds(points[:, 0].min(), points[:, 0].max(), points[:, 1].min(), points[:, 1].max())
+                try:
+                    pastWeatherReport = self.weatherReportLRUCache.getWeatherReportAtSpot(spot=Spot4D(timeBefore, points[0, 0], points[0, 1], points[0, 2]), bounds=reportBounds)
+                    futureWeatherReport = self.weatherReportLRUCache.getWeatherReportAtSpot(spot=Spot4D(timeAfter, points[0, 0], points[0, 1], points[0, 2]), bounds=reportBounds)
+                except FileNotFoundError as error:
+                    print(f"Warning: {timeBefore} or {timeAfter} is covered by none of the distribution.")
+                    continue
+                # only the tiles the points pass through
+                interpolator = self.weatherTileCache.getTiledGridInterpolatorAtSpots(
+                    pastWeatherReport=pastWeatherReport,
+                    futureWeatherReport=futureWeatherReport,
+                    spotsNdarray=points
+                )
+            spotsNdarray = points.copy()
+            spotsNdarray[:, 3] -= windowStartSeconds
+            with self.stats.measure('trajectoryInterpolation'):
+                winds[isInWindow, 0], winds[isInWindow, 1] = interpolator.predictFromSpots_ndarray(spotsNdarray)
+        return winds
+
+
     def refreshCurrentWeathorReportCacheFromLocalDevice(self, spot):
-        timeBefore, timeAfter = spot.getTimeBounds()
-        # refresh pastReport
-        pastSpot = Spot4D.initFromCopy(spot)
-        pastSpot.time = timeBefore
-        self.weatherReportCaches['pastWeatherReport'] = WeatherReport.initFromCenterSpotAtFixTime(spot=pastSpot)
-        # refresh future report
-        futureSpot = Spot4D.initFromCopy(spot)
-        futureSpot.time = timeAfter
-        self.weatherReportCaches['futureWeatherReport'] = WeatherReport.initFromCenterSpotAtFixTime(spot=futureSpot)
-
-        # refresh model
-        # boundaries needed
-        longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound, _, _ = spot.getSurroundingLongitudeLatitudeAltitudeBoundary(longitudeMargin=WeatherReportLocalProcessor.longitudeMargin, latitudeMargin=WeatherReportLocalProcessor.latitudeMargin)
-
-        # init prediction models
-        self.weatherReportCaches['predictionModels']['Linear'] = LinearInterpolator.initFromWeatherReportCaches(
-            pastWeatherReport=self.weatherReportCaches['pastWeatherReport'],
-            futureWeatherReport=self.weatherReportCaches['futureWeatherReport'],
-            longitudeLowerBound = longitudeLowerBound,
-            longitudeUpperBound = longitudeUpperBound,
-            latitudeLowerBound = latitudeLowerBound,
-            latitudeUpperBound = latitudeUpperBound
-        )
-        # self.weatherReportCaches['predictionModels']['GaussianProcessRegressor'] = GaussianProcessRegressorInterpolator.initFromWeatherReportCaches(
-        #     pastWeatherReport=self.weatherReportCaches['pastWeatherReport'],
-        #     futureWeatherReport=self.weatherReportCaches['futureWeatherReport'],
-        #     longitudeLowerBound = longitudeLowerBound,
-        #     longitudeUpperBound = longitudeUpperBound,
-        #     latitudeLowerBound = latitudeLowerBound,
-        #     latitudeUpperBound = latitudeUpperBound
-        # )
+        # replaced as a whole, so a query never sees a half refreshed cache
+        self.weatherReportCaches = self.buildWeatherReportCaches(spot)
+
 
+    # new caches for the window spot lies in. Also run by the prefetcher thread, so the shared LRU and tile caches are used under sharedCachesLock;
+    # training runs outside of it, so a prefetch never holds up queries.
+    def buildWeatherReportCaches(self, spot):
+        weatherReportCaches = {}
+        with self.stats.measure('buildWeatherReportCaches'):
+            timeBefore, timeAfter = spot.getTimeBounds()
+            # refresh pastReport. After crossing a 3-hour boundary it is the previous future report, taken from the LRU cache.
+            pastSpot = Spot4D.initFromCopy(spot)
+            pastSpot.time = timeBefore
+            # refresh future report
+            futureSpot = Spot4D.initFromCopy(spot)
+            futureSpot.time = timeAfter
+
+            # boundaries needed by the models
+            longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound, _, _ = spot.getSurroundingLongitudeLatitudeAltitudeBoundary(longitudeMargin=WeatherReportLocalProcessor.longitudeMargin, latitudeMargin=WeatherReportLocalProcessor.latitudeMargin)
+            longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound = WeatherReportLocalProcessor.getSnappedBounds((longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound))
+            # the reports are loaded only under the tiles of that box, which contain it
+            reportBounds = self.weatherTileCache.getTilesBounds(longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound)
+            with self.sharedCachesLock:
+                weatherReportCaches['pastWeatherReport'] = self.weatherReportLRUCache.getWeatherReportAtSpot(spot=pastSpot, bounds=reportBounds)
+                weatherReportCaches['futureWeatherReport'] = self.weatherReportLRUCache.getWeatherReportAtSpot(spot=futureSpot, bounds=reportBounds)
+
+            # refresh model
+
+            # init prediction models, from the store if trained before (maybe by a previous process)
+            weatherReportCaches['predictionModels'] = {}
+            for modelName in self.predictionModelNames:
+                weatherReportCaches['predictionModels'][modelName] = self.__getPredictionModel(modelName, weatherReportCaches['pastWeatherReport'], weatherReportCaches['futureWeatherReport'], (longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound))
+
+            # store the box the models are trained on, as far as both reports cover it, so that the hit check is a few comparisons.
+            # A spot leaving it is a miss, which refreshes the models around it.
+            pastWeatherReport = weatherReportCaches['pastWeatherReport']
+            futureWeatherReport = weatherReportCaches['futureWeatherReport']
+            weatherReportCaches['bounds'] = (
+                pastWeatherReport.date,
+                futureWeatherReport.date,
+                float(max(longitudeLowerBound, pastWeatherReport.longitudeLowerBound, futureWeatherReport.longitudeLowerBound)),
+                float(min(longitudeUpperBound, pastWeatherReport.longitudeUpperBound, futureWeatherReport.longitudeUpperBound)),
+                float(max(latitudeLowerBound, pastWeatherReport.latitudeLowerBound, futureWeatherReport.latitudeLowerBound)),
+                float(min(latitudeUpperBound, pastWeatherReport.latitudeUpperBound, futureWeatherReport.latitudeUpperBound)),
+                float(max(pastWeatherReport.altitudeLowerBound, futureWeatherReport.altitudeLowerBound)),
+                float(min(pastWeatherReport.altitudeUpperBound, futureWeatherReport.altitudeUpperBound))
+            )
         # refresh state
-        self.weatherReportCaches['state'] = WeatherReportCacheState.Valid
+        weatherReportCaches['state'] = WeatherReportCacheState.Valid
+        return weatherReportCaches
+
+
+    # MARK: - Custom Public Helper Functions
+
+    # (longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound) widened to multiples of predictionModelBoundsStep
+    @classmethod
+    def getSnappedBounds(cls, bounds):
+        step = WeatherReportLocalProcessor.predictionModelBoundsStep
+        longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound = bounds
+        return (
+            float(nu.floor(longitudeLowerBound / step) * step),
+            float(nu.ceil(longitudeUpperBound / step) * step),
+            float(nu.floor(latitudeLowerBound / step) * step),
+            float(nu.ceil(latitudeUpperBound / step) * step)
+        )
+
+
+    @classmethod
+    def isSpotInsideWeatherReportCaches(cls, spot, weatherReportCaches):
+        # if invalid, return False
+        if weatherReportCaches['state'] != WeatherReportCacheState.Valid or weatherReportCaches['bounds'] is None or len(weatherReportCaches['predictionModels']) == 0:
+            return False
+        # check if spot is inside the boundary
+        timeLowerBound, timeUpperBound, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound, altitudeLowerBound, altitudeUpperBound = weatherReportCaches['bounds']
+        return timeLowerBound <= spot.time <= timeUpperBound and longitudeLowerBound <= spot.longitude <= longitudeUpperBound and latitudeLowerBound <= spot.latitude <= latitudeUpperBound and altitudeLowerBound <= spot.altitude <= altitudeUpperBound
+
+
+    # MARK: - Helper Custom Private methods
+
+    def __getPredictionModel(self, modelName, pastWeatherReport, futureWeatherReport, bounds):
+        # the tiles of 'Grid' are cheap to build and kept by the tile cache already
+        shouldStorePredictionModel = WeatherReportLocalProcessor.shouldStorePredictionModels and modelName != 'Grid'
+        if shouldStorePredictionModel:
+            predictionModel = self.predictionModelStore.get(modelName, pastWeatherReport, futureWeatherReport, bounds)
+            if predictionModel is not None:
+                self.stats.count('predictionModelStoreHit')
+                return predictionModel
+        with self.stats.measure(f'training.{modelName}'):
+            if modelName == 'Grid':
+                # only the tiles newly entered are built
+                with self.sharedCachesLock:
+                    predictionModel = self.weatherTileCache.getTiledGridInterpolator(pastWeatherReport, futureWeatherReport, *bounds)
+            else:
+                predictionModel = WeatherReportLocalProcessor.predictionModelClasses[modelName].initFromWeatherReportCaches(pastWeatherReport, futureWeatherReport, *bounds)
+        if shouldStorePredictionModel:
+            self.predictionModelStore.put(modelName, pastWeatherReport, futureWeatherReport, bounds, predictionModel)
+        return predictionModel
@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from Spot4DClass import Spot4D
+
+
+# Builds the caches of the next 3-hour window on a worker thread while queries are still answered from the current ones.
+# The spot at the start of the next window is extrapolated from the last two queried spots (current time and heading).
+# The local processor swaps the result in with a single assignment when a query leaves the current window.
+# Every state change happens on the querying thread; the worker only returns the caches, or None if they couldn't be built.
+class WeatherReportPrefetcher():
+
+    # class properties
+    prefetchLeadSeconds = 1800 # start building the next window this long before it begins
+    altitudeLowerBound = 10 # meter
+    altitudeUpperBound = 100 # meter
+
+
+    # buildWeatherReportCaches(spot) returns the caches of the window spot lies in, or raises FileNotFoundError if they aren't downloaded yet.
+    # isSpotInsideWeatherReportCaches(spot, weatherReportCaches) tells if they can answer spot.
+    def __init__(self, buildWeatherReportCaches, isSpotInsideWeatherReportCaches, prefetchLeadSeconds=None):
+        self.buildWeatherReportCaches = buildWeatherReportCaches
+        self.isSpotInsideWeatherReportCaches = isSpotInsideWeatherReportCaches
+        self.prefetchLeadSeconds = WeatherReportPrefetcher.prefetchLeadSeconds if prefetchLeadSeconds is None else prefetchLeadSeconds
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.__future = None # of the caches, None if they couldn't be built
+        self.__futureWindowStartTime = None
+        self.__previousSpot = None
+
+
+    # MARK: - Public Methods
+
+    def didQuerySpot(self, spot):
+        previousSpot, self.__previousSpot = self.__previousSpot, spot
+        _, timeAfter = spot.getTimeBounds()
+        if (timeAfter - spot.time).total_seconds() > self.prefetchLeadSeconds:
+            return
+        # already built or being built; a failed build is tried again on a later query
+        if self.__futureWindowStartTime == timeAfter and not self.__didBuildFail():
+            return
+        self.__futureWindowStartTime = timeAfter
+        self.__future = self.executor.submit(self.__build, WeatherReportPrefetcher.getExtrapolatedSpot(previousSpot, spot, timeAfter))
+
+
+    # the prefetched caches if they can answer spot, waiting for them if they are still being built; otherwise None.
+    def popWeatherReportCaches(self, spot):
+        future = self.__future
+        if future is None or self.__futureWindowStartTime is None or not (self.__futureWindowStartTime <= spot.time):
+            return None
+        weatherReportCaches = future.result()
+        if weatherReportCaches is None:
+            self.__future = None
+            self.__futureWindowStartTime = None
+            return None
+        if not self.isSpotInsideWeatherReportCaches(spot, weatherReportCaches):
+            return None
+        self.__future = None
+        return weatherReportCaches
+
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+    # MARK: - Custom Public Helper Functions
+
+    # where spot will be at time, moving on as it did since previousSpot.
+    @classmethod
+    def getExtrapolatedSpot(cls, previousSpot, spot, time):
+        if previousSpot is None or previousSpot.time >= spot.time:
+            return Spot4D(time, spot.longitude, spot.latitude, spot.altitude)
+        ratio = (time - spot.time).total_seconds() / (spot.time - previousSpot.time).total_seconds()
+        return Spot4D(
+            time,
+            spot.longitude + (spot.longitude - previousSpot.longitude) * ratio,
+            spot.latitude + (spot.latitude - previousSpot.latitude) * ratio,
+            min(max(spot.altitude + (spot.altitude - previousSpot.altitude) * ratio, WeatherReportPrefetcher.altitudeLowerBound), WeatherReportPrefetcher.altitudeUpperBound)
+        )
+
+
+    # MARK: - Helper Custom Private methods
+
+    # runs on the worker thread, so it raises nothing into the query that waits for it
+    def __build(self, spot):
+        try:
+            return self.buildWeatherReportCaches(spot)
+        except FileNotFoundError as error:
+            # not downloaded yet
+            return None
+        except Exception as error:
+            print(f"Warning: Can't prefetch the caches at {spot.time} because: {error!r}; Skipping ...")
+            return None
+
+
+    def __didBuildFail(self):
+        return self.__future is not None and self.__future.done() and self.__future.result() is None
@@ -1,10 +1,25 @@
 from enum import Enum
+import os
 
 
 class WeatherReportProcessorBase():
 
     # class properties
     weatherReportDirNameFormat = "%Y%m%d%H%M"
-    GFSWeatherReportsStorageDirPath = "/Users/yuyang/Documents/work/SimpleZeroConsumptionPlane/Utilities/RawGFSWeatherReportsStorage"
+    storageDirPathEnvironmentVariableName = 'GFS_WEATHER_REPORTS_STORAGE_DIR_PATH'
+    GFSWeatherReportsStorageDirPath = os.environ.get(storageDirPathEnvironmentVariableName, "/Users/yuyang/Documents/work/SimpleZeroConsumptionPlane/Utilities/RawGFSWeatherReportsStorage")
     gribFilesPath = f'{GFSWeatherReportsStorageDirPath}/gribFiles'
     csvFilesPath = f'{GFSWeatherReportsStorageDirPath}/csvFiles'
+    predictionModelsPath = f'{GFSWeatherReportsStorageDirPath}/predictionModels'
+    forecastPrecedingHours = list(range(0, 385, 3)) # forecast hours each GFS distribution covers
+
+
+    # move every storage path under storageDirPath, e.g. to a temporary dir for benchmarks.
+    # Call it before the processors start, as they read the paths when they are created; spawned processes take it from the environment.
+    @classmethod
+    def setStorageDirPath(cls, storageDirPath):
+        os.environ[WeatherReportProcessorBase.storageDirPathEnvironmentVariableName] = storageDirPath
+        WeatherReportProcessorBase.GFSWeatherReportsStorageDirPath = storageDirPath
+        WeatherReportProcessorBase.gribFilesPath = f'{storageDirPath}/gribFiles'
+        WeatherReportProcessorBase.csvFilesPath = f'{storageDirPath}/csvFiles'
+        WeatherReportProcessorBase.predictionModelsPath = f'{storageDirPath}/predictionModels'
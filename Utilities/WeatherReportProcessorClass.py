@@ -20,30 +20,74 @@ from time import sleep
 from Spot4DClass import Spot4D
 from WeatherReportRemoteProcessorClass import WeatherReportRemoteProcessor
 from WeatherReportLocalProcessorClass import WeatherReportLocalProcessor
+from DistributionCatalogueClass import DistributionCatalogue
+from WeatherReportStatsClass import WeatherReportStats
 
 
 class WeatherReportProcessor():
-    def __init__(self):
+
+    # class properties
+    shouldCollectStats = False
+    statsLogIntervalSeconds = None # print the stats line this often, None for never
+
+
+    # predictionModelNames selects the models of WeatherReportLocalProcessor, e.g. ['Grid', 'Linear']; its class default if None.
+    def __init__(self, shouldCollectStats=None, statsLogIntervalSeconds=None, predictionModelNames=None):
         # properties
-        self.weatherReportRemoteProcessor = WeatherReportRemoteProcessor(currentSpot=Spot4D.initByDefaultValue())
-        self.weatherReportLocalProcessor = WeatherReportLocalProcessor()
+        # counters and stage latencies of this process; costs next to nothing when not collected
+        self.stats = WeatherReportStats.getShared()
+        self.stats.isEnabled = WeatherReportProcessor.shouldCollectStats if shouldCollectStats is None else shouldCollectStats
+        statsLogIntervalSeconds = WeatherReportProcessor.statsLogIntervalSeconds if statsLogIntervalSeconds is None else statsLogIntervalSeconds
+        if self.stats.isEnabled and statsLogIntervalSeconds is not None:
+            self.stats.startPeriodicLogging(statsLogIntervalSeconds)
+        self.weatherReportRemoteProcessor = WeatherReportRemoteProcessor(currentSpot=Spot4D.initByDefaultValue(), shouldCollectStats=self.stats.isEnabled)
+        self.weatherReportLocalProcessor = WeatherReportLocalProcessor(predictionModelNames=predictionModelNames)
+        # learn the slices the decode process publishes without touching the file system
+        DistributionCatalogue.getShared().listen(self.weatherReportRemoteProcessor.publishedSlicesQueue)
+        # and the download and decode throughput of the background processes
+        self.stats.listen(self.weatherReportRemoteProcessor.statsQueue)
         # asyncronously download WeatherReport from remote server continuously
         self.weatherReportRemoteProcessor.asyncDownloadLatestWeatherReportFromRemoteServerContinuously()
         self.weatherReportRemoteProcessor.asyncDecodeLatestWeatherReportToCSVFilesContinuously()
 
 
     def getWeatherReportAtSpot(self, spot):
-        # if weather report at certainTime can be directly calculated from curret cache
-        if self.weatherReportLocalProcessor.isWeatherReportFromCurrentCacheAvailable(spot):
-            return self.weatherReportLocalProcessor.getWeatherReportFromCurrentCache(spot)
-        # if weather report should and can be derived from data stored at local device
-        elif self.weatherReportLocalProcessor.isWeatherReportAtLocalDeviceAvailable(spot):
-            self.weatherReportLocalProcessor.refreshCurrentWeathorReportCacheFromLocalDevice(spot)
-            return self.weatherReportLocalProcessor.getWeatherReportFromCurrentCache(spot)
-        # wait for the data from remote server
-        else:
-            return self.weatherReportRemoteProcessor.syncGetLatestWeatherReportFromRemoteServer(spot)
+        with self.stats.measure('getWeatherReportAtSpot'):
+            # let the background processes schedule and crop around the current spot
+            self.weatherReportRemoteProcessor.updateCurrentSpot(spot)
+            # let the next window be prepared before the spot gets there
+            self.weatherReportLocalProcessor.prefetchNextWeatherReportCaches(spot)
+            # if weather report at certainTime can be directly calculated from curret cache
+            if self.weatherReportLocalProcessor.isWeatherReportFromCurrentCacheAvailable(spot):
+                self.stats.count('cacheHit')
+                return self.weatherReportLocalProcessor.getWeatherReportFromCurrentCache(spot)
+            # if weather report should and can be derived from data stored at local device
+            elif self.weatherReportLocalProcessor.isWeatherReportAtLocalDeviceAvailable(spot):
+                self.stats.count('localRefresh')
+                with self.stats.measure('localRefresh'):
+                    self.weatherReportLocalProcessor.refreshCurrentWeathorReportCacheFromLocalDevice(spot)
+                return self.weatherReportLocalProcessor.getWeatherReportFromCurrentCache(spot)
+            # wait for the data from remote server
+            else:
+                self.stats.count('remoteWait')
+                with self.stats.measure('remoteWait'):
+                    return self.weatherReportRemoteProcessor.syncGetLatestWeatherReportFromRemoteServer(spot)
+
+
+    # (N, 4) longitude, latitude, altitude, time in seconds since 1970-01-01 (UTC) -> (N, 2) u/v winds, from data stored at local device only.
+    def getWindsAlongTrajectory(self, trajectory):
+        return self.weatherReportLocalProcessor.getWindsAlongTrajectory(trajectory)
+
 
+    # counters, per stage latencies and download/decode throughput collected so far, as a json serializable dict.
+    def getStatsSnapshot(self):
+        snapshot = self.stats.getSnapshot()
+        localProcessor = self.weatherReportLocalProcessor
+        snapshot['caches'] = {
+            'weatherReportLRUCache': {'hitCount': localProcessor.weatherReportLRUCache.hitCount, 'missCount': localProcessor.weatherReportLRUCache.missCount, 'memoryUsage': localProcessor.weatherReportLRUCache.getMemoryUsage()},
+            'weatherTileCache': {'builtTileCount': localProcessor.weatherTileCache.builtTileCount, 'reusedTileCount': localProcessor.weatherTileCache.reusedTileCount, 'tileAmount': len(localProcessor.weatherTileCache)}
+        }
+        return snapshot
 
 
     def __translateCertainTimeToWeatherReportDatetimeFormatString(self, certainTime):
@@ -2,6 +2,7 @@ import numpy as nu
 import pandas as pd
 import datetime as dt
 from time import sleep
+import time
 import pickle
 import subprocess as sp
 import multiprocessing as mp
@@ -14,9 +15,20 @@ import shutil
 import tempfile
 import socket
 import signal
+import re
+import random
+import queue
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION
+from concurrent.futures import wait as futuresWait
 from enum import Enum
 
 from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from GFSDistributionCubeClass import GFSDistributionCube
+from DistributionCatalogueClass import DistributionCatalogue
+from GribDownloaderClass import GribDownloader
+from ForecastHoursSchedulerClass import ForecastHoursScheduler
 from Spot4DClass import Spot4D
 
 # socket.setdefaulttimeout(90)
@@ -27,12 +39,31 @@ class WeatherReportRemoteProcessor(WeatherReportProcessorBase):
     # class properties
     baseurl = "https://www.ncei.noaa.gov/data/global-forecast-system/access/grid-004-0.5-degree/forecast"
     baseurlExtension = "grb2"
+    baseurlIndexExtension = "inv" # wgrib2 inventory (.idx on NOMADS) listing the byte offset of every message
+    # only these messages are downloaded. Region cropping still happens in decodeGribToCSVFiles.sh, since a message always covers the whole globe.
+    shouldDownloadSubset = True
+    subsetMessagePattern = r':(UGRD|VGRD):(10|20|30|40|50|80|100) m above ground:'
+    downloadConcurrency = 4
+    retryBackoffBase = 1.0 # seconds
+    retryBackoffUpperBound = 300.0 # seconds
+    downloadHorizonHours = 48 # forecast hours ahead of the current time that are downloaded first
+    downloadIdleHorizonHours = 120 # forecast hours ahead that are filled in with the idle bandwidth. Set 384 for all.
+    epoch = dt.datetime(1970, 1, 1)
     longitudeMargin = 20.0
     latitudeMargin = 20.0
     downloadTimeout = 3600
+    decodeWorkerAmount = os.cpu_count()
+    shouldCollectStats = False
 
 
-    def __init__(self, currentSpot):
+    # downloadPriorityFunction(forecastTime, currentTime) returns the priority of a forecast hour, lower first. It must be picklable.
+    def __init__(self, currentSpot, decodeWorkerAmount=None, downloadConcurrency=None, downloadHorizonHours=None, downloadIdleHorizonHours=None, downloadPriorityFunction=None, shouldCollectStats=None):
+        self.decodeWorkerAmount = WeatherReportRemoteProcessor.decodeWorkerAmount if decodeWorkerAmount is None else decodeWorkerAmount
+        self.downloadConcurrency = WeatherReportRemoteProcessor.downloadConcurrency if downloadConcurrency is None else downloadConcurrency
+        self.downloadHorizonHours = WeatherReportRemoteProcessor.downloadHorizonHours if downloadHorizonHours is None else downloadHorizonHours
+        self.downloadIdleHorizonHours = WeatherReportRemoteProcessor.downloadIdleHorizonHours if downloadIdleHorizonHours is None else downloadIdleHorizonHours
+        self.downloadPriorityFunction = downloadPriorityFunction
+
         self.shouldStopListeningRemoteGFSReport = mp.Event()
         self.shouldStopListeningRemoteGFSReport.clear()
 
@@ -42,33 +73,47 @@ class WeatherReportRemoteProcessor(WeatherReportProcessorBase):
         self.shouldStopDecodingToCSVFiles = mp.Event()
         self.shouldStopDecodingToCSVFiles.clear()
 
+        # paths of grib files that finished downloading, handed over from the download process to the decode process
+        self.downloadedGribFilesQueue = mp.Queue()
+        # (distributionName, timeDirName) of every published slice, for the DistributionCatalogue of the main process
+        self.publishedSlicesQueue = mp.Queue()
+        # (transferName, byteAmount, seconds) of every downloaded and decoded grib file, for the WeatherReportStats of the main process.
+        # None when stats are not collected, since nothing would drain it.
+        shouldCollectStats = WeatherReportRemoteProcessor.shouldCollectStats if shouldCollectStats is None else shouldCollectStats
+        self.statsQueue = mp.Queue() if shouldCollectStats else None
+
         # create shared spot
         self.currentLongitude = mp.Value('d', float(currentSpot.longitude))
         self.currentLatitude = mp.Value('d', float(currentSpot.latitude))
         self.currentAltitude = mp.Value('d', float(currentSpot.altitude))
+        self.currentTime = mp.Value('d', (currentSpot.time - WeatherReportRemoteProcessor.epoch).total_seconds())
 
 
     # MARK: - Public Methods
 
     def asyncDownloadLatestWeatherReportFromRemoteServerContinuously(self):
-        process = mp.Process(target=helper_asyncDownloadLatestWeatherReportFromRemoteServerContinuously, args=(self.shouldStopListeningRemoteGFSReport, self.didDownloadProcedureEnd))
+        process = mp.Process(target=helper_asyncDownloadLatestWeatherReportFromRemoteServerContinuously, args=(self.shouldStopListeningRemoteGFSReport, self.didDownloadProcedureEnd, self.downloadedGribFilesQueue, self.downloadConcurrency, self.currentTime, self.downloadHorizonHours, self.downloadIdleHorizonHours, self.downloadPriorityFunction, self.statsQueue))
         process.start()
 
 
     def asyncDecodeLatestWeatherReportToCSVFilesContinuously(self):
-        process = mp.Process(target=helper_asyncDecodeLatestWeatherReportToCSVFilesContinuously, args=(self.shouldStopDecodingToCSVFiles, self.didDownloadProcedureEnd, self.currentLongitude, self.currentLatitude, self.currentAltitude))
+        process = mp.Process(target=helper_asyncDecodeLatestWeatherReportToCSVFilesContinuously, args=(self.shouldStopDecodingToCSVFiles, self.downloadedGribFilesQueue, self.publishedSlicesQueue, self.currentLongitude, self.currentLatitude, self.currentAltitude, self.decodeWorkerAmount, self.statsQueue))
         process.start()
 
 
     def updateCurrentSpot(self, currentSpot):
-        self.currentLongitude = currentSpot.longitude
-        self.currentLatitude = currentSpot.latitude
-        self.currentAltitude = currentSpot.altitude
+        self.currentLongitude.value = currentSpot.longitude
+        self.currentLatitude.value = currentSpot.latitude
+        self.currentAltitude.value = currentSpot.altitude
+        self.currentTime.value = (currentSpot.time - WeatherReportRemoteProcessor.epoch).total_seconds()
 
 
 # Custom Functions from async usage
 
-def helper_asyncDownloadLatestWeatherReportFromRemoteServerContinuously(shouldStopListeningRemoteGFSReport, didDownloadProcedureEnd):
+def helper_asyncDownloadLatestWeatherReportFromRemoteServerContinuously(shouldStopListeningRemoteGFSReport, didDownloadProcedureEnd, downloadedGribFilesQueue, downloadConcurrency, currentTime, downloadHorizonHours, downloadIdleHorizonHours, downloadPriorityFunction, statsQueue):
+    # stats nobody read yet must not keep the process from exiting
+    if statsQueue is not None:
+        statsQueue.cancel_join_thread()
     # final function
     def defer(didSucceed=False):
         if didSucceed:
@@ -125,162 +170,272 @@ def helper_asyncDownloadLatestWeatherReportFromRemoteServerContinuously(shouldSt
         print(f"{dt.datetime.utcnow().strftime('%Y%m%d_%H:%M')}: Found latest distribution of {latestAvailableTime.strftime('%Y%m%d')}_{latestAvailableTime.strftime('%H')}00. Start Download ...")
         del statusCode
 
-        # if some previous downloaded data is in local storage, check if the new download is needed
-        existingDirs = os.listdir(f'{WeatherReportProcessorBase.gribFilesPath}')
-        existingDirs = list(filter(lambda name: 'distributed' in name, existingDirs))
-        if len(existingDirs) != 0:
-            existingLatestDistributionDate = []
-            for name in existingDirs:
-                ymdhM, _ = name.split('_')
-                existingLatestDistributionDate.append(dt.datetime.strptime(ymdhM, WeatherReportProcessorBase.weatherReportDirNameFormat))
-            existingLatestDistributionDate = sorted(existingLatestDistributionDate, reverse=True)
-            existingLatestDistributionDate = existingLatestDistributionDate[0]
-            # if latest local distribution matches the remote distribution, no download need to be conducted
-            if existingLatestDistributionDate == latestAvailableTime:
-                defer()
-                continue
-
-        # download latest contents
+        # download the latest contents, nearest to the current time first
         storeDirName = f"{latestAvailableTime.strftime('%Y%m%d%H')}00_distributed"
-        if os.path.isdir(f"{WeatherReportProcessorBase.gribFilesPath}/{storeDirName}"):
-            shutil.rmtree(f"{WeatherReportProcessorBase.gribFilesPath}/{storeDirName}")
-        os.mkdir(f"{WeatherReportProcessorBase.gribFilesPath}/{storeDirName}")
-        precedingHours = 0
-        while precedingHours < 385:
-        # for precedingHours in nu.arange(0, 385, 3, dtype='int'):
-            latestURL = __getLatestURLFromTime(latestAvailableTime, precedingHours=precedingHours)
-            forecastForDate = latestAvailableTime + dt.timedelta(hours=int(precedingHours))
-            storeFileName = forecastForDate.strftime("%Y%m%d%H") + "00"
-            storePath = f"{WeatherReportProcessorBase.gribFilesPath}/{storeDirName}/{storeFileName}.{WeatherReportRemoteProcessor.baseurlExtension}"
-            try:
-                downloadLargeFileWithinTime(url=latestURL, storePath=storePath, timeout=WeatherReportRemoteProcessor.downloadTimeout)
-            except mp.TimeoutError as error: # says much about error handling: https://docs.python.org/3/howto/urllib2.html#urllib-howto
-                print(f"Warning: Can't download grib2 content from {latestURL} because: timeout; Retrying ...")
-                if os.path.exists(storePath):
-                    os.remove(storePath)
-                sleep(10) # sleep for a while just in case for a bad connection is happening.
-                precedingHours -= 3
-            except URLError as error: # says much about error handling: https://docs.python.org/3/howto/urllib2.html#urllib-howto
-                print(f"Warning: Can't download grib2 content from {latestURL} because: {error.reason}; Retrying ...")
-                if os.path.exists(storePath):
-                    os.remove(storePath)
-                sleep(10) # sleep for a while just in case for a bad connection is happening.
-                precedingHours -= 3
-            except HTTPError as error: # says much about error handling: https://docs.python.org/3/howto/urllib2.html#urllib-howto
-                print(f"Warning: Can't donwload grib2 content from {latestURL} with error code {error.code}, and reason: {error.reason}; Retrying ...")
-                print(error.read())
-                if os.path.exists(storePath):
-                    os.remove(storePath)
-                sleep(10)
-                precedingHours -= 3
-            except ContentTooShortError as error:
-                print(f"Warning: Download grib2 content from {latestURL} is interrupted ; Retrying ...")
-                if os.path.exists(storePath):
-                    os.remove(storePath)
-                sleep(10) # sleep for a while just in case for a bad connection is happening.
-                precedingHours -= 3
-            precedingHours += 3
+        scheduler = ForecastHoursScheduler(
+            distributionDate=latestAvailableTime,
+            forecastPrecedingHours=WeatherReportProcessorBase.forecastPrecedingHours,
+            getCurrentTime=lambda: WeatherReportRemoteProcessor.epoch + dt.timedelta(seconds=currentTime.value),
+            horizonHours=downloadHorizonHours,
+            idleHorizonHours=downloadIdleHorizonHours,
+            priorityFunction=downloadPriorityFunction
+        )
+        # if every needed hour of the latest distribution is in local storage, no download need to be conducted
+        if isDistributionDownloaded(latestAvailableTime, scheduler.getScheduledPrecedingHours()):
+            defer()
+            continue
+
+        # keep what a previous run has left, finished files are skipped and partial ones resumed.
+        os.makedirs(f"{WeatherReportProcessorBase.gribFilesPath}/{storeDirName}", exist_ok=True)
+        downloader = GribDownloader(concurrency=downloadConcurrency)
+        with ThreadPoolExecutor(max_workers=downloader.concurrency) as executor:
+            futures = [ executor.submit(helper_downloadScheduledForecastHours, downloader, scheduler, latestAvailableTime, storeDirName, downloadedGribFilesQueue, statsQueue) for _ in range(downloader.concurrency) ]
+            # a failed thread releases the ones waiting for new hours
+            futuresWait(futures, return_when=FIRST_EXCEPTION)
+            scheduler.close()
+            for future in futures:
+                future.result() # re-raise unexpected errors of the threads
+        downloader.close()
 
         # retrieve succeed
         defer(didSucceed=True)
     return
 
 
+def helper_downloadScheduledForecastHours(downloader, scheduler, latestAvailableTime, storeDirName, downloadedGribFilesQueue, statsQueue):
+    while True:
+        precedingHours = scheduler.popNextPrecedingHours()
+        if precedingHours is None:
+            return
+        try:
+            helper_downloadForecastHourUntilSucceed(downloader, latestAvailableTime, precedingHours, storeDirName, downloadedGribFilesQueue, statsQueue)
+        finally:
+            scheduler.didFinishPrecedingHours(precedingHours)
+
+
+# retry the forecast hour until it is downloaded, then queue it for decoding. Runs concurrently on the threads of the download executor.
+def helper_downloadForecastHourUntilSucceed(downloader, latestAvailableTime, precedingHours, storeDirName, downloadedGribFilesQueue, statsQueue):
+    latestURL = __getLatestURLFromTime(latestAvailableTime, precedingHours=precedingHours)
+    forecastForDate = latestAvailableTime + dt.timedelta(hours=int(precedingHours))
+    storeFileName = forecastForDate.strftime("%Y%m%d%H") + "00"
+    storePath = f"{WeatherReportProcessorBase.gribFilesPath}/{storeDirName}/{storeFileName}.{WeatherReportRemoteProcessor.baseurlExtension}"
+    # a previous run may have finished it already
+    if os.path.exists(storePath):
+        downloadedGribFilesQueue.put(storePath)
+        return
+    attempt = 0
+    while True:
+        try:
+            # bytes a previous attempt has left are not counted
+            partPath = f'{storePath}{GribDownloader.partFileExtension}'
+            resumedSize = os.path.getsize(partPath) if os.path.exists(partPath) else 0
+            startTime = time.perf_counter()
+            downloadGribFileWithinTime(downloader, url=latestURL, storePath=storePath, timeout=WeatherReportRemoteProcessor.downloadTimeout)
+            if statsQueue is not None:
+                statsQueue.put(('download', os.path.getsize(storePath) - resumedSize, time.perf_counter() - startTime))
+            # hand it over to the decoder right away
+            downloadedGribFilesQueue.put(storePath)
+            return
+        except mp.TimeoutError as error: # says much about error handling: https://docs.python.org/3/howto/urllib2.html#urllib-howto
+            print(f"Warning: Can't download grib2 content from {latestURL} because: timeout; Resuming ...")
+        except HTTPError as error: # says much about error handling: https://docs.python.org/3/howto/urllib2.html#urllib-howto
+            print(f"Warning: Can't donwload grib2 content from {latestURL} with error code {error.code}, and reason: {error.reason}; Retrying ...")
+        except URLError as error: # says much about error handling: https://docs.python.org/3/howto/urllib2.html#urllib-howto
+            print(f"Warning: Can't download grib2 content from {latestURL} because: {error.reason}; Resuming ...")
+        except OSError as error:
+            print(f"Warning: Download grib2 content from {latestURL} is interrupted because: {error}; Resuming ...")
+        # the partial file is kept by the downloader; back off exponentially (with jitter) in case a bad connection is happening.
+        sleep(min(WeatherReportRemoteProcessor.retryBackoffBase * 2**attempt, WeatherReportRemoteProcessor.retryBackoffUpperBound) * random.uniform(0.5, 1.0))
+        attempt += 1
+
+
+def isDistributionDownloaded(distributionDate, precedingHoursList):
+    storeDirPath = f"{WeatherReportProcessorBase.gribFilesPath}/{distributionDate.strftime('%Y%m%d%H')}00_distributed"
+    for precedingHours in precedingHoursList:
+        storeFileName = (distributionDate + dt.timedelta(hours=int(precedingHours))).strftime("%Y%m%d%H") + "00"
+        if not os.path.exists(f"{storeDirPath}/{storeFileName}.{WeatherReportRemoteProcessor.baseurlExtension}"):
+            return False
+    return True
+
+
+# a grib2 file is a sequence of messages, each starting with 'GRIB' and ending with '7777'.
+def isGribFileIntact(filePath):
+    if os.path.getsize(filePath) < 8:
+        return False
+    with open(filePath, 'rb') as file:
+        head = file.read(4)
+        file.seek(-4, os.SEEK_END)
+        tail = file.read(4)
+    return head == b'GRIB' and tail == b'7777'
+
+
 def __getLatestURLFromTime(date, precedingHours=384):
     return f"{WeatherReportRemoteProcessor.baseurl}/{date.strftime('%Y%m')}/{date.strftime('%Y%m%d')}/gfs_4_{date.strftime('%Y%m%d_%H')}00_" + "{:03}".format(precedingHours) +f".{WeatherReportRemoteProcessor.baseurlExtension}"
 
 
 
-def helper_asyncDecodeLatestWeatherReportToCSVFilesContinuously(shouldStopDecodingToCSVFiles, didDownloadProcedureEnd, currentLongitude, currentLatitude, currentAltitude):
-    sleep(60)
-    # final function
-    def defer(didSucceed=False):
-        if didSucceed:
+# Decode every grib2 file as soon as the downloader hands it over through downloadedGribFilesQueue, instead of waiting for the whole distribution.
+# Each decoded slice is published in the distribution cube right away, so WeatherReport can read it on the next lookup.
+def helper_asyncDecodeLatestWeatherReportToCSVFilesContinuously(shouldStopDecodingToCSVFiles, downloadedGribFilesQueue, publishedSlicesQueue, currentLongitude, currentLatitude, currentAltitude, decodeWorkerAmount, statsQueue):
+    distributionCubes = {} # distributionName: GFSDistributionCube
+    distributionsBounds = {} # distributionName: (latitudeLowerBound, latitudeUpperBound, longitudeLowerBound, longitudeUpperBound)
+    decodingGribFilePaths = set() # submitted to the pool but not published yet
+    # guards the two above, shared by the main loop and the result thread of the pool.
+    # A cube is created and reopened under it, so only one instance (and one publishedTimes) exists per distribution.
+    distributionCubesLock = threading.Lock()
+    distributionCatalogue = DistributionCatalogue.initFromCSVFilesPath(WeatherReportProcessorBase.csvFilesPath)
+    # stats nobody read yet must not keep the process from exiting
+    if statsQueue is not None:
+        statsQueue.cancel_join_thread()
+
+    # runs on the result thread of the pool, one result at a time.
+    def publish(result, distributionName, gribFilePath):
+        csvParametersDirName, decodedSlice, reason, decodeSeconds = result
+        if decodedSlice is None:
+            with distributionCubesLock:
+                decodingGribFilePaths.discard(gribFilePath)
+            print(f"Warning: Can't decode grib2 file of {csvParametersDirName} because: {reason}; Skipping ...")
+            return
+        if statsQueue is not None:
+            statsQueue.put(('decode', os.path.getsize(gribFilePath), decodeSeconds))
+        latitudes, longitudes, values = decodedSlice
+        distributionDirPath = f"{WeatherReportProcessorBase.csvFilesPath}/{distributionName}"
+        with distributionCubesLock:
+            decodingGribFilePaths.discard(gribFilePath)
+            try:
+                if distributionName not in distributionCubes:
+                    distributionDate = dt.datetime.strptime(distributionName.split('_')[0], WeatherReportProcessorBase.weatherReportDirNameFormat)
+                    distributionCubes[distributionName] = GFSDistributionCube.initByCreating(distributionDirPath, distributionDate, latitudes, longitudes)
+                distributionCube = distributionCubes[distributionName]
+                distributionCube.writeSlice(csvParametersDirName, latitudes, longitudes, values)
+                publishedTimeAmount, timeAmount = len(distributionCube.header['publishedTimes']), len(distributionCube.header['times'])
+            except OSError as error: # an exception would stop the result thread of the pool
+                print(f"Warning: Can't publish {csvParametersDirName} of {distributionName} because: {error}; Skipping ...")
+                return
+        try:
+            distributionCatalogue.addPublishedTime(distributionName, csvParametersDirName)
+            distributionCatalogue.save()
+        except OSError as error:
+            print(f"Warning: Can't save the catalogue with {csvParametersDirName} of {distributionName} because: {error}; Continuing ...")
+        publishedSlicesQueue.put((distributionName, csvParametersDirName))
+        print(f"{dt.datetime.utcnow().strftime('%Y%m%d_%H:%M')}: Decoded {publishedTimeAmount}/{timeAmount} ({csvParametersDirName}) of {distributionName}.")
+        if publishedTimeAmount == timeAmount:
             print(f"Decoding end successfully. ({dt.datetime.utcnow().strftime('%Y%m%d_%H:%M')})")
-        sleep(60)
-    # main loop
-    while not shouldStopDecodingToCSVFiles.is_set():
-        # wait until download procedure end
-        didDownloadProcedureEnd.wait()
-
-        print("start decoding ...")
-        # get latest downloaded grib files
-        latestDownloadedDistribution = list(filter(lambda name: 'distributed' in name, os.listdir(f'{WeatherReportProcessorBase.gribFilesPath}')))
-        if len(latestDownloadedDistribution) == 0: # if no downloaded data, skip
-            continue
-        latestDownloadedDistribution = sorted([ dt.datetime.strptime(name.split('_')[0], '%Y%m%d%H%M') for name in latestDownloadedDistribution ], reverse=True)[0]
-        # get latest stored distribution
-        latestStoredDistribution = list(filter(lambda name: 'distributed' in name, os.listdir(f'{WeatherReportProcessorBase.csvFilesPath}')))
-        if len(latestStoredDistribution) == 0:
-            latestStoredDistribution = None
-        else:
-            latestStoredDistribution = sorted([ dt.datetime.strptime(name.split('00_d')[0], '%Y%m%d%H') for name in latestStoredDistribution ], reverse=True)[0]
-        # if they match each other, do nothing
-        if latestStoredDistribution == latestDownloadedDistribution:
-            defer(didSucceed=False)
-            continue
-
-        # start main process: decode all grib in the latest distribution dir
-
-        # first, get boundaries
-        longitudeLowerBound = currentLongitude.value - WeatherReportRemoteProcessor.longitudeMargin
-        longitudeUpperBound = currentLongitude.value + WeatherReportRemoteProcessor.longitudeMargin
-        latitudeLowerBound = currentLatitude.value - WeatherReportRemoteProcessor.latitudeMargin
-        latitudeUpperBound = currentLatitude.value + WeatherReportRemoteProcessor.latitudeMargin
-        distributionName = f"{latestDownloadedDistribution.strftime('%Y%m%d%H')}00_distributed"
-
-        # second, if the specific distribution dir in csvFiles dowsn't exist, make a new one. Otherwise remove it.
-        if os.path.isdir(f"{WeatherReportProcessorBase.csvFilesPath}/{distributionName}"):
-            shutil.rmtree(f"{WeatherReportProcessorBase.csvFilesPath}/{distributionName}")
-        os.mkdir(f"{WeatherReportProcessorBase.csvFilesPath}/{distributionName}")
-
-        # main decoding
-        for gribFileName in filter(lambda name: '.grb2' in name, os.listdir(f"{WeatherReportProcessorBase.gribFilesPath}/{distributionName}")):
-            # get grib file path
-            gribFilePath = f'{WeatherReportProcessorBase.gribFilesPath}/{distributionName}/{gribFileName}'
-            # get csv file path
-            csvParametersDirName = gribFileName.split('.')[0]
-            csvParametersDirPath = f'{WeatherReportProcessorBase.csvFilesPath}/{distributionName}/{csvParametersDirName}'
-            os.mkdir(csvParametersDirPath)
-            # ready! call subprocess script
-            sp.run(['./decodeGribToCSVFiles.sh', f"{gribFilePath}", f"{csvParametersDirPath}", f'{latitudeLowerBound}', f'{latitudeUpperBound}', f'{longitudeLowerBound}', f'{longitudeUpperBound}'])
-
-        # finally
-        defer(didSucceed=True)
-    return
 
+    # runs on the result thread of the pool when the worker raised something it doesn't return; the file is retried when it is queued again.
+    def discard(error, csvParametersDirName, gribFilePath):
+        with distributionCubesLock:
+            decodingGribFilePaths.discard(gribFilePath)
+        print(f"Warning: Can't decode grib2 file of {csvParametersDirName} because: {error!r}; Skipping ...")
 
-# https://docs.python.org/ja/3/library/multiprocessing.html#multiprocessing.Process.exitcode
-# http://ja.pymotw.com/2/multiprocessing/basics.html
-def downloadLargeFileWithinTime(url, storePath, timeout):
-    # async way to do: urlrequest.urlretrieve(url=latestURL, filename=storePath)
-    downloadProcess = mp.Process(target=urlrequest.urlretrieve, args=(url, storePath))
-    downloadProcess.start()
+    # files downloaded before this process started are caught up first
+    for gribFilePath in helper_getUndecodedGribFilePaths():
+        downloadedGribFilesQueue.put(gribFilePath)
 
-    # when timeout reaches, the method will return None. One should manully terminate the process then.
-    if downloadProcess.join(timeout) is None:
-        downloadProcess.terminate()
-        sleep(1)
+    # main loop
+    with mp.Pool(processes=decodeWorkerAmount) as pool: # https://docs.python.org/ja/3/library/multiprocessing.html#multiprocessing.pool.Pool.apply_async
+        while not shouldStopDecodingToCSVFiles.is_set():
+            try:
+                gribFilePath = downloadedGribFilesQueue.get(timeout=1)
+            except queue.Empty:
+                continue
+            distributionName = os.path.basename(os.path.dirname(gribFilePath))
+            csvParametersDirName = os.path.basename(gribFilePath).split('.')[0]
+            distributionDirPath = f"{WeatherReportProcessorBase.csvFilesPath}/{distributionName}"
+            with distributionCubesLock:
+                # reopen the cube a previous run has left
+                if distributionName not in distributionCubes and GFSDistributionCube.isAvailable(distributionDirPath):
+                    distributionCubes[distributionName] = GFSDistributionCube.initFromDistributionDirPath(distributionDirPath, mode='r+')
+                if gribFilePath in decodingGribFilePaths or (distributionName in distributionCubes and distributionCubes[distributionName].isTimePublished(csvParametersDirName)):
+                    continue
+                # a distribution is cropped around the spot at the time its first file arrives, so that all of its slices share one grid.
+                if distributionName not in distributionsBounds:
+                    if distributionName in distributionCubes:
+                        distributionCube = distributionCubes[distributionName]
+                        distributionsBounds[distributionName] = (distributionCube.latitudes.min(), distributionCube.latitudes.max(), distributionCube.longitudes.min(), distributionCube.longitudes.max())
+                    else:
+                        distributionsBounds[distributionName] = (
+                            currentLatitude.value - WeatherReportRemoteProcessor.latitudeMargin,
+                            currentLatitude.value + WeatherReportRemoteProcessor.latitudeMargin,
+                            currentLongitude.value - WeatherReportRemoteProcessor.longitudeMargin,
+                            currentLongitude.value + WeatherReportRemoteProcessor.longitudeMargin
+                        )
+                decodingGribFilePaths.add(gribFilePath)
+            os.makedirs(distributionDirPath, exist_ok=True)
+            latitudeLowerBound, latitudeUpperBound, longitudeLowerBound, longitudeUpperBound = distributionsBounds[distributionName]
+            decodeArgs = (gribFilePath, distributionDirPath, latitudeLowerBound, latitudeUpperBound, longitudeLowerBound, longitudeUpperBound)
+            pool.apply_async(helper_decodeGribFile, (decodeArgs,), callback=functools.partial(publish, distributionName=distributionName, gribFilePath=gribFilePath), error_callback=functools.partial(discard, csvParametersDirName=csvParametersDirName, gribFilePath=gribFilePath))
+        pool.close()
+        pool.join()
+    return
 
-    if downloadProcess.exitcode == -signal.SIGTERM:
-        raise mp.TimeoutError
-    else:
-        return
 
-    # # another option1:
-    # # https://docs.python.org/3/howto/urllib2.html#urllib-howto
-    # # https://stackoverflow.com/questions/7243750/download-file-from-web-in-python-3
-    # with urlrequest.urlopen(latestURL, timeout=20) as response, open(storePath, 'wb') as file:
-    #     shutil.copyfileobj(response, file)
-
-
-    # # another option2:
-    # # https://stackoverflow.com/questions/32763720/timeout-a-file-download-with-python-urllib
-    # # https://stackoverflow.com/questions/16694907/download-large-file-in-python-with-requests
-    # request = requests.get(latestURL, stream=True)
-    # _startTime = dt.datetime.utcnow()
-    # with open(storePath, 'wb') as file:
-    #     for chunk in request.iter_content(1024*128):
-    #         file.write(chunk)
-    #         if (dt.datetime.utcnow() - _startTime).total_seconds() > WeatherReportRemoteProcessor.downloadTimeout:
-    #             raise mp.TimeourError
+def helper_getUndecodedGribFilePaths():
+    if not os.path.isdir(f'{WeatherReportProcessorBase.gribFilesPath}'):
+        return []
+    undecodedGribFilePaths = []
+    for distributionName in filter(lambda name: 'distributed' in name, os.listdir(f'{WeatherReportProcessorBase.gribFilesPath}')):
+        distributionDirPath = f"{WeatherReportProcessorBase.csvFilesPath}/{distributionName}"
+        publishedTimes = GFSDistributionCube.readHeader(distributionDirPath)['publishedTimes'] if GFSDistributionCube.isAvailable(distributionDirPath) else []
+        for gribFileName in filter(lambda name: name.endswith(f'.{WeatherReportRemoteProcessor.baseurlExtension}'), os.listdir(f"{WeatherReportProcessorBase.gribFilesPath}/{distributionName}")):
+            if gribFileName.split('.')[0] not in publishedTimes:
+                undecodedGribFilePaths.append(f"{WeatherReportProcessorBase.gribFilesPath}/{distributionName}/{gribFileName}")
+    return sorted(undecodedGribFilePaths)
+
+
+# decode one grib file in a pool worker. Failures are returned instead of raised, so that one broken file doesn't stop the others.
+# csv files go to a hidden temporary dir, so a slice isn't visible before it is published.
+def helper_decodeGribFile(args):
+    gribFilePath, distributionDirPath, latitudeLowerBound, latitudeUpperBound, longitudeLowerBound, longitudeUpperBound = args
+    csvParametersDirName = os.path.basename(gribFilePath).split('.')[0]
+    csvParametersDirPath = tempfile.mkdtemp(prefix=f'.{csvParametersDirName}_', dir=distributionDirPath)
+    startTime = time.perf_counter()
+    try:
+        # ready! call subprocess script
+        sp.run(['./decodeGribToCSVFiles.sh', f"{gribFilePath}", f"{csvParametersDirPath}", f'{latitudeLowerBound}', f'{latitudeUpperBound}', f'{longitudeLowerBound}', f'{longitudeUpperBound}'], check=True, stdout=sp.DEVNULL)
+        decodedSlice = GFSDistributionCube.readSliceFromCSVFiles(csvParametersDirPath)
+    except (OSError, sp.CalledProcessError, ValueError) as error: # ValueError covers pandas' EmptyDataError and ParserError of truncated csv files
+        return csvParametersDirName, None, f"{error}", time.perf_counter() - startTime
+    finally:
+        shutil.rmtree(csvParametersDirPath, ignore_errors=True)
+    return csvParametersDirName, decodedSlice, None, time.perf_counter() - startTime
+
+
+def downloadGribFileWithinTime(downloader, url, storePath, timeout):
+    if not WeatherReportRemoteProcessor.shouldDownloadSubset:
+        return downloader.download(url=url, storePath=storePath, timeout=timeout, validator=isGribFileIntact)
+    # fall back to the whole file if the inventory isn't served
+    try:
+        indexText = downloader.getText(getIndexURLFromGribURL(url))
+    except HTTPError as error:
+        print(f"Warning: Can't get inventory of {url} because: {error.code}, {error.reason}; Downloading the whole file ...")
+        return downloader.download(url=url, storePath=storePath, timeout=timeout, validator=isGribFileIntact)
+    byteRanges = getGribMessagesByteRangesFromIndex(indexText, WeatherReportRemoteProcessor.subsetMessagePattern)
+    if len(byteRanges) == 0:
+        print(f"Warning: None of the messages of {url} matches '{WeatherReportRemoteProcessor.subsetMessagePattern}'; Downloading the whole file ...")
+        return downloader.download(url=url, storePath=storePath, timeout=timeout, validator=isGribFileIntact)
+    # messages are concatenated in order, which is itself a valid grib2 file.
+    downloader.download(url=url, storePath=storePath, timeout=timeout, byteRanges=byteRanges, validator=isGribFileIntact)
+
+
+def getIndexURLFromGribURL(url):
+    return url[:-len(WeatherReportRemoteProcessor.baseurlExtension)] + WeatherReportRemoteProcessor.baseurlIndexExtension
+
+
+# parse the inventory (lines of 'messageNumber:byteOffset:d=date:variable:level:forecast:') into merged, inclusive (start, end) byte ranges.
+# end is None when the last message of the file is included, i.e. till the end of the file.
+def getGribMessagesByteRangesFromIndex(indexText, messagePattern):
+    lines = [ line for line in indexText.splitlines() if line.strip() != '' ]
+    offsets = [ int(line.split(':')[1]) for line in lines ]
+    byteRanges = []
+    for index, line in enumerate(lines):
+        if re.search(messagePattern, line) is None:
+            continue
+        start = offsets[index]
+        end = offsets[index+1] - 1 if index+1 < len(lines) else None
+        # merge adjacent messages into one request
+        if len(byteRanges) != 0 and byteRanges[-1][1] is not None and byteRanges[-1][1] + 1 == start:
+            byteRanges[-1] = (byteRanges[-1][0], end)
+        else:
+            byteRanges.append((start, end))
+    return byteRanges
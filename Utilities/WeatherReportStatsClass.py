@@ -0,0 +1,186 @@
+import bisect
+import contextlib
+import datetime as dt
+import queue
+import threading
+import time
+
+
+# Counters, per stage latency histograms and transfer throughputs of the hot path, shared by every class of a process.
+# Disabled by default: then count() returns at once and measure() hands out one shared no-op context, so instrumented code costs a few attribute lookups.
+# The background download and decode processes put (transferName, byteAmount, seconds) to a queue given to listen().
+class WeatherReportStats():
+
+    # class properties
+    isEnabled = False
+    # upper bounds of the latency buckets, 3 per decade from 10 us to 100 s; slower ones fall in the last, unbounded bucket
+    histogramBucketUpperBounds = [ round(10**(exponent/3), 9) for exponent in range(-15, 7) ]
+    logIntervalSeconds = 60
+    __shared = None
+    __disabledContext = contextlib.nullcontext()
+
+
+    def __init__(self, isEnabled=None):
+        self.isEnabled = WeatherReportStats.isEnabled if isEnabled is None else isEnabled
+        self.lock = threading.Lock()
+        self.__statsQueue = None
+        self.__shouldStopLogging = None
+        self.reset()
+
+
+    # the stats of this process, created on first use.
+    @classmethod
+    def getShared(cls):
+        if WeatherReportStats.__shared is None:
+            WeatherReportStats.__shared = cls()
+        return WeatherReportStats.__shared
+
+
+    # MARK: - Public Methods
+
+    def count(self, counterName, amount=1):
+        if not self.isEnabled:
+            return
+        with self.lock:
+            self.__counters[counterName] = self.__counters.get(counterName, 0) + amount
+
+
+    # with stats.measure('training'): ...
+    def measure(self, stageName):
+        if not self.isEnabled:
+            return WeatherReportStats.__disabledContext
+        return StageTimer(self, stageName)
+
+
+    def addDuration(self, stageName, seconds):
+        with self.lock:
+            stage = self.__stages.get(stageName)
+            if stage is None:
+                stage = self.__stages[stageName] = {'count': 0, 'totalSeconds': 0.0, 'maxSeconds': 0.0, 'bucketCounts': [0] * (len(WeatherReportStats.histogramBucketUpperBounds) + 1)}
+            stage['count'] += 1
+            stage['totalSeconds'] += seconds
+            stage['maxSeconds'] = max(stage['maxSeconds'], seconds)
+            stage['bucketCounts'][bisect.bisect_left(WeatherReportStats.histogramBucketUpperBounds, seconds)] += 1
+
+
+    def addTransfer(self, transferName, byteAmount, seconds):
+        with self.lock:
+            transfer = self.__transfers.setdefault(transferName, {'count': 0, 'bytes': 0, 'seconds': 0.0})
+            transfer['count'] += 1
+            transfer['bytes'] += byteAmount
+            transfer['seconds'] += seconds
+
+
+    # queue of (transferName, byteAmount, seconds) put by the background processes
+    def listen(self, statsQueue):
+        self.__statsQueue = statsQueue
+
+
+    def reset(self):
+        with self.lock:
+            self.__startTime = time.perf_counter()
+            self.__counters = {}
+            self.__stages = {} # stageName: {count, totalSeconds, maxSeconds, bucketCounts}
+            self.__transfers = {} # transferName: {count, bytes, seconds}
+
+
+    # a json serializable copy of everything collected since the last reset.
+    def getSnapshot(self):
+        self.__drainStatsQueue()
+        with self.lock:
+            snapshot = {
+                'isEnabled': self.isEnabled,
+                'uptimeSeconds': time.perf_counter() - self.__startTime,
+                'counters': dict(self.__counters),
+                'stages': {},
+                'transfers': {}
+            }
+            for stageName, stage in self.__stages.items():
+                snapshot['stages'][stageName] = {
+                    'count': stage['count'],
+                    'totalSeconds': stage['totalSeconds'],
+                    'meanSeconds': stage['totalSeconds'] / stage['count'],
+                    'maxSeconds': stage['maxSeconds'],
+                    'p50Seconds': WeatherReportStats.getQuantileFromBucketCounts(stage['bucketCounts'], 0.5, stage['maxSeconds']),
+                    'p95Seconds': WeatherReportStats.getQuantileFromBucketCounts(stage['bucketCounts'], 0.95, stage['maxSeconds']),
+                    # (upper bound in seconds, None for the last bucket; count)
+                    'histogram': [ (upperBound, bucketCount) for upperBound, bucketCount in zip(WeatherReportStats.histogramBucketUpperBounds + [None], stage['bucketCounts']) if bucketCount > 0 ]
+                }
+            for transferName, transfer in self.__transfers.items():
+                snapshot['transfers'][transferName] = dict(transfer, bytesPerSecond=transfer['bytes'] / transfer['seconds'] if transfer['seconds'] > 0 else None)
+        return snapshot
+
+
+    # one line for the log, e.g. "getWeatherReportAtSpot 120x p50 0.46ms p95 2.2ms | cacheHit 118 | download 1.2MB/s"
+    def getLogLine(self):
+        snapshot = self.getSnapshot()
+        stageTexts = [ f"{stageName} {stage['count']}x p50 {stage['p50Seconds']*1e3:.3g}ms p95 {stage['p95Seconds']*1e3:.3g}ms" for stageName, stage in snapshot['stages'].items() ]
+        counterTexts = [ f"{counterName} {counter}" for counterName, counter in snapshot['counters'].items() ]
+        transferTexts = [ f"{transferName} {transfer['bytesPerSecond']/1e6:.3g}MB/s" for transferName, transfer in snapshot['transfers'].items() if transfer['bytesPerSecond'] is not None ]
+        return ' | '.join(filter(None, ['; '.join(stageTexts), ', '.join(counterTexts), ', '.join(transferTexts)]))
+
+
+    # print the log line every intervalSeconds on a daemon thread, until stopPeriodicLogging().
+    def startPeriodicLogging(self, intervalSeconds=None):
+        intervalSeconds = WeatherReportStats.logIntervalSeconds if intervalSeconds is None else intervalSeconds
+        self.stopPeriodicLogging()
+        shouldStopLogging = self.__shouldStopLogging = threading.Event()
+        def log():
+            while not shouldStopLogging.wait(intervalSeconds):
+                print(f"{dt.datetime.utcnow().strftime('%Y%m%d_%H:%M')}: Stats: {self.getLogLine()}")
+        threading.Thread(target=log, daemon=True).start()
+
+
+    def stopPeriodicLogging(self):
+        if self.__shouldStopLogging is not None:
+            self.__shouldStopLogging.set()
+            self.__shouldStopLogging = None
+
+
+    # MARK: - Custom Public Helper Functions
+
+    # upper bound of the bucket the quantile falls in; maxSeconds for the last, unbounded one
+    @classmethod
+    def getQuantileFromBucketCounts(cls, bucketCounts, quantile, maxSeconds):
+        rank = quantile * sum(bucketCounts)
+        cumulativeCount = 0
+        for upperBound, bucketCount in zip(WeatherReportStats.histogramBucketUpperBounds, bucketCounts):
+            cumulativeCount += bucketCount
+            if cumulativeCount >= rank:
+                return min(upperBound, maxSeconds)
+        return maxSeconds
+
+
+    # MARK: - Helper Custom Private methods
+
+    def __drainStatsQueue(self):
+        if self.__statsQueue is None:
+            return
+        while True:
+            try:
+                transferName, byteAmount, seconds = self.__statsQueue.get_nowait()
+            except queue.Empty:
+                return
+            self.addTransfer(transferName, byteAmount, seconds)
+
+
+class StageTimer():
+
+    # class properties
+    __slots__ = ('stats', 'stageName', 'startTime')
+
+
+    def __init__(self, stats, stageName):
+        self.stats = stats
+        self.stageName = stageName
+        self.startTime = None
+
+
+    def __enter__(self):
+        self.startTime = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exceptionType, exception, traceback):
+        self.stats.addDuration(self.stageName, time.perf_counter() - self.startTime)
+        return False
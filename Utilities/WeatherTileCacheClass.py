@@ -0,0 +1,105 @@
+import numpy as nu
+from collections import OrderedDict
+
+from GridInterpolatorClass import GridInterpolator
+from TiledGridInterpolatorClass import TiledGridInterpolator
+from WeatherReportLRUCacheClass import WeatherReportLRUCache
+
+
+# Partitions the longitude/latitude plane into fixed tileSize x tileSize degree tiles and keeps a prepared GridInterpolator
+# (holding the tile's decoded winds) per tile and forecast window, evicting the least recently used beyond maxTileAmount.
+# A moving aircraft then only builds the tiles it newly enters, instead of retraining its whole surrounding box.
+class WeatherTileCache():
+
+    # class properties
+    tileSize = 2.5 # degree
+    tileHalo = 0.5 # degree, one GFS grid step, so that spots near tile edges still have both cell vertexes
+    maxTileAmount = 512
+
+
+    def __init__(self, tileSize=None, maxTileAmount=None):
+        self.tileSize = WeatherTileCache.tileSize if tileSize is None else tileSize
+        self.maxTileAmount = WeatherTileCache.maxTileAmount if maxTileAmount is None else maxTileAmount
+        self.__tileInterpolators = OrderedDict() # (pastKey, futureKey, longitudeTileIndex, latitudeTileIndex): GridInterpolator or None
+        self.builtTileCount = 0
+        self.reusedTileCount = 0
+
+
+    # MARK: - Public Methods
+
+    # every tile of the box
+    def getTiledGridInterpolator(self, pastWeatherReport, futureWeatherReport, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound):
+        tileIndexes = [
+            (longitudeTileIndex, latitudeTileIndex)
+            for longitudeTileIndex in range(int(nu.floor(longitudeLowerBound / self.tileSize)), int(nu.floor(longitudeUpperBound / self.tileSize)) + 1)
+            for latitudeTileIndex in range(int(nu.floor(latitudeLowerBound / self.tileSize)), int(nu.floor(latitudeUpperBound / self.tileSize)) + 1)
+        ]
+        return self.__getTiledGridInterpolatorOfTiles(pastWeatherReport, futureWeatherReport, tileIndexes)
+
+
+    # only the tiles spots fall in, e.g. along a diagonal route whose bounding box spans many more; spotsNdarray is (N, 2+) longitude, latitude, ...
+    def getTiledGridInterpolatorAtSpots(self, pastWeatherReport, futureWeatherReport, spotsNdarray):
+        tileIndexes = nu.unique(nu.floor(nu.asarray(spotsNdarray)[:, :2] / self.tileSize).astype('int'), axis=0)
+        return self.__getTiledGridInterpolatorOfTiles(pastWeatherReport, futureWeatherReport, [ tuple(tileIndex) for tileIndex in tileIndexes.tolist() ])
+
+
+    # (longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound) of the tiles the box overlaps, with their halo;
+    # reports cropped to it build the same tiles as whole ones.
+    def getTilesBounds(self, longitudeLowerBound, longitudeUpperBound, latitudeLowerBound, latitudeUpperBound):
+        return (
+            float(nu.floor(longitudeLowerBound / self.tileSize) * self.tileSize - WeatherTileCache.tileHalo),
+            float((nu.floor(longitudeUpperBound / self.tileSize) + 1) * self.tileSize + WeatherTileCache.tileHalo),
+            float(nu.floor(latitudeLowerBound / self.tileSize) * self.tileSize - WeatherTileCache.tileHalo),
+            float((nu.floor(latitudeUpperBound / self.tileSize) + 1) * self.tileSize + WeatherTileCache.tileHalo)
+        )
+
+
+    def clear(self):
+        self.__tileInterpolators.clear()
+
+
+    def __len__(self):
+        return len(self.__tileInterpolators)
+
+
+    # MARK: - Helper Custom Private methods
+
+    def __getTiledGridInterpolatorOfTiles(self, pastWeatherReport, futureWeatherReport, tileIndexes):
+        pastKey = WeatherReportLRUCache.getKey(pastWeatherReport.parametersDirPath)
+        futureKey = WeatherReportLRUCache.getKey(futureWeatherReport.parametersDirPath)
+        tileInterpolators = {}
+        for longitudeTileIndex, latitudeTileIndex in tileIndexes:
+            key = (pastKey, futureKey, longitudeTileIndex, latitudeTileIndex)
+            if key in self.__tileInterpolators:
+                self.reusedTileCount += 1
+                self.__tileInterpolators.move_to_end(key)
+            else:
+                self.builtTileCount += 1
+                self.__put(key, self.__buildTileInterpolator(pastWeatherReport, futureWeatherReport, longitudeTileIndex, latitudeTileIndex))
+            if self.__tileInterpolators[key] is not None:
+                tileInterpolators[(longitudeTileIndex, latitudeTileIndex)] = self.__tileInterpolators[key]
+        return TiledGridInterpolator(tileInterpolators=tileInterpolators, tileSize=self.tileSize, timeStandard=pastWeatherReport.date)
+
+
+    def __put(self, key, tileInterpolator):
+        self.__tileInterpolators[key] = tileInterpolator
+        while len(self.__tileInterpolators) > self.maxTileAmount:
+            self.__tileInterpolators.popitem(last=False)
+
+
+    # None if the reports don't cover the tile
+    def __buildTileInterpolator(self, pastWeatherReport, futureWeatherReport, longitudeTileIndex, latitudeTileIndex):
+        longitudeLowerBound = longitudeTileIndex * self.tileSize - WeatherTileCache.tileHalo
+        longitudeUpperBound = (longitudeTileIndex + 1) * self.tileSize + WeatherTileCache.tileHalo
+        latitudeLowerBound = latitudeTileIndex * self.tileSize - WeatherTileCache.tileHalo
+        latitudeUpperBound = (latitudeTileIndex + 1) * self.tileSize + WeatherTileCache.tileHalo
+        if longitudeUpperBound < pastWeatherReport.longitudeLowerBound or pastWeatherReport.longitudeUpperBound < longitudeLowerBound or latitudeUpperBound < pastWeatherReport.latitudeLowerBound or pastWeatherReport.latitudeUpperBound < latitudeLowerBound:
+            return None
+        return GridInterpolator.initFromWeatherReportCaches(
+            pastWeatherReport=pastWeatherReport,
+            futureWeatherReport=futureWeatherReport,
+            longitudeLowerBound=longitudeLowerBound,
+            longitudeUpperBound=longitudeUpperBound,
+            latitudeLowerBound=latitudeLowerBound,
+            latitudeUpperBound=latitudeUpperBound
+        )
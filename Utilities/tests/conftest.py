@@ -0,0 +1,90 @@
+import os
+import sys
+import socket
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+# the classes import each other by file name, as when run from Utilities
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Serves files from memory with single byte range support, standing in for the GFS server.
+# Every request is logged as (path, Range header); dropAfterBytes cuts the next response short to simulate a lost connection,
+# and contentRange replaces the Content-Range of 206 responses to simulate a broken proxy.
+class FakeGFSServer(ThreadingHTTPServer):
+
+    # class properties
+    daemon_threads = True
+
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeGFSRequestHandler)
+        self.files = {} # path: bytes
+        self.requests = [] # (path, Range header or None)
+        self.shouldIgnoreRange = False
+        self.dropAfterBytes = None
+        self.contentRange = None # sent instead of the real Content-Range of a 206 if set, omitted if ''
+
+
+    @property
+    def baseurl(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+    def getRequestedRanges(self, path):
+        return [ rangeHeader for requestedPath, rangeHeader in self.requests if requestedPath == path ]
+
+
+class FakeGFSRequestHandler(BaseHTTPRequestHandler):
+
+    # class properties
+    protocol_version = 'HTTP/1.1' # keep-alive, as the downloader's session expects
+
+
+    def do_GET(self):
+        rangeHeader = self.headers.get('Range')
+        self.server.requests.append((self.path, rangeHeader))
+        body = self.server.files.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if rangeHeader is None or self.server.shouldIgnoreRange:
+            start, end = 0, len(body) - 1
+            self.send_response(200)
+        else:
+            start, end = rangeHeader[len('bytes='):].split('-')
+            start, end = int(start), len(body) - 1 if end == '' else int(end)
+            self.send_response(206)
+            contentRange = f'bytes {start}-{end}/{len(body)}' if self.server.contentRange is None else self.server.contentRange
+            if contentRange != '':
+                self.send_header('Content-Range', contentRange)
+        payload = body[start:end+1]
+        self.send_header('Content-Length', f'{len(payload)}')
+        self.end_headers()
+        if self.server.dropAfterBytes is None:
+            self.wfile.write(payload)
+            return
+        # send a part, then hang up
+        self.wfile.write(payload[:self.server.dropAfterBytes])
+        self.wfile.flush()
+        self.server.dropAfterBytes = None
+        self.close_connection = True
+        self.connection.shutdown(socket.SHUT_RDWR)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fakeGFSServer():
+    server = FakeGFSServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,24 @@
+import datetime as dt
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from SyntheticGFSDistributionGeneratorClass import SyntheticGFSDistributionGenerator
+from GFSDistributionCubeClass import GFSDistributionCube
+from DistributionCatalogueClass import DistributionCatalogue
+
+
+def test_sliceOfCubeHeaderMissingFromCatalogueIsFoundAfterRestart(tmp_path):
+    previousStorageDirPath = WeatherReportProcessorBase.GFSWeatherReportsStorageDirPath
+    try:
+        WeatherReportProcessorBase.setStorageDirPath(str(tmp_path))
+        generator = SyntheticGFSDistributionGenerator()
+        distributionDirPath = generator.generate(dt.datetime(2021, 1, 1, 0), forecastTimeAmount=1)
+        csvFilesPath = WeatherReportProcessorBase.csvFilesPath
+    finally:
+        WeatherReportProcessorBase.setStorageDirPath(previousStorageDirPath)
+    # the decoder published 03:00 in the cube header, then crashed before saving the catalogue
+    distributionCube = GFSDistributionCube.initFromDistributionDirPath(distributionDirPath, mode='r+')
+    distributionCube.writeSlice('202101010300', generator.latitudes, generator.longitudes, generator.getWindsAtHours(3))
+
+    distributionCatalogue = DistributionCatalogue.initFromCSVFilesPath(csvFilesPath)
+    assert distributionCatalogue.getBestDistributionName('202101010000') == '202101010000_distributed'
+    assert distributionCatalogue.getBestDistributionName('202101010300') == '202101010000_distributed'
@@ -0,0 +1,43 @@
+import datetime as dt
+import threading
+
+from ForecastHoursSchedulerClass import ForecastHoursScheduler
+
+
+distributionDate = dt.datetime(2021, 1, 1, 0)
+
+
+def popInThread(scheduler):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(scheduler.popNextPrecedingHours()), daemon=True)
+    thread.start()
+    return thread, results
+
+
+def test_waitingThreadPicksUpHoursScheduledLater():
+    currentTimes = [distributionDate]
+    scheduler = ForecastHoursScheduler(distributionDate, [0, 3, 6], lambda: currentTimes[0], horizonHours=0, idleHorizonHours=3)
+    assert scheduler.popNextPrecedingHours() == 0
+    assert scheduler.popNextPrecedingHours() == 3 # the one idle hour
+    # nothing is free, but hours are in progress, so the thread waits instead of leaving
+    thread, results = popInThread(scheduler)
+    thread.join(0.2)
+    assert thread.is_alive()
+    currentTimes[0] = distributionDate + dt.timedelta(hours=6)
+    scheduler.didFinishPrecedingHours(0)
+    thread.join(5)
+    assert results == [6]
+    scheduler.didFinishPrecedingHours(3)
+    scheduler.didFinishPrecedingHours(6)
+    assert scheduler.popNextPrecedingHours() is None
+
+
+def test_closeReleasesWaitingThreads():
+    scheduler = ForecastHoursScheduler(distributionDate, [0, 3], lambda: distributionDate, horizonHours=0, idleHorizonHours=0)
+    assert scheduler.popNextPrecedingHours() == 0
+    thread, results = popInThread(scheduler)
+    thread.join(0.2)
+    assert thread.is_alive()
+    scheduler.close()
+    thread.join(5)
+    assert results == [None]
@@ -0,0 +1,23 @@
+import numpy as nu
+
+from GFSDistributionCubeClass import GFSDistributionCube
+
+
+def writeCSVFiles(dirPath, rowsByFileName):
+    for levelName in GFSDistributionCube.levelNames:
+        for componentName in GFSDistributionCube.componentNames:
+            fileName = f'{levelName}_{componentName}Wind.csv'
+            rows = rowsByFileName.get(fileName, [(30.0, 130.0, 1.0), (30.0, 130.5, 2.0), (30.5, 130.0, 3.0), (30.5, 130.5, 4.0)])
+            with open(f'{dirPath}/{fileName}', 'w') as file:
+                file.write(''.join(f'{latitude},{longitude},{value}\n' for latitude, longitude, value in rows))
+
+
+def test_readSliceSkipsPointsOffTheGrid(tmp_path, capsys):
+    # 30.25 is between two rows, and 131.0 lies beyond the longitudes of the first file
+    writeCSVFiles(tmp_path, {'10_m_vWind.csv': [(30.0, 130.0, 1.0), (30.25, 130.5, 9.0), (30.5, 130.5, 4.0), (30.5, 131.0, 9.0)]})
+    latitudes, longitudes, values = GFSDistributionCube.readSliceFromCSVFiles(str(tmp_path))
+    nu.testing.assert_array_equal(latitudes, [30.0, 30.5])
+    nu.testing.assert_array_equal(longitudes, [130.0, 130.5])
+    nu.testing.assert_array_equal(values[0, 0], [[1.0, 2.0], [3.0, 4.0]])
+    nu.testing.assert_array_equal(values[0, 1], [[1.0, nu.nan], [nu.nan, 4.0]])
+    assert '2 points' in capsys.readouterr().out
@@ -0,0 +1,66 @@
+import os
+import time
+import threading
+import datetime as dt
+import multiprocessing as mp
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from GFSDistributionCubeClass import GFSDistributionCube
+import WeatherReportRemoteProcessorClass as remote
+
+
+distributionName = '202101010000_distributed'
+# stands in for wgrib2: writes a 2 x 2 grid per level and component, or a truncated csv for grib files holding 'broken'
+decodeScript = '''#!/bin/sh
+if grep -q broken "$1"; then
+    for l in 10 20 30 40 50 80 100; do for c in u v; do printf "30,130\\n30,130.5,2\\n" > $2/${l}_m_${c}Wind.csv; done; done
+    exit 0
+fi
+for l in 10 20 30 40 50 80 100; do for c in u v; do printf "30,130,1\\n30,130.5,2\\n30.5,130,3\\n30.5,130.5,4\\n" > $2/${l}_m_${c}Wind.csv; done; done
+'''
+
+
+def waitUntil(condition, timeout=20):
+    startTime = time.time()
+    while not condition():
+        if time.time() - startTime > timeout:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def isPublished(timeDirName):
+    distributionDirPath = f'{WeatherReportProcessorBase.csvFilesPath}/{distributionName}'
+    return GFSDistributionCube.isTimePublishedInDistribution(distributionDirPath, timeDirName)
+
+
+def test_decodeFailureIsReportedAndRetried(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(WeatherReportProcessorBase, 'gribFilesPath', f'{tmp_path}/gribFiles')
+    monkeypatch.setattr(WeatherReportProcessorBase, 'csvFilesPath', f'{tmp_path}/csvFiles')
+    os.makedirs(f'{WeatherReportProcessorBase.gribFilesPath}/{distributionName}')
+    os.makedirs(WeatherReportProcessorBase.csvFilesPath)
+    with open('decodeGribToCSVFiles.sh', 'w') as file:
+        file.write(decodeScript)
+    os.chmod('decodeGribToCSVFiles.sh', 0o755)
+    gribDirPath = f'{WeatherReportProcessorBase.gribFilesPath}/{distributionName}'
+    with open(f'{gribDirPath}/202101010000.grb2', 'w') as file:
+        file.write('intact')
+    with open(f'{gribDirPath}/202101010300.grb2', 'w') as file:
+        file.write('broken')
+
+    shouldStop, downloadedGribFilesQueue = mp.Event(), mp.Queue()
+    decoder = threading.Thread(target=remote.helper_asyncDecodeLatestWeatherReportToCSVFilesContinuously, args=(shouldStop, downloadedGribFilesQueue, mp.Queue(), mp.Value('d', 130.0), mp.Value('d', 30.0), mp.Value('d', 0.0), 2, mp.Queue()))
+    decoder.start()
+    try:
+        assert waitUntil(lambda: isPublished('202101010000'))
+        assert waitUntil(lambda: "Can't decode grib2 file of 202101010300" in capsys.readouterr().out)
+        assert not isPublished('202101010300')
+        # once the file is intact, queuing it again decodes it, so it wasn't left marked as in flight
+        with open(f'{gribDirPath}/202101010300.grb2', 'w') as file:
+            file.write('intact')
+        downloadedGribFilesQueue.put(f'{gribDirPath}/202101010300.grb2')
+        assert waitUntil(lambda: isPublished('202101010300'))
+    finally:
+        shouldStop.set()
+        decoder.join()
@@ -0,0 +1,93 @@
+import json
+import os
+from urllib.error import URLError, ContentTooShortError
+
+import pytest
+
+from GribDownloaderClass import GribDownloader
+
+
+gribPath = '/gfs_4_20210101_0000_006.grb2'
+body = b'GRIB' + bytes(range(256)) * 4 + b'7777'
+
+
+def isGribFileIntact(filePath):
+    with open(filePath, 'rb') as file:
+        content = file.read()
+    return content[:4] == b'GRIB' and content[-4:] == b'7777'
+
+
+def test_download_resumesPartFileAfterDroppedConnection(fakeGFSServer, tmp_path):
+    fakeGFSServer.files[gribPath] = body
+    fakeGFSServer.dropAfterBytes = 300
+    storePath = f'{tmp_path}/2021010106.grb2'
+    partPath = f'{storePath}{GribDownloader.partFileExtension}'
+    downloader = GribDownloader(concurrency=1)
+
+    with pytest.raises((URLError, ContentTooShortError)):
+        downloader.download(url=f'{fakeGFSServer.baseurl}{gribPath}', storePath=storePath, timeout=30, validator=isGribFileIntact)
+    # the received bytes are kept, and the open range was resolved from Content-Range
+    assert os.path.getsize(partPath) == 300
+    with open(f'{partPath}{GribDownloader.markerFileExtension}', 'r') as file:
+        assert json.load(file)['byteRanges'] == [[0, len(body) - 1]]
+
+    downloader.download(url=f'{fakeGFSServer.baseurl}{gribPath}', storePath=storePath, timeout=30, validator=isGribFileIntact)
+    downloader.close()
+
+    assert fakeGFSServer.getRequestedRanges(gribPath) == ['bytes=0-', f'bytes=300-{len(body) - 1}']
+    with open(storePath, 'rb') as file:
+        assert file.read() == body
+    assert not os.path.exists(partPath)
+    assert not os.path.exists(f'{partPath}{GribDownloader.markerFileExtension}')
+
+
+def test_download_resumesSubsetRangesInOrder(fakeGFSServer, tmp_path):
+    fakeGFSServer.files[gribPath] = body
+    byteRanges = [(0, 99), (500, len(body) - 1)]
+    fakeGFSServer.dropAfterBytes = 60
+    storePath = f'{tmp_path}/2021010106.grb2'
+    downloader = GribDownloader(concurrency=1)
+
+    with pytest.raises((URLError, ContentTooShortError)):
+        downloader.download(url=f'{fakeGFSServer.baseurl}{gribPath}', storePath=storePath, timeout=30, byteRanges=byteRanges, validator=isGribFileIntact)
+    downloader.download(url=f'{fakeGFSServer.baseurl}{gribPath}', storePath=storePath, timeout=30, byteRanges=byteRanges, validator=isGribFileIntact)
+    downloader.close()
+
+    assert fakeGFSServer.getRequestedRanges(gribPath) == ['bytes=0-99', 'bytes=60-99', f'bytes=500-{len(body) - 1}']
+    with open(storePath, 'rb') as file:
+        assert file.read() == body[:100] + body[500:]
+
+
+def test_download_restartsWhenServerIgnoresRange(fakeGFSServer, tmp_path):
+    fakeGFSServer.files[gribPath] = body
+    fakeGFSServer.dropAfterBytes = 300
+    storePath = f'{tmp_path}/2021010106.grb2'
+    downloader = GribDownloader(concurrency=1)
+
+    with pytest.raises((URLError, ContentTooShortError)):
+        downloader.download(url=f'{fakeGFSServer.baseurl}{gribPath}', storePath=storePath, timeout=30, validator=isGribFileIntact)
+    # a 200 carries the whole body again, so the part file starts over instead of being appended to
+    fakeGFSServer.shouldIgnoreRange = True
+    downloader.download(url=f'{fakeGFSServer.baseurl}{gribPath}', storePath=storePath, timeout=30, validator=isGribFileIntact)
+    downloader.close()
+
+    with open(storePath, 'rb') as file:
+        assert file.read() == body
+
+
+@pytest.mark.parametrize('contentRange', ['', 'bytes */1032', 'bytes 0-99', 'bytes 100-1031/1032'])
+def test_download_retriesOnBrokenContentRange(fakeGFSServer, tmp_path, contentRange):
+    fakeGFSServer.files[gribPath] = body
+    fakeGFSServer.contentRange = contentRange
+    storePath = f'{tmp_path}/2021010106.grb2'
+    downloader = GribDownloader(concurrency=1)
+
+    # raised as the URLError the download loop retries with backoff
+    with pytest.raises(URLError):
+        downloader.download(url=f'{fakeGFSServer.baseurl}{gribPath}', storePath=storePath, timeout=30, validator=isGribFileIntact)
+    fakeGFSServer.contentRange = None
+    downloader.download(url=f'{fakeGFSServer.baseurl}{gribPath}', storePath=storePath, timeout=30, validator=isGribFileIntact)
+    downloader.close()
+
+    with open(storePath, 'rb') as file:
+        assert file.read() == body
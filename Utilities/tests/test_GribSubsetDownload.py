@@ -0,0 +1,65 @@
+import pytest
+
+from GribDownloaderClass import GribDownloader
+import WeatherReportRemoteProcessorClass as remote
+from WeatherReportRemoteProcessorClass import WeatherReportRemoteProcessor
+
+
+# (inventory field, payload size) of the messages of a fake grib2 file, in file order
+messages = [
+    ('TMP:2 m above ground', 40),
+    ('UGRD:10 m above ground', 30),
+    ('VGRD:10 m above ground', 35),
+    ('HGT:surface', 50),
+    ('UGRD:100 m above ground', 20),
+    ('PRES:80 m above ground', 25),
+    ('VGRD:100 m above ground', 45),
+]
+gribPath = '/gfs_4_20210101_0000_003.grb2'
+inventoryPath = '/gfs_4_20210101_0000_003.inv'
+
+
+# each message starts with 'GRIB' and ends with '7777', so subsets pass isGribFileIntact
+def getFakeGribFile():
+    bodies = [ b'GRIB' + bytes([index]) * size + b'7777' for index, (_, size) in enumerate(messages) ]
+    offsets = [ sum(len(body) for body in bodies[:index]) for index in range(len(bodies)) ]
+    inventoryText = ''.join( f'{index+1}:{offset}:d=2021010100:{field}:3 hour fcst:\n' for index, ((field, _), offset) in enumerate(zip(messages, offsets)) )
+    return bodies, offsets, inventoryText
+
+
+def test_getGribMessagesByteRangesFromIndex_mergesAdjacentMessages():
+    bodies, offsets, inventoryText = getFakeGribFile()
+    byteRanges = remote.getGribMessagesByteRangesFromIndex(inventoryText, WeatherReportRemoteProcessor.subsetMessagePattern)
+    # 10 m u and v are adjacent, 100 m u stands alone, 100 m v runs till the end of the file
+    assert byteRanges == [(offsets[1], offsets[3] - 1), (offsets[4], offsets[5] - 1), (offsets[6], None)]
+
+
+def test_downloadGribFileWithinTime_fetchesOnlyMatchingMessages(fakeGFSServer, tmp_path):
+    bodies, offsets, inventoryText = getFakeGribFile()
+    fakeGFSServer.files[gribPath] = b''.join(bodies)
+    fakeGFSServer.files[inventoryPath] = inventoryText.encode()
+    storePath = f'{tmp_path}/2021010103.grb2'
+    downloader = GribDownloader(concurrency=1)
+
+    remote.downloadGribFileWithinTime(downloader, url=f'{fakeGFSServer.baseurl}{gribPath}', storePath=storePath, timeout=30)
+    downloader.close()
+
+    assert fakeGFSServer.getRequestedRanges(inventoryPath) == [None]
+    assert fakeGFSServer.getRequestedRanges(gribPath) == [f'bytes={offsets[1]}-{offsets[3]-1}', f'bytes={offsets[4]}-{offsets[5]-1}', f'bytes={offsets[6]}-']
+    with open(storePath, 'rb') as file:
+        assert file.read() == bodies[1] + bodies[2] + bodies[4] + bodies[6]
+    assert remote.isGribFileIntact(storePath)
+
+
+def test_downloadGribFileWithinTime_fallsBackToWholeFileWithoutInventory(fakeGFSServer, tmp_path):
+    bodies, _, _ = getFakeGribFile()
+    fakeGFSServer.files[gribPath] = b''.join(bodies)
+    storePath = f'{tmp_path}/2021010103.grb2'
+    downloader = GribDownloader(concurrency=1)
+
+    remote.downloadGribFileWithinTime(downloader, url=f'{fakeGFSServer.baseurl}{gribPath}', storePath=storePath, timeout=30)
+    downloader.close()
+
+    assert fakeGFSServer.getRequestedRanges(gribPath) == ['bytes=0-']
+    with open(storePath, 'rb') as file:
+        assert file.read() == b''.join(bodies)
@@ -0,0 +1,75 @@
+import numpy as nu
+import datetime as dt
+from scipy.interpolate import RegularGridInterpolator
+
+from GridInterpolatorClass import GridInterpolator
+from Spot4DClass import Spot4D
+
+
+timeStandard = dt.datetime(2021, 1, 1, 0)
+axes = [
+    nu.arange(130.0, 133.01, 0.5), # longitude
+    nu.arange(30.0, 32.51, 0.5), # latitude
+    nu.array([10.0, 20.0, 30.0, 40.0, 50.0, 80.0, 100.0]), # altitude, unevenly spaced
+    nu.array([0.0, 10800.0]) # seconds from timeStandard
+]
+
+
+def getTrainingSamples(values):
+    grids = nu.meshgrid(*axes, indexing='ij')
+    return nu.column_stack([ grid.ravel() for grid in grids ] + [values.ravel()])
+
+
+def getRandomSpots(randomGenerator, amount):
+    return nu.column_stack([ randomGenerator.uniform(axis[0], axis[-1], amount) for axis in axes ])
+
+
+def test_matchesRegularGridInterpolator():
+    randomGenerator = nu.random.default_rng(0)
+    shape = tuple(len(axis) for axis in axes)
+    uWinds, vWinds = randomGenerator.normal(size=shape), randomGenerator.normal(size=shape)
+    # samples in shuffled order, as they don't come sorted from the reports
+    order = randomGenerator.permutation(uWinds.size)
+    interpolator = GridInterpolator(getTrainingSamples(uWinds)[order], getTrainingSamples(vWinds)[order], timeStandard)
+    spotsNdarray = getRandomSpots(randomGenerator, 500)
+
+    predictedUWinds, predictedVWinds = interpolator.predictFromSpots_ndarray(spotsNdarray)
+
+    nu.testing.assert_allclose(predictedUWinds, RegularGridInterpolator(axes, uWinds)(spotsNdarray), atol=1e-12)
+    nu.testing.assert_allclose(predictedVWinds, RegularGridInterpolator(axes, vWinds)(spotsNdarray), atol=1e-12)
+
+
+def test_singleSpotMatchesBatch():
+    randomGenerator = nu.random.default_rng(1)
+    shape = tuple(len(axis) for axis in axes)
+    uWinds, vWinds = randomGenerator.normal(size=shape), randomGenerator.normal(size=shape)
+    interpolator = GridInterpolator(getTrainingSamples(uWinds), getTrainingSamples(vWinds), timeStandard)
+    spotsNdarray = getRandomSpots(randomGenerator, 50)
+    predictedUWinds, predictedVWinds = interpolator.predictFromSpots_ndarray(spotsNdarray)
+
+    for index, (longitude, latitude, altitude, seconds) in enumerate(spotsNdarray.tolist()):
+        uWind, vWind = interpolator.predict(Spot4D(timeStandard + dt.timedelta(seconds=seconds), longitude, latitude, altitude))
+        assert abs(uWind - predictedUWinds[index]) < 1e-9
+        assert abs(vWind - predictedVWinds[index]) < 1e-9
+
+
+def test_spotsOutsideGridAreNan():
+    shape = tuple(len(axis) for axis in axes)
+    interpolator = GridInterpolator(getTrainingSamples(nu.ones(shape)), getTrainingSamples(nu.ones(shape)), timeStandard)
+    uWinds, vWinds = interpolator.predictFromSpots_ndarray(nu.array([[129.0, 31.0, 50.0, 0.0], [131.0, 31.0, 5.0, 0.0], [131.0, 31.0, 50.0, 5400.0]]))
+    assert nu.isnan(uWinds[:2]).all() and nu.isnan(vWinds[:2]).all()
+    assert uWinds[2] == 1.0 and vWinds[2] == 1.0
+
+
+def test_componentsWithDifferentPointsKeepTheirCells():
+    randomGenerator = nu.random.default_rng(2)
+    shape = tuple(len(axis) for axis in axes)
+    uWinds, vWinds = randomGenerator.normal(size=shape), randomGenerator.normal(size=shape)
+    uSamples = getTrainingSamples(uWinds)
+    vSamples = getTrainingSamples(vWinds)
+    # u misses the lowest latitude row; on the u lattice alone the v values of that row would overwrite the next one
+    uSamples = uSamples[uSamples[:, 1] != axes[1][0]]
+    interpolator = GridInterpolator(uSamples, vSamples, timeStandard)
+    nu.testing.assert_array_equal(interpolator.values[..., 1], vWinds)
+    nu.testing.assert_array_equal(interpolator.values[:, 1:, ..., 0], uWinds[:, 1:])
+    assert nu.isnan(interpolator.values[:, 0, ..., 0]).all()
@@ -0,0 +1,29 @@
+import os
+from types import SimpleNamespace
+
+from PredictionModelStoreClass import PredictionModelStore
+from WeatherReportLocalProcessorClass import WeatherReportLocalProcessor
+
+
+def getWeatherReport(distributionName, timeDirName):
+    return SimpleNamespace(parametersDirPath=f'/csv/{distributionName}/{timeDirName}')
+
+
+def test_nearbyBoundsShareOneSnappedBox():
+    boxes = { WeatherReportLocalProcessor.getSnappedBounds((130.0 + 0.01 * index, 140.2, 30.3, 40.0 + 0.01 * index)) for index in range(1, 6) }
+    assert boxes == {(130.0, 140.5, 30.0, 40.5)}
+
+
+def test_putPrunesOlderDistributionsAndWindows(tmp_path):
+    store = PredictionModelStore(str(tmp_path))
+    bounds = (130.0, 140.0, 30.0, 40.0)
+    store.put('Linear', getWeatherReport('2021010100', '202101010000'), getWeatherReport('2021010100', '202101010300'), bounds, {'trained': 1})
+    store.put('Linear', getWeatherReport('2021010106', '202101010000'), getWeatherReport('2021010106', '202101010300'), bounds, {'trained': 2})
+    assert len(os.listdir(tmp_path / '202101010000_202101010300')) == 1
+    assert store.get('Linear', getWeatherReport('2021010100', '202101010000'), getWeatherReport('2021010100', '202101010300'), bounds) is None
+    # the adjacent window may still be queried while the next one is prefetched
+    store.put('Linear', getWeatherReport('2021010106', '202101010300'), getWeatherReport('2021010106', '202101010600'), bounds, {'trained': 3})
+    assert sorted(os.listdir(tmp_path)) == ['202101010000_202101010300', '202101010300_202101010600']
+    store.put('Linear', getWeatherReport('2021010106', '202101010600'), getWeatherReport('2021010106', '202101010900'), bounds, {'trained': 4})
+    assert sorted(os.listdir(tmp_path)) == ['202101010300_202101010600', '202101010600_202101010900']
+    assert store.get('Linear', getWeatherReport('2021010106', '202101010600'), getWeatherReport('2021010106', '202101010900'), bounds) == {'trained': 4}
@@ -0,0 +1,27 @@
+import numpy as nu
+import datetime as dt
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from SyntheticGFSDistributionGeneratorClass import SyntheticGFSDistributionGenerator
+from WeatherReportLRUCacheClass import WeatherReportLRUCache
+from Spot4DClass import Spot4D
+
+
+def test_boundedLoadHoldsOnlyTheCroppedAxes(tmp_path):
+    previousStorageDirPath = WeatherReportProcessorBase.GFSWeatherReportsStorageDirPath
+    try:
+        WeatherReportProcessorBase.setStorageDirPath(str(tmp_path))
+        distributionDate = dt.datetime(2021, 1, 1, 0)
+        SyntheticGFSDistributionGenerator().generate(distributionDate, forecastTimeAmount=1)
+        weatherReportLRUCache = WeatherReportLRUCache()
+        spot = Spot4D(distributionDate, 135.0, 35.0, 50.0)
+        wholeWeatherReport = weatherReportLRUCache.getWeatherReportAtSpot(spot)
+        weatherReport = weatherReportLRUCache.getWeatherReportAtSpot(spot, bounds=(132.5, 137.5, 30.0, 40.0))
+    finally:
+        WeatherReportProcessorBase.setStorageDirPath(previousStorageDirPath)
+    nu.testing.assert_array_equal(weatherReport.longitudes, nu.arange(132.5, 137.51, 0.5))
+    nu.testing.assert_array_equal(weatherReport.latitudes, nu.arange(30.0, 40.01, 0.5))
+    assert weatherReport.winds.shape == (7, 2, 21, 11)
+    assert weatherReport.parametersDirPath == wholeWeatherReport.parametersDirPath
+    # kept apart from the whole report
+    assert len(weatherReportLRUCache) == 2
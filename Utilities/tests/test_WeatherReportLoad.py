@@ -0,0 +1,46 @@
+import numpy as nu
+import datetime as dt
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from SyntheticGFSDistributionGeneratorClass import SyntheticGFSDistributionGenerator
+from GFSDistributionCubeClass import GFSDistributionCube
+from WeatherReportClass import WeatherReport
+from Spot4DClass import Spot4D
+
+
+distributionDate = dt.datetime(2021, 1, 1, 0)
+bounds = (130.2, 134.9, 30.0, 33.0)
+
+
+def getDistributionCube(tmp_path):
+    previousStorageDirPath = WeatherReportProcessorBase.GFSWeatherReportsStorageDirPath
+    try:
+        WeatherReportProcessorBase.setStorageDirPath(str(tmp_path))
+        SyntheticGFSDistributionGenerator().generate(distributionDate, forecastTimeAmount=1)
+        parametersDirPath = WeatherReport.findBestParametersDirPathForTime(distributionDate)
+    finally:
+        WeatherReportProcessorBase.setStorageDirPath(previousStorageDirPath)
+    return GFSDistributionCube.initFromDistributionDirPath(parametersDirPath.rsplit('/', 1)[0]), parametersDirPath.rsplit('/', 1)[1]
+
+
+def test_boundsAreAViewOnTheCube(tmp_path):
+    distributionCube, timeDirName = getDistributionCube(tmp_path)
+    spot = Spot4D(distributionDate, 132.0, 31.0, 50.0)
+    weatherReport = WeatherReport.initFromDistributionCubeAtFixTime(spot, distributionCube, timeDirName, bounds=bounds)
+    assert nu.shares_memory(weatherReport.winds, distributionCube.cube)
+    assert (weatherReport.longitudeLowerBound, weatherReport.longitudeUpperBound, weatherReport.latitudeLowerBound, weatherReport.latitudeUpperBound) == (130.5, 134.5, 30.0, 33.0)
+    wholeWeatherReport = WeatherReport.initFromDistributionCubeAtFixTime(spot, distributionCube, timeDirName)
+    nu.testing.assert_array_equal(weatherReport.winds, wholeWeatherReport.getCroppedWeatherReport(*bounds).winds)
+    # only the viewed part counts against the LRU budget
+    assert weatherReport.getMemoryUsage() < wholeWeatherReport.getMemoryUsage()
+
+
+def test_reorderedCubeIsCopiedInTheOrderOfWeatherReport(tmp_path):
+    distributionCube, timeDirName = getDistributionCube(tmp_path)
+    spot = Spot4D(distributionDate, 132.0, 31.0, 50.0)
+    expectedWinds = WeatherReport.initFromDistributionCubeAtFixTime(spot, distributionCube, timeDirName, bounds=bounds).winds
+    distributionCube.header['levels'] = distributionCube.header['levels'][::-1]
+    distributionCube.header['components'] = distributionCube.header['components'][::-1]
+    weatherReport = WeatherReport.initFromDistributionCubeAtFixTime(spot, distributionCube, timeDirName, bounds=bounds)
+    assert not nu.shares_memory(weatherReport.winds, distributionCube.cube)
+    nu.testing.assert_array_equal(weatherReport.winds, expectedWinds[::-1, ::-1])
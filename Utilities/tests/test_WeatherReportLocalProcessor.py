@@ -0,0 +1,59 @@
+import numpy as nu
+import datetime as dt
+
+import pytest
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from SyntheticGFSDistributionGeneratorClass import SyntheticGFSDistributionGenerator
+from WeatherReportLocalProcessorClass import WeatherReportLocalProcessor
+from Spot4DClass import Spot4D
+
+
+distributionDate = dt.datetime(2021, 1, 1, 0)
+
+
+@pytest.fixture
+def localProcessor(tmp_path):
+    previousStorageDirPath = WeatherReportProcessorBase.GFSWeatherReportsStorageDirPath
+    WeatherReportProcessorBase.setStorageDirPath(str(tmp_path))
+    SyntheticGFSDistributionGenerator().generate(distributionDate, forecastTimeAmount=2)
+    localProcessor = WeatherReportLocalProcessor()
+    yield localProcessor
+    localProcessor.weatherReportPrefetcher.close()
+    WeatherReportProcessorBase.setStorageDirPath(previousStorageDirPath)
+
+
+def test_spotOutsideTrainingBoxIsCacheMiss(localProcessor):
+    spot = Spot4D(distributionDate + dt.timedelta(hours=1), 135.0, 35.0, 50.0)
+    localProcessor.refreshCurrentWeathorReportCacheFromLocalDevice(spot)
+    assert localProcessor.isWeatherReportFromCurrentCacheAvailable(spot)
+    # inside the decoded region, but outside the +-5 degree box the models are trained on
+    farSpot = Spot4D(spot.time, 143.0, 43.0, 50.0)
+    assert not localProcessor.isWeatherReportFromCurrentCacheAvailable(farSpot)
+    localProcessor.refreshCurrentWeathorReportCacheFromLocalDevice(farSpot)
+    assert localProcessor.isWeatherReportFromCurrentCacheAvailable(farSpot)
+    assert not nu.isnan(localProcessor.weatherReportCaches['predictionModels']['Grid'].predict(farSpot)).any()
+
+
+def test_trajectoryIsAnsweredFromBoundedReports(localProcessor):
+    startSeconds = (distributionDate - dt.datetime(1970, 1, 1)).total_seconds()
+    pointAmount = 20
+    trajectory = nu.column_stack([nu.linspace(131.0, 139.0, pointAmount), nu.linspace(31.0, 33.0, pointAmount), nu.full(pointAmount, 50.0), startSeconds + nu.linspace(0, 10000, pointAmount)])
+    winds = localProcessor.getWindsAlongTrajectory(trajectory)
+    assert not nu.isnan(winds).any()
+
+
+def test_linearIsSelectable(tmp_path):
+    previousStorageDirPath = WeatherReportProcessorBase.GFSWeatherReportsStorageDirPath
+    WeatherReportProcessorBase.setStorageDirPath(str(tmp_path))
+    try:
+        SyntheticGFSDistributionGenerator().generate(distributionDate, forecastTimeAmount=2)
+        localProcessor = WeatherReportLocalProcessor(predictionModelNames=['Linear'])
+        spot = Spot4D(distributionDate + dt.timedelta(hours=1), 135.0, 35.0, 50.0)
+        localProcessor.refreshCurrentWeathorReportCacheFromLocalDevice(spot)
+        localProcessor.weatherReportPrefetcher.close()
+    finally:
+        WeatherReportProcessorBase.setStorageDirPath(previousStorageDirPath)
+    assert localProcessor.defaultPredictionModelName == 'Linear'
+    assert list(localProcessor.weatherReportCaches['predictionModels']) == ['Linear']
+    assert not nu.isnan(localProcessor.weatherReportCaches['predictionModels']['Linear'].predict(spot)).any()
@@ -0,0 +1,22 @@
+import datetime as dt
+
+from WeatherReportPrefetcherClass import WeatherReportPrefetcher
+from Spot4DClass import Spot4D
+
+
+def test_failedBuildIsDroppedAndRetried():
+    builtSpots = []
+    def buildWeatherReportCaches(spot):
+        builtSpots.append(spot)
+        if len(builtSpots) == 1:
+            raise RuntimeError('corrupt report')
+        return {'time': spot.time}
+    prefetcher = WeatherReportPrefetcher(buildWeatherReportCaches, lambda spot, weatherReportCaches: True)
+    windowStartTime = dt.datetime(2021, 1, 1, 3)
+    prefetcher.didQuerySpot(Spot4D(windowStartTime - dt.timedelta(minutes=20), 130.0, 30.0, 50.0))
+    # the error stays on the worker thread
+    assert prefetcher.popWeatherReportCaches(Spot4D(windowStartTime, 130.0, 30.0, 50.0)) is None
+    prefetcher.didQuerySpot(Spot4D(windowStartTime - dt.timedelta(minutes=10), 130.0, 30.0, 50.0))
+    assert prefetcher.popWeatherReportCaches(Spot4D(windowStartTime, 130.0, 30.0, 50.0)) == {'time': windowStartTime}
+    assert len(builtSpots) == 2
+    prefetcher.close()
@@ -0,0 +1,32 @@
+import numpy as nu
+import datetime as dt
+
+from WeatherReportProcessorBaseClass import WeatherReportProcessorBase
+from SyntheticGFSDistributionGeneratorClass import SyntheticGFSDistributionGenerator
+from WeatherReportClass import WeatherReport
+from WeatherTileCacheClass import WeatherTileCache
+from Spot4DClass import Spot4D
+
+
+def test_diagonalRouteBuildsOnlyItsTiles(tmp_path):
+    previousStorageDirPath = WeatherReportProcessorBase.GFSWeatherReportsStorageDirPath
+    try:
+        WeatherReportProcessorBase.setStorageDirPath(str(tmp_path))
+        distributionDate = dt.datetime(2021, 1, 1, 0)
+        SyntheticGFSDistributionGenerator().generate(distributionDate, forecastTimeAmount=2)
+        pastWeatherReport = WeatherReport.initFromCenterSpotAtFixTime(Spot4D(distributionDate, 135.0, 35.0, 0))
+        futureWeatherReport = WeatherReport.initFromCenterSpotAtFixTime(Spot4D(distributionDate + dt.timedelta(hours=3), 135.0, 35.0, 0))
+    finally:
+        WeatherReportProcessorBase.setStorageDirPath(previousStorageDirPath)
+    # 130.1, 30.1 to 139.9, 39.9 spans 4 x 4 tiles of 2.5 degree, but passes through only the 4 on the diagonal
+    pointAmount = 50
+    spotsNdarray = nu.column_stack([nu.linspace(130.1, 139.9, pointAmount), nu.linspace(30.1, 39.9, pointAmount), nu.full(pointAmount, 50.0), nu.linspace(0, 10800, pointAmount)])
+    boxTileCache, spotsTileCache = WeatherTileCache(), WeatherTileCache()
+    boxInterpolator = boxTileCache.getTiledGridInterpolator(pastWeatherReport, futureWeatherReport, 130.1, 139.9, 30.1, 39.9)
+    spotsInterpolator = spotsTileCache.getTiledGridInterpolatorAtSpots(pastWeatherReport, futureWeatherReport, spotsNdarray)
+    assert boxTileCache.builtTileCount == 16
+    assert spotsTileCache.builtTileCount == 4
+    boxWinds = nu.column_stack(boxInterpolator.predictFromSpots_ndarray(spotsNdarray)[:2])
+    spotsWinds = nu.column_stack(spotsInterpolator.predictFromSpots_ndarray(spotsNdarray)[:2])
+    assert not nu.isnan(spotsWinds).any()
+    nu.testing.assert_allclose(spotsWinds, boxWinds)